@@ -0,0 +1,580 @@
+"""
+Benchmark data generation and persistence.
+
+Results are compared with `baseline.json`, and benchmarks that are
+slower than their baseline fail the run. Timings from another machine
+say little about regressions, so if the baseline was recorded on a
+different platform, number of CPUs, or version of Python, slowdowns
+are only reported as warnings; use `--save-baseline` to record a
+baseline for the current machine.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tomllib
+import tracemalloc
+from collections.abc import Callable, Iterator
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+from sqlite_utils import Database
+
+from snailz import (
+    Assay,
+    Grid,
+    Machine,
+    Parameters,
+    Person,
+    Rating,
+    Species,
+    Specimen,
+    in_memory,
+)
+from snailz._metrics import _deep_size, _peak_rss
+from snailz._plan import CALIBRATION_FILE
+from snailz._utils import IDS
+from snailz.cache import _version
+from snailz.main import (
+    _faker,
+    _index_db,
+    _save_all,
+    _save_csv,
+    _save_images,
+    _stage_seed,
+    _synthesize,
+)
+
+# Stored baseline results (machine-local: see module docstring).
+BASELINE = Path(__file__).parent / "baseline.json"
+
+# Project file read for the version when the package is not installed.
+PYPROJECT = Path(__file__).parent.parent / "pyproject.toml"
+
+# Metadata that must match for timings to be comparable.
+MACHINE_KEYS = ["platform", "cpu_count", "python"]
+
+# Parameter overrides for each benchmark scale.
+SCALES: dict[str, dict[str, Any]] = {
+    "small": {
+        "num_grids": 2,
+        "grid_size": 10,
+        "num_persons": 10,
+        "num_machines": 5,
+        "num_assays": 200,
+        "assay_size": 4,
+        "genome_length": 50,
+        "num_loci": 10,
+        "num_specimens": 500,
+    },
+    "medium": {
+        "num_grids": 4,
+        "grid_size": 40,
+        "num_persons": 50,
+        "num_machines": 20,
+        "num_assays": 5_000,
+        "assay_size": 8,
+        "genome_length": 200,
+        "num_loci": 20,
+        "num_specimens": 10_000,
+    },
+    "large": {
+        "num_grids": 8,
+        "grid_size": 100,
+        "num_persons": 200,
+        "num_machines": 50,
+        "num_assays": 50_000,
+        "assay_size": 8,
+        "genome_length": 500,
+        "num_loci": 50,
+        "num_specimens": 100_000,
+    },
+}
+
+# Default number of repetitions of each benchmark.
+REPEAT = 3
+
+# Default ratio of current to baseline time that counts as a regression.
+TOLERANCE = 1.5
+
+# Benchmarks faster than this (seconds) are too noisy to compare.
+MIN_COMPARABLE = 0.005
+
+# Scale used to calibrate resource estimates (see `calibrate`).
+CALIBRATION_SCALE = "medium"
+
+# Order in which tables are saved (referenced tables first).
+SAVE_ORDER = [Grid, Machine, Person, Rating, Assay, Species, Specimen]
+
+# Type definitions: name, rows, untimed setup, and timed function of its result.
+CaseType = tuple[str, int, Callable[[], Any], Callable[[Any], Any]]
+
+
+def main() -> int:
+    """Main command-line driver."""
+
+    args = _parse_args()
+    if args.calibrate:
+        params = Parameters(**SCALES[args.calibrate])
+        result = {"metadata": _metadata(), **calibrate(params)}
+        with open(CALIBRATION_FILE, "w") as writer:
+            json.dump(result, writer, indent=2)
+        return 0
+
+    results = {
+        "metadata": _metadata(),
+        "results": {
+            scale: _run_scale(scale, args.repeat, args.verbose) for scale in args.scales
+        },
+    }
+
+    if args.output:
+        with open(args.output, "w") as writer:
+            json.dump(results, writer, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as writer:
+            json.dump(results, writer, indent=2)
+        return 0
+
+    if not Path(args.baseline).is_file():
+        print(f"no baseline at {args.baseline}", file=sys.stderr)
+        return 0
+    with open(args.baseline, "r") as reader:
+        baseline = json.load(reader)
+    mismatched = [
+        key
+        for key in MACHINE_KEYS
+        if baseline["metadata"].get(key) != results["metadata"][key]
+    ]
+    for key in mismatched:
+        recorded, current = baseline["metadata"].get(key), results["metadata"][key]
+        print(
+            f"warning: baseline {key} is {recorded!r} not {current!r}", file=sys.stderr
+        )
+    regressions = compare(baseline["results"], results["results"], args.tolerance)
+    label = "warning:" if mismatched else "REGRESSION"
+    for scale, name, ratio in regressions:
+        print(f"{label} {scale} {name}: {ratio:.2f}x baseline", file=sys.stderr)
+    return 1 if (regressions and not mismatched) else 0
+
+
+def calibrate(params: Parameters) -> dict[str, Any]:
+    """
+    Measure constants used by `snailz._plan` to estimate the resources
+    a parameter set needs: for every table, output bytes per row in
+    each format, memory held per row, and generation time per row; the
+    size of images per grid cell; the memory used before generating
+    anything; and the ratio of peak traced memory while saving to the
+    memory held by generated objects. Time and memory for a class's
+    pivot tables are apportioned by deep size of pivoted fields.
+
+    Args:
+        params: Data synthesis parameters.
+
+    Returns:
+        Calibration constants.
+    """
+
+    base_memory = _peak_rss()
+    data = _synthesize(params)
+    rows = {
+        table: num for cls in SAVE_ORDER for table, num in cls.num_rows(params).items()
+    }
+    tables: dict[str, dict[str, float]] = {table: {} for table in rows}
+
+    for cls in SAVE_ORDER:
+        for table, size in _memory_per_row(cls, data[cls]).items():
+            tables[table]["memory"] = size
+
+    with tempfile.TemporaryDirectory() as outdir:
+        for cls in SAVE_ORDER:
+            db = _referenced_db(cls, data, False)
+            _reseed(params, cls)
+            start = time.perf_counter()
+            objects = _make(params, data, cls)
+            cls.save_csv(outdir, objects)
+            cls.save_db(db, objects)
+            elapsed = time.perf_counter() - start
+            total = sum(cls.num_rows(params).values())
+            for table in cls.num_rows(params):
+                tables[table]["seconds"] = elapsed / total
+
+        _save_csv(outdir, SAVE_ORDER, data)
+        for path in Path(outdir).glob("*.csv"):
+            table = path.stem if path.stem in rows else "grid_cells"
+            tables[table]["csv"] = tables[table].get("csv", 0) + path.stat().st_size
+        for table, count in rows.items():
+            tables[table]["csv"] /= count
+
+        _save_images(outdir, data[Grid])
+        png = sum(p.stat().st_size for p in Path(outdir).glob("*.png"))
+
+    for compact in (False, True):
+        suffix = "_compact" if compact else ""
+        sizes = _db_bytes(data, compact)
+        for table, count in rows.items():
+            tables[table][f"db{suffix}"] = sizes[table] / count
+
+    held = sum(rows[table] * tables[table]["memory"] for table in rows)
+    with tempfile.TemporaryDirectory() as outdir:
+        tracemalloc.start()
+        try:
+            _save_all(outdir, params)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    return {
+        "params": json.loads(params.as_json()),
+        "tables": tables,
+        "png_per_cell": png / rows["grid_cells"],
+        "base_memory": base_memory,
+        "peak_ratio": peak / held,
+    }
+
+
+def compare(
+    baseline: dict[str, dict[str, dict]],
+    current: dict[str, dict[str, dict]],
+    tolerance: float = TOLERANCE,
+) -> list[tuple[str, str, float]]:
+    """
+    Find benchmarks that are slower than their baseline. Benchmarks are
+    compared by their fastest run, and those too fast to time reliably
+    (or missing from either set of results) are skipped.
+
+    Args:
+        baseline: Scale names mapped to benchmark names mapped to stats.
+        current: Results in the same form.
+        tolerance: Ratio of current to baseline time that is a regression.
+
+    Returns:
+        `(scale, name, ratio)` triples for regressions.
+    """
+
+    result = []
+    for scale, cases in current.items():
+        for name, stats in cases.items():
+            before = baseline.get(scale, {}).get(name)
+            if (before is None) or (before["min"] < MIN_COMPARABLE):
+                continue
+            ratio = stats["min"] / before["min"]
+            if ratio > tolerance:
+                result.append((scale, name, ratio))
+    return result
+
+
+def _cases(params: Parameters, outdir: Path) -> Iterator[CaseType]:
+    """
+    Generate benchmark cases for one set of parameters. Each case
+    regenerates or re-saves one piece of data from inputs synthesized
+    in advance; its setup (e.g., seeding, or saving the tables a table
+    refers to) is not timed.
+
+    Args:
+        params: Data synthesis parameters.
+        outdir: Scratch directory for CSV output.
+
+    Yields:
+        `(name, rows, setup, function)` tuples.
+    """
+
+    data = _synthesize(params)
+    for cls in [Grid, Person, Machine, Rating, Assay, Species, Specimen]:
+        yield (
+            f"make.{cls.table_name()}",
+            len(data[cls]),
+            lambda cls=cls: _reseed(params, cls),
+            lambda _, cls=cls: _make(params, data, cls),
+        )
+
+    for cls in SAVE_ORDER:
+        rows = len(data[cls])
+        yield (
+            f"save_csv.{cls.table_name()}",
+            rows,
+            lambda: None,
+            lambda _, cls=cls: cls.save_csv(outdir, data[cls]),
+        )
+        for compact in (False, True):
+            suffix = "_compact" if compact else ""
+            yield (
+                f"save_db{suffix}.{cls.table_name()}",
+                rows,
+                lambda cls=cls, compact=compact: _referenced_db(cls, data, compact),
+                lambda db, cls=cls, compact=compact: cls.save_db(
+                    db, data[cls], compact
+                ),
+            )
+
+    scale = max(g.min_max()[1] for g in data[Grid])
+    yield (
+        "as_image",
+        len(data[Grid]),
+        lambda: None,
+        lambda _: [g.as_image(scale) for g in data[Grid]],
+    )
+    yield (
+        "in_memory",
+        sum(len(data[cls]) for cls in SAVE_ORDER),
+        lambda: None,
+        lambda _: in_memory(params, cache=None, disk_cache=False).close(),
+    )
+
+
+def _db_bytes(data: dict, compact: bool) -> dict[str, int]:
+    """
+    Measure bytes used by each table (including its indexes) in a
+    database holding synthesized data.
+
+    Args:
+        data: Synthesized data.
+        compact: Use integer surrogate keys.
+
+    Returns:
+        Table names mapped to bytes.
+    """
+
+    db = Database(memory=True)
+    for cls in SAVE_ORDER:
+        cls.save_db(db, data[cls], compact)
+    _index_db(db, SAVE_ORDER, compact, None)
+    cursor = db.execute(
+        "select s.tbl_name, sum(d.pgsize) from dbstat as d "
+        "join sqlite_master as s on d.name = s.name group by s.tbl_name"
+    )
+    return dict(cursor.fetchall())
+
+
+def _make(params: Parameters, data: dict, cls: type) -> list:
+    """
+    Regenerate one table from synthesized upstream tables.
+
+    Args:
+        params: Data synthesis parameters.
+        data: Synthesized data.
+        cls: Class of table to generate.
+
+    Returns:
+        Generated objects.
+    """
+
+    makers: dict[type, Callable[[], list]] = {
+        Grid: lambda: Grid.make(params),
+        Person: lambda: Person.make(params, _faker(params)),
+        Machine: lambda: Machine.make(params),
+        Rating: lambda: Rating.make(params, data[Person], data[Machine]),
+        Assay: lambda: Assay.make(params, data[Grid], data[Rating]),
+        Species: lambda: Species.make(params),
+        Specimen: lambda: Specimen.make(params, data[Grid], data[Species][0]),
+    }
+    return makers[cls]()
+
+
+def _memory_per_row(cls: type, objects: list) -> dict[str, float]:
+    """
+    Estimate memory held per row of a class's table and of the table
+    its pivoted fields are saved in (if any).
+
+    Args:
+        cls: Class of objects.
+        objects: Synthesized objects.
+
+    Returns:
+        Table names mapped to bytes per row.
+    """
+
+    tables = list(cls.num_rows(Parameters()))
+    pivot_keys = getattr(cls, "pivot_keys", set())
+    scalar = sum(
+        sys.getsizeof(obj)
+        + sum(_deep_size(getattr(obj, key)) for key in cls.persistable_keys())
+        for obj in objects
+    )
+    result = {tables[0]: scalar / len(objects)}
+    if pivot_keys:
+        pivoted = sum(
+            _deep_size(getattr(obj, key)) for obj in objects for key in pivot_keys
+        )
+        elements = sum(len(getattr(obj, next(iter(pivot_keys)))) for obj in objects)
+        result[tables[1]] = pivoted / max(1, elements)
+    return result
+
+
+def _metadata() -> dict[str, Any]:
+    """
+    Describe the machine and software that produced results.
+
+    Returns:
+        Dictionary of metadata.
+    """
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=Path(__file__).parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        "timestamp": datetime.now(UTC).isoformat(),
+        "commit": commit,
+        "snailz": _project_version(),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "numpy": np.__version__,
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def _project_version() -> str:
+    """
+    Get version of this package, reading it from the project file if
+    the package is being run from source without being installed.
+
+    Returns:
+        Version string (or placeholder if neither is available).
+    """
+
+    installed = _version()
+    if (installed != "unknown") or not PYPROJECT.is_file():
+        return installed
+    with open(PYPROJECT, "rb") as reader:
+        return tomllib.load(reader)["project"]["version"]
+
+
+def _parse_args() -> argparse.Namespace:
+    """
+    Parse command-line arguments.
+
+    Returns:
+        Object holding values from command-line arguments.
+    """
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--baseline", default=BASELINE, help="baseline results to compare against"
+    )
+    parser.add_argument(
+        "--calibrate",
+        nargs="?",
+        const=CALIBRATION_SCALE,
+        default=None,
+        choices=list(SCALES),
+        help="measure resource estimation constants at this scale and save them",
+    )
+    parser.add_argument("--output", default=None, help="file to write results to")
+    parser.add_argument(
+        "--repeat", type=int, default=REPEAT, help="repetitions of each benchmark"
+    )
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="overwrite baseline with these results instead of comparing",
+    )
+    parser.add_argument(
+        "--scales",
+        nargs="+",
+        default=["small", "medium"],
+        choices=list(SCALES),
+        help="parameter scales to benchmark",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=TOLERANCE,
+        help="slowdown relative to baseline that counts as a regression",
+    )
+    parser.add_argument("--verbose", action="store_true", help="report progress")
+    return parser.parse_args()
+
+
+def _run_scale(scale: str, repeat: int, verbose: bool = False) -> dict[str, dict]:
+    """
+    Run all benchmarks at one scale.
+
+    Args:
+        scale: Key in `SCALES`.
+        repeat: Number of times to run each benchmark.
+        verbose: Report each benchmark on standard error.
+
+    Returns:
+        Benchmark names mapped to timing statistics.
+    """
+
+    params = Parameters(**SCALES[scale])
+    result = {}
+    with tempfile.TemporaryDirectory() as outdir:
+        for name, rows, setup, func in _cases(params, Path(outdir)):
+            times = []
+            for _ in range(repeat):
+                state = setup()
+                start = time.perf_counter()
+                func(state)
+                times.append(time.perf_counter() - start)
+            result[name] = {
+                "rows": rows,
+                "min": min(times),
+                "median": statistics.median(times),
+                "repeat": repeat,
+            }
+            if verbose:
+                print(f"{scale} {name}: {min(times):.4f}s", file=sys.stderr)
+    return result
+
+
+def _referenced_db(cls: type, data: dict, compact: bool) -> Database:
+    """
+    Create an in-memory database holding the tables saved before a
+    table, so that its foreign keys can be declared.
+
+    Args:
+        cls: Class of table about to be saved.
+        data: Synthesized data.
+        compact: Use integer surrogate keys.
+
+    Returns:
+        Database connector.
+    """
+
+    db = Database(memory=True)
+    for other in SAVE_ORDER[: SAVE_ORDER.index(cls)]:
+        other.save_db(db, data[other], compact)
+    return db
+
+
+def _reseed(params: Parameters, cls: type):
+    """
+    Restart the random stream and identifiers for a table so that every
+    run of its factory does the same work.
+
+    Args:
+        params: Data synthesis parameters.
+        cls: Class being generated.
+    """
+
+    IDS.reset(params.id_width)
+    random.seed(_stage_seed(params, cls))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -261,15 +261,12 @@ def _(
         end_date=end_date.value,
         p_date_missing=p_date_missing.value,
     )
-    conn = in_memory(params)
+    conn = in_memory(params, summaries=True)
     cursor = conn.execute(
-        "SELECT name FROM sqlite_master WHERE type='table' ORDER BY name"
+        "SELECT name, records FROM summary_table_counts ORDER BY name"
     )
-    table_names = [row[0] for row in cursor.fetchall()]
-    rows = []
-    for _name in table_names:
-        count = conn.execute(f"SELECT COUNT(*) FROM [{_name}]").fetchone()[0]
-        rows.append({"table": _name, "records": count})
+    rows = [{"table": _name, "records": _count} for _name, _count in cursor.fetchall()]
+    table_names = [row["table"] for row in rows]
     return conn, rows, table_names
 
 
@@ -333,9 +330,8 @@ def _(conn, Scatter, to_widget):
 @app.cell
 def _(conn, Bar, to_widget):
     _cursor = conn.execute(
-        "SELECT gc.grid_id, COUNT(*) as c FROM specimen s "
-        "JOIN grid_cells gc ON s.lat = gc.lat AND s.lon = gc.lon "
-        "GROUP BY gc.grid_id"
+        "SELECT grid_id, SUM(num_specimens) as c FROM summary_specimen_histogram "
+        "WHERE measure = 'mass' GROUP BY grid_id"
     )
     _rows = _cursor.fetchall()
     _labels = [r[0] for r in _rows]
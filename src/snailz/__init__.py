@@ -1,11 +1,13 @@
 """Synthetic data generator for snail mutation survey."""
 
 from .assay import Assay as Assay
+from .cache import DiskCache as DiskCache
+from .cache import MemoryCache as MemoryCache
 from .grid import Grid as Grid
 from .machine import Machine as Machine
+from .main import in_memory as in_memory
 from .parameters import Parameters as Parameters
 from .person import Person as Person
 from .rating import Rating as Rating
 from .species import Species as Species
 from .specimen import Specimen as Specimen
-from .main import in_memory as in_memory
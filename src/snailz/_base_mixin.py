@@ -2,13 +2,42 @@
 
 from abc import ABC, abstractmethod
 from csv import DictWriter
+from dataclasses import MISSING, fields
+from datetime import date
+from functools import cache
 from pathlib import Path
+from types import UnionType
+from typing import ClassVar, Self, TextIO, get_args
+
 from sqlite_utils import Database
-from typing import TextIO
+
+from ._columnar import ColumnStore
+from ._compress import Compression, open_csv
+from ._utils import ForeignKeysType, IdAllocator, create_table, insert_rows
+from .parameters import Parameters
+
+# Name of integer surrogate key column in compact databases.
+COMPACT_KEY = "id"
+
+# Type definitions.
+IndexKeysType = dict[str, list[tuple[str, ...]]]
 
 
 class BaseMixin(ABC):
-    """Mixin base class for dataclasses."""
+    """
+    Mixin base class for dataclasses. Derived classes should be
+    declared with `@dataclass(slots=True)` so that objects don't carry
+    a per-instance `__dict__`; field metadata is computed once per
+    class and cached.
+    """
+
+    __slots__ = ()
+
+    # Parameters that the objects of a class depend on.
+    param_keys: ClassVar[set[str]] = set()
+
+    # Stem of generated identifiers (empty if objects have none).
+    id_stem: ClassVar[str] = ""
 
     def persistable(self) -> dict:
         """
@@ -16,25 +45,127 @@ class BaseMixin(ABC):
         listed in class-level `pivot_keys` member.
         """
 
-        return {key: self.__dict__[key] for key in self.persistable_keys()}
+        return {key: getattr(self, key) for key in self.persistable_keys()}
 
-    def not_null_keys(self) -> set:
-        """Generate set of keys for non-null values in object."""
+    @classmethod
+    @cache
+    def not_null_keys(cls) -> frozenset[str]:
+        """Generate set of keys for non-null values in objects of class."""
 
-        nullable_keys = getattr(self, "nullable_keys", set())
-        return {key for key in self.persistable_keys() if key not in nullable_keys}
+        nullable_keys = getattr(cls, "nullable_keys", set())
+        return frozenset(
+            key for key in cls.persistable_keys() if key not in nullable_keys
+        )
 
-    def persistable_keys(self) -> list[str]:
+    @classmethod
+    @cache
+    def column_types(cls) -> dict[str, type]:
+        """
+        Map keys to persist for objects of class to their Python types,
+        ignoring optionality (which is recorded in `nullable_keys`).
+        """
+
+        result = {}
+        for f in fields(cls):
+            if f.name not in cls.persistable_keys():
+                continue
+            kind = f.type
+            if isinstance(kind, UnionType):
+                kind = next(t for t in get_args(kind) if t is not type(None))
+            result[f.name] = kind
+        return result
+
+    @classmethod
+    @cache
+    def persistable_keys(cls) -> tuple[str, ...]:
         """
-        Generate list of keys to persist for object by ignoring all
+        Generate keys to persist for objects of class by ignoring all
         keys listed in class-level `pivot_keys` member.
         """
 
-        pivot_keys = getattr(self, "pivot_keys", set())
-        return [key for key in self.__dict__.keys() if key not in pivot_keys]
+        pivot_keys = getattr(cls, "pivot_keys", set())
+        return tuple(f.name for f in fields(cls) if f.name not in pivot_keys)
+
+    @classmethod
+    def append_db(cls, db: Database, objects: list, compact: bool = False):
+        """
+        Insert objects of derived class into tables created by an
+        earlier `save_db` without committing, so that callers can
+        append to several tables in one transaction. Derived classes
+        should override this and up-call to insert scalar properties,
+        then insert properties that were pivoted to long form.
+
+        Args:
+            db: Database connector.
+            objects: Objects to insert.
+            compact: Whether the database uses the compact schema.
+        """
+
+        assert all(isinstance(obj, cls) for obj in objects)
+        if compact:
+            keys = tuple(cls.compact_columns())
+            rows = (obj.compact_row() for obj in objects)
+        else:
+            keys = cls.persistable_keys()
+            rows = (obj.persistable() for obj in objects)
+        insert_rows(db, cls.table_name(), keys, rows)
+
+    @classmethod
+    def load_db(cls, db: Database, compact: bool = False) -> list:
+        """
+        Reconstruct objects of derived class from database without
+        per-object validation. Derived classes should override this and
+        up-call to load scalar properties, then restore properties that
+        were pivoted to long form (which are initialized to defaults).
+
+        Args:
+            db: Database connector.
+            compact: Whether the database uses the compact schema.
+
+        Returns:
+            Objects in the order in which they were saved.
+        """
+
+        keys = cls.persistable_keys()
+        types = cls.column_types()
+        order = cls._load_order(compact)
+        cursor = db.execute(
+            f"select {', '.join(keys)} from {cls.table_name()} order by {order}"
+        )
+
+        idents = {}
+        if compact:
+            for col, other_table, _ in cls.compact_foreign_keys():
+                idents[col] = cls._ident_map(db, other_table)
+
+        result = []
+        for row in cursor:
+            values = dict(zip(keys, row))
+            for key, value in values.items():
+                if value is None:
+                    continue
+                if key in idents:
+                    values[key] = idents[key][value]
+                elif types[key] is date:
+                    values[key] = date.fromisoformat(value)
+                elif types[key] is bool:
+                    values[key] = bool(value)
+            for f in fields(cls):
+                if f.name not in values:
+                    values[f.name] = (
+                        f.default if f.default is not MISSING else f.default_factory()  # type: ignore[call-non-callable]
+                    )
+            result.append(cls._trusted(**values))
+        return result
 
     @classmethod
-    def save_csv(cls, outdir: Path | str, objects: list):
+    def save_csv(
+        cls,
+        outdir: Path | str,
+        objects: list,
+        append: bool = False,
+        compression: Compression | None = None,
+    ):
         """
         Save objects of derived class as CSV. Derived classes should
         override this and up-call to save scalar properties, then save
@@ -43,16 +174,44 @@ class BaseMixin(ABC):
         Args:
             outdir: Output directory.
             objects: Objects to save.
+            append: Add rows to existing files instead of replacing them.
+            compression: How to compress files (if at all).
         """
 
         assert all(isinstance(obj, cls) for obj in objects)
-        with open(Path(outdir, f"{cls.table_name()}.csv"), "w", newline="") as stream:
-            writer = cls._csv_dict_writer(stream, objects[0].persistable_keys())
+        mode = "a" if append else "w"
+        with open_csv(outdir, cls.table_name(), mode, compression) as stream:
+            writer = cls._csv_dict_writer(
+                stream, cls.persistable_keys(), header=not append
+            )
             for obj in objects:
                 writer.writerow(obj.persistable())
 
     @classmethod
-    def save_db(cls, db: Database, objects: list):
+    def save_columns(cls, store: ColumnStore, objects: list):
+        """
+        Save objects of derived class as column files. Derived classes
+        should override this and up-call to save scalar properties,
+        then save properties that need to be pivoted to long form.
+        String columns listed in the class-level `categorical_keys`
+        member are dictionary-encoded.
+
+        Args:
+            store: Where to write columns.
+            objects: Objects to save.
+        """
+
+        assert all(isinstance(obj, cls) for obj in objects)
+        store.append(
+            cls.table_name(),
+            cls.column_types(),
+            (obj.persistable() for obj in objects),
+            nullable=getattr(cls, "nullable_keys", set()),
+            categorical=getattr(cls, "categorical_keys", set()),
+        )
+
+    @classmethod
+    def save_db(cls, db: Database, objects: list, compact: bool = False):
         """
         Save objects of derived class to database. Derived classes should
         override this and up-call to save scalar properties, then save
@@ -61,9 +220,14 @@ class BaseMixin(ABC):
         Args:
             db: Database connector.
             objects: Objects to save.
+            compact: Use integer surrogate keys (see `save_db_compact`).
         """
 
         assert all(isinstance(obj, cls) for obj in objects)
+        if compact:
+            cls.save_db_compact(db, objects)
+            return
+
         table = db[cls.table_name()]
         primary_key = getattr(cls, "primary_key", None)
         foreign_keys = getattr(cls, "foreign_keys", [])
@@ -73,28 +237,213 @@ class BaseMixin(ABC):
             foreign_keys=foreign_keys,
         )
         table.transform(  # type: ignore[possibly-missing-attribute]
-            not_null=objects[0].not_null_keys()
+            not_null=set(cls.not_null_keys())
+        )
+
+    @classmethod
+    def save_db_compact(cls, db: Database, objects: list):
+        """
+        Save objects of derived class to database using a compact
+        schema. Classes with generated identifiers get an `INTEGER
+        PRIMARY KEY` column `id` holding the identifier's integer key
+        and keep `ident` as a uniquely-indexed secondary column; foreign
+        keys to `ident` columns become integer references to `id`.
+        Classes with a composite `compact_key` are stored `WITHOUT ROWID`.
+
+        Args:
+            db: Database connector.
+            objects: Objects to save.
+        """
+
+        name = cls.table_name()
+        compact_key = cls.compact_key()
+        create_table(
+            db,
+            name,
+            cls.compact_columns(),
+            pk=compact_key,
+            foreign_keys=cls.compact_foreign_keys(),
+            not_null=cls.not_null_keys(),
+            without_rowid=isinstance(compact_key, tuple),
+        )
+        db[name].insert_all(  # type: ignore[possibly-missing-attribute]
+            obj.compact_row() for obj in objects
         )
+        if compact_key == COMPACT_KEY:
+            db[name].create_index(["ident"], unique=True)  # type: ignore[possibly-missing-attribute]
+
+    @classmethod
+    @cache
+    def compact_columns(cls) -> dict[str, type]:
+        """Map column names to Python types in compact schema."""
+
+        result = dict(cls.column_types())
+        if cls.compact_key() == COMPACT_KEY:
+            result = {COMPACT_KEY: int, **result}
+        for col, _, _ in cls.compact_foreign_keys():
+            result[col] = int
+        return result
+
+    @classmethod
+    @cache
+    def compact_foreign_keys(cls) -> ForeignKeysType:
+        """
+        Convert foreign keys to references to integer surrogate keys,
+        dropping those that do not refer to generated identifiers.
+        """
+
+        return [
+            (col, other_table, COMPACT_KEY)
+            for col, other_table, other_col in getattr(cls, "foreign_keys", [])
+            if other_col == "ident"
+        ]
+
+    @classmethod
+    def compact_key(cls) -> str | tuple[str, ...] | None:
+        """Primary key of table in compact schema."""
+
+        if cls.id_stem:
+            return COMPACT_KEY
+        return getattr(cls, "compact_primary_key", None)
+
+    def compact_row(self) -> dict:
+        """Create persistable dictionary for compact schema."""
+
+        row = self.persistable()
+        if self.compact_key() == COMPACT_KEY:
+            row[COMPACT_KEY] = IdAllocator.key(row["ident"])
+        for col, _, _ in self.compact_foreign_keys():
+            if row[col] is not None:
+                row[col] = IdAllocator.key(row[col])
+        return row
+
+    @classmethod
+    def index_keys(cls, compact: bool = False) -> IndexKeysType:
+        """
+        Columns to index after loading: one index per table referenced
+        by the class-level `foreign_keys` member (so that `lat` and
+        `lon` are indexed together), plus any extra lookup columns in
+        the class-level `lookup_keys` member. Indexes that would only
+        duplicate a prefix of the primary key are omitted.
+
+        Args:
+            compact: Whether the database uses the compact schema.
+
+        Returns:
+            Table names mapped to lists of column tuples.
+        """
+
+        grouped: dict[str, list[str]] = {}
+        for col, other_table, _ in getattr(cls, "foreign_keys", []):
+            grouped.setdefault(other_table, []).append(col)
+
+        name = cls.table_name()
+        pk = cls.compact_key() if compact else getattr(cls, "primary_key", None)
+        pk = (pk,) if isinstance(pk, str) else (pk or ())
+        result: IndexKeysType = {
+            name: [
+                tuple(cols)
+                for cols in grouped.values()
+                if tuple(cols) != pk[: len(cols)]
+            ]
+        }
+        for table, keys in getattr(cls, "lookup_keys", {}).items():
+            result.setdefault(table, []).extend(keys)
+        return result
+
+    @classmethod
+    @abstractmethod
+    def num_rows(cls, params: Parameters) -> dict[str, int]:
+        """
+        Predict rows generated from parameters in the table for this
+        class and in tables its pivoted properties are saved in.
+
+        Args:
+            params: Data synthesis parameters.
+
+        Returns:
+            Table names mapped to numbers of rows.
+        """
 
     @classmethod
     @abstractmethod
     def table_name(cls) -> str:
         """Database table name."""
-        pass
 
     @classmethod
-    def _csv_dict_writer(cls, stream: TextIO, fieldnames: list[str]) -> DictWriter:
+    def _trusted(cls, **kwargs) -> Self:
+        """
+        Construct an object without running `__init__` or per-object
+        validation in `__post_init__`. This is only for use by `make`
+        factories whose values are valid by construction and which
+        validate whole batches instead; callers must supply every field.
+
+        Args:
+            kwargs: Field values.
+
+        Returns:
+            New object.
+        """
+
+        obj = object.__new__(cls)
+        for key, value in kwargs.items():
+            object.__setattr__(obj, key, value)
+        return obj
+
+    @classmethod
+    def _ident_map(cls, db: Database, table: str) -> dict[int, str]:
+        """
+        Map integer surrogate keys to identifiers in a compact table.
+
+        Args:
+            db: Database connector.
+            table: Table name.
+
+        Returns:
+            Integer keys mapped to identifiers.
+        """
+
+        return dict(db.execute(f"select {COMPACT_KEY}, ident from {table}").fetchall())
+
+    @classmethod
+    def _load_order(cls, compact: bool) -> str:
+        """
+        Get SQL ordering clause that returns rows in the order they
+        were saved. (Rows of `WITHOUT ROWID` tables come back in primary
+        key order, so factories must produce them in that order.)
+
+        Args:
+            compact: Whether the database uses the compact schema.
+
+        Returns:
+            Column names for `order by`.
+        """
+
+        key = cls.compact_key() if compact else None
+        if isinstance(key, tuple):
+            return ", ".join(key)
+        return key or "rowid"
+
+    @classmethod
+    def _csv_dict_writer(
+        cls,
+        stream: TextIO,
+        fieldnames: list[str] | tuple[str, ...],
+        header: bool = True,
+    ) -> DictWriter:
         """
         Construct a CSV dict writer with default properties.
 
         Args:
             stream: Writeable stream to wrap.
             fieldnames: List of fields to be persisted.
+            header: Write header row.
 
         Returns:
             CSV dict writer.
         """
 
         writer = DictWriter(stream, fieldnames=fieldnames, lineterminator="\n")
-        writer.writeheader()
+        if header:
+            writer.writeheader()
         return writer
@@ -0,0 +1,737 @@
+"""Columnar binary export with a memory-mapping loader."""
+
+import json
+from collections.abc import Collection, Iterable, Iterator
+from datetime import date
+from pathlib import Path
+from typing import Any, Self
+
+import numpy as np
+
+from ._utils import validate
+from .parameters import JSON_INDENT
+
+# Name of manifest file in output directory.
+MANIFEST_FILE = "columns.json"
+
+# Version of column file layout recorded in manifest.
+FORMAT_VERSION = 1
+
+# Python types of numeric columns mapped to little-endian NumPy types.
+NUMERIC_DTYPES: dict[type, str] = {
+    bool: "|u1",
+    date: "<M8[D]",
+    float: "<f8",
+    int: "<i8",
+}
+
+# Type of string offsets.
+OFFSET_DTYPE = "<i8"
+
+# Types of dictionary codes from narrowest to widest.
+CODE_DTYPES = ["|u1", "<u2", "<u4"]
+
+# Type of validity flags of nullable columns.
+VALID_DTYPE = "|b1"
+
+
+class ColumnStore:
+    """
+    Write tables as one binary file per column (or per part of a
+    column) in an output directory, plus a manifest describing them.
+    Tables may be written in several pieces, so large tables can be
+    saved one chunk at a time.
+
+    - Numeric, boolean, and date columns are raw little-endian arrays
+      (dates as days since 1970-01-01).
+    - String columns are an array of `n + 1` byte offsets plus the
+      concatenated UTF-8 bytes of the values.
+    - Categorical string columns are dictionary-encoded: an array of
+      codes (as narrow as the dictionary allows) plus the distinct
+      values stored like a string column.
+    - Nullable columns have an extra array of validity flags; values
+      in rows that are null are zero or empty.
+
+    Attributes:
+        outdir: Output directory.
+        tables: Table names mapped to row counts and column writers.
+    """
+
+    def __init__(self, outdir: Path | str):
+        """
+        Construct store.
+
+        Args:
+            outdir: Output directory.
+        """
+
+        self.outdir = Path(outdir)
+        self.tables: dict[str, dict[str, Any]] = {}
+
+    def append(
+        self,
+        table: str,
+        types: dict[str, type],
+        rows: Iterable[dict[str, Any]],
+        nullable: Collection[str] = (),
+        categorical: Collection[str] = (),
+    ):
+        """
+        Add rows to a table, creating its files if this is the first
+        call for the table.
+
+        Args:
+            table: Table name.
+            types: Column names mapped to Python types.
+            rows: Persistable dictionaries.
+            nullable: Columns that may contain `None`.
+            categorical: String columns to dictionary-encode.
+        """
+
+        if table not in self.tables:
+            self.tables[table] = {
+                "rows": 0,
+                "columns": {
+                    name: _writer(
+                        self.outdir,
+                        f"{table}.{name}",
+                        kind,
+                        name in nullable,
+                        name in categorical,
+                    )
+                    for name, kind in types.items()
+                },
+            }
+        columns = self.tables[table]["columns"]
+        assert list(columns) == list(types), f"columns of {table} changed"
+
+        values: dict[str, list] = {name: [] for name in columns}
+        for row in rows:
+            for name, column in values.items():
+                column.append(row[name])
+        count = len(next(iter(values.values()), []))
+        for name, writer in columns.items():
+            writer.write(values[name])
+        self.tables[table]["rows"] += count
+
+    @classmethod
+    def resume(cls, outdir: Path | str) -> Self:
+        """
+        Reopen files written earlier so that rows can be appended to
+        their tables.
+
+        Args:
+            outdir: Output directory containing manifest.
+
+        Returns:
+            Store whose tables continue where the manifest left off.
+
+        Raises:
+            ValueError: If the manifest has an unknown version or
+                a file's size does not match it.
+        """
+
+        store = cls(outdir)
+        manifest = json.loads((store.outdir / MANIFEST_FILE).read_text())
+        validate(
+            manifest["version"] == FORMAT_VERSION,
+            f"unknown column format version {manifest['version']}",
+        )
+        for table, entry in manifest["tables"].items():
+            store.tables[table] = {
+                "rows": entry["rows"],
+                "columns": {
+                    name: _resume(store.outdir, desc, entry["rows"])
+                    for name, desc in entry["columns"].items()
+                },
+            }
+        return store
+
+    def close(self) -> dict[str, Any]:
+        """
+        Write the manifest.
+
+        Returns:
+            Manifest.
+        """
+
+        manifest = {
+            "version": FORMAT_VERSION,
+            "tables": {
+                table: {
+                    "rows": entry["rows"],
+                    "columns": {
+                        name: writer.describe()
+                        for name, writer in entry["columns"].items()
+                    },
+                }
+                for table, entry in self.tables.items()
+            },
+        }
+        with open(self.outdir / MANIFEST_FILE, "w") as writer:
+            json.dump(manifest, writer, indent=JSON_INDENT)
+        return manifest
+
+
+class StringColumn:
+    """
+    Read-only view of strings stored as offsets plus UTF-8 bytes.
+    Values are decoded when they are indexed.
+
+    Attributes:
+        offsets: Byte offsets of values (one more than the number of values).
+        data: Concatenated bytes of values.
+        valid: Validity flags (or `None` if the column is not nullable).
+    """
+
+    def __init__(
+        self, offsets: np.ndarray, data: np.ndarray, valid: np.ndarray | None = None
+    ):
+        """
+        Construct view.
+
+        Args:
+            offsets: Byte offsets of values.
+            data: Concatenated bytes of values.
+            valid: Validity flags (if any).
+        """
+
+        self.offsets = offsets
+        self.data = data
+        self.valid = valid
+
+    def __len__(self) -> int:
+        """Number of values."""
+
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> str | None:
+        """
+        Decode one value.
+
+        Args:
+            i: Row index.
+
+        Returns:
+            Value (or `None` if null).
+
+        Raises:
+            IndexError: If the index is out of range.
+        """
+
+        i = _check_index(i, len(self))
+        if (self.valid is not None) and not self.valid[i]:
+            return None
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return bytes(self.data[start:end]).decode("utf-8")
+
+    def __iter__(self) -> Iterator[str | None]:
+        """Decode all values in order."""
+
+        return (self[i] for i in range(len(self)))
+
+
+class DictionaryColumn:
+    """
+    Read-only view of dictionary-encoded strings.
+
+    Attributes:
+        codes: Index of each row's value in `values`.
+        values: Distinct values.
+        valid: Validity flags (or `None` if the column is not nullable).
+    """
+
+    def __init__(
+        self, codes: np.ndarray, values: StringColumn, valid: np.ndarray | None = None
+    ):
+        """
+        Construct view.
+
+        Args:
+            codes: Index of each row's value in `values`.
+            values: Distinct values.
+            valid: Validity flags (if any).
+        """
+
+        self.codes = codes
+        self.values = values
+        self.valid = valid
+
+    def __len__(self) -> int:
+        """Number of values."""
+
+        return len(self.codes)
+
+    def __getitem__(self, i: int) -> str | None:
+        """
+        Decode one value.
+
+        Args:
+            i: Row index.
+
+        Returns:
+            Value (or `None` if null).
+
+        Raises:
+            IndexError: If the index is out of range.
+        """
+
+        i = _check_index(i, len(self))
+        if (self.valid is not None) and not self.valid[i]:
+            return None
+        return self.values[int(self.codes[i])]
+
+    def __iter__(self) -> Iterator[str | None]:
+        """Decode all values in order."""
+
+        return (self[i] for i in range(len(self)))
+
+
+def load_columns(outdir: Path | str) -> dict[str, dict[str, Any]]:
+    """
+    Memory-map the column files described by a manifest without
+    copying them. Numeric columns are read-only NumPy arrays (masked
+    arrays if nullable); string columns are `StringColumn` or
+    `DictionaryColumn` views.
+
+    Args:
+        outdir: Directory containing `MANIFEST_FILE`.
+
+    Returns:
+        Table names mapped to column names mapped to columns.
+
+    Raises:
+        ValueError: If the manifest has an unknown version or a
+            file's size does not match the manifest.
+    """
+
+    with open(Path(outdir, MANIFEST_FILE), "r") as reader:
+        manifest = json.load(reader)
+    validate(
+        manifest["version"] == FORMAT_VERSION,
+        f"unknown column format version {manifest['version']}",
+    )
+
+    result = {}
+    for table, entry in manifest["tables"].items():
+        rows = entry["rows"]
+        result[table] = {
+            name: _load_column(outdir, desc, rows)
+            for name, desc in entry["columns"].items()
+        }
+    return result
+
+
+class _NumericWriter:
+    """Write a numeric column as a raw array."""
+
+    def __init__(self, outdir: Path, stem: str, kind: type, create: bool = True):
+        """
+        Create empty file.
+
+        Args:
+            outdir: Output directory.
+            stem: File name prefix.
+            kind: Python type of values.
+            create: Truncate file (false when appending to existing file).
+        """
+
+        self.dtype = NUMERIC_DTYPES[kind]
+        self.file = f"{stem}.bin"
+        self.path = outdir / self.file
+        if create:
+            self.path.write_bytes(b"")
+
+    @classmethod
+    def resume(cls, outdir: Path, desc: dict[str, Any], rows: int) -> Self:
+        """
+        Reopen a column written earlier.
+
+        Args:
+            outdir: Output directory.
+            desc: Description of column from manifest.
+            rows: Number of rows already written.
+
+        Returns:
+            Writer that appends to existing file.
+        """
+
+        _map(outdir, desc["file"], desc["dtype"], rows)
+        kind = next(k for k, d in NUMERIC_DTYPES.items() if d == desc["dtype"])
+        return cls(outdir, desc["file"].removesuffix(".bin"), kind, create=False)
+
+    def write(self, values: list):
+        """
+        Append values.
+
+        Args:
+            values: Values (`None` stored as zero).
+        """
+
+        zero = date(1970, 1, 1) if self.dtype == NUMERIC_DTYPES[date] else 0
+        array = np.array([zero if v is None else v for v in values], dtype=self.dtype)
+        with open(self.path, "ab") as stream:
+            array.tofile(stream)
+
+    def describe(self) -> dict[str, Any]:
+        """Describe column for manifest."""
+
+        return {"encoding": "plain", "dtype": self.dtype, "file": self.file}
+
+
+class _StringWriter:
+    """Write a string column as offsets plus bytes."""
+
+    def __init__(self, outdir: Path, stem: str, size: int | None = None):
+        """
+        Create files with initial zero offset.
+
+        Args:
+            outdir: Output directory.
+            stem: File name prefix.
+            size: Bytes already written (if appending to existing files).
+        """
+
+        self.offsets_file = f"{stem}.offsets.bin"
+        self.data_file = f"{stem}.bytes.bin"
+        self.offsets_path = outdir / self.offsets_file
+        self.data_path = outdir / self.data_file
+        self.size = 0 if size is None else size
+        if size is None:
+            np.zeros(1, dtype=OFFSET_DTYPE).tofile(self.offsets_path)
+            self.data_path.write_bytes(b"")
+
+    @classmethod
+    def resume(cls, outdir: Path, desc: dict[str, Any], rows: int) -> Self:
+        """
+        Reopen a column written earlier.
+
+        Args:
+            outdir: Output directory.
+            desc: Description of column from manifest.
+            rows: Number of rows already written.
+
+        Returns:
+            Writer that appends to existing files.
+        """
+
+        offsets = _map(outdir, desc["offsets"], OFFSET_DTYPE, rows + 1)
+        size = int(offsets[-1])
+        _map(outdir, desc["data"], "|u1", size)
+        return cls(outdir, desc["offsets"].removesuffix(".offsets.bin"), size)
+
+    def write(self, values: list):
+        """
+        Append values.
+
+        Args:
+            values: Strings (`None` stored as empty).
+        """
+
+        encoded = [b"" if v is None else v.encode("utf-8") for v in values]
+        lengths = np.fromiter((len(e) for e in encoded), OFFSET_DTYPE, len(encoded))
+        offsets = self.size + np.cumsum(lengths, dtype=OFFSET_DTYPE)
+        with open(self.offsets_path, "ab") as stream:
+            offsets.astype(OFFSET_DTYPE).tofile(stream)
+        with open(self.data_path, "ab") as stream:
+            stream.write(b"".join(encoded))
+        if len(offsets):
+            self.size = int(offsets[-1])
+
+    def describe(self) -> dict[str, Any]:
+        """Describe column for manifest."""
+
+        return {
+            "encoding": "offsets",
+            "offsets": self.offsets_file,
+            "data": self.data_file,
+        }
+
+
+class _DictionaryWriter:
+    """
+    Write a string column as dictionary codes. Codes start as single
+    bytes; the file is rewritten with wider codes if the dictionary
+    outgrows them.
+    """
+
+    def __init__(self, outdir: Path, stem: str, create: bool = True):
+        """
+        Create empty file.
+
+        Args:
+            outdir: Output directory.
+            stem: File name prefix.
+            create: Truncate file (false when appending to existing file).
+        """
+
+        self.outdir = outdir
+        self.stem = stem
+        self.file = f"{stem}.codes.bin"
+        self.path = outdir / self.file
+        self.dtype = CODE_DTYPES[0]
+        self.lookup: dict[str, int] = {}
+        if create:
+            self.path.write_bytes(b"")
+
+    @classmethod
+    def resume(cls, outdir: Path, desc: dict[str, Any], rows: int) -> Self:
+        """
+        Reopen a column written earlier, reloading its dictionary.
+
+        Args:
+            outdir: Output directory.
+            desc: Description of column from manifest.
+            rows: Number of rows already written.
+
+        Returns:
+            Writer that appends to existing file.
+        """
+
+        _map(outdir, desc["codes"], desc["dtype"], rows)
+        values = _load_strings(outdir, desc["values"], desc["size"], None)
+        writer = cls(outdir, desc["codes"].removesuffix(".codes.bin"), create=False)
+        writer.dtype = desc["dtype"]
+        writer.lookup = {value: i for i, value in enumerate(values)}
+        return writer
+
+    def write(self, values: list):
+        """
+        Append values.
+
+        Args:
+            values: Strings (`None` stored as code 0).
+        """
+
+        lookup = self.lookup
+        codes = [0 if v is None else lookup.setdefault(v, len(lookup)) for v in values]
+        dtype = next(
+            d for d in CODE_DTYPES if max(len(lookup) - 1, 0) <= np.iinfo(d).max
+        )
+        if dtype != self.dtype:
+            np.fromfile(self.path, dtype=self.dtype).astype(dtype).tofile(self.path)
+            self.dtype = dtype
+        with open(self.path, "ab") as stream:
+            np.array(codes, dtype=self.dtype).tofile(stream)
+
+    def describe(self) -> dict[str, Any]:
+        """Describe column for manifest, writing the dictionary."""
+
+        values = _StringWriter(self.outdir, f"{self.stem}.values")
+        values.write(list(self.lookup))
+        return {
+            "encoding": "dictionary",
+            "dtype": self.dtype,
+            "codes": self.file,
+            "size": len(self.lookup),
+            "values": values.describe(),
+        }
+
+
+class _NullableWriter:
+    """Add validity flags to another column writer."""
+
+    def __init__(self, outdir: Path, stem: str, inner: Any, create: bool = True):
+        """
+        Create empty file.
+
+        Args:
+            outdir: Output directory.
+            stem: File name prefix.
+            inner: Writer for values.
+            create: Truncate file (false when appending to existing file).
+        """
+
+        self.inner = inner
+        self.file = f"{stem}.valid.bin"
+        self.path = outdir / self.file
+        if create:
+            self.path.write_bytes(b"")
+
+    @classmethod
+    def resume(cls, outdir: Path, desc: dict[str, Any], rows: int) -> Self:
+        """
+        Reopen a column written earlier.
+
+        Args:
+            outdir: Output directory.
+            desc: Description of column from manifest.
+            rows: Number of rows already written.
+
+        Returns:
+            Writer that appends to existing files.
+        """
+
+        _map(outdir, desc["valid"], VALID_DTYPE, rows)
+        inner = _resume(outdir, {k: v for k, v in desc.items() if k != "valid"}, rows)
+        stem = desc["valid"].removesuffix(".valid.bin")
+        return cls(outdir, stem, inner, create=False)
+
+    def write(self, values: list):
+        """
+        Append values and their validity flags.
+
+        Args:
+            values: Values (possibly `None`).
+        """
+
+        with open(self.path, "ab") as stream:
+            np.array([v is not None for v in values], dtype=VALID_DTYPE).tofile(stream)
+        self.inner.write(values)
+
+    def describe(self) -> dict[str, Any]:
+        """Describe column for manifest."""
+
+        return {**self.inner.describe(), "valid": self.file}
+
+
+def _check_index(i: int, length: int) -> int:
+    """
+    Normalize a possibly-negative index.
+
+    Args:
+        i: Index.
+        length: Length of sequence.
+
+    Returns:
+        Non-negative index.
+
+    Raises:
+        IndexError: If the index is out of range.
+    """
+
+    if i < 0:
+        i += length
+    if not 0 <= i < length:
+        raise IndexError(f"index {i} out of range for {length} values")
+    return i
+
+
+def _load_column(outdir: Path | str, desc: dict[str, Any], rows: int) -> Any:
+    """
+    Memory-map one column.
+
+    Args:
+        outdir: Output directory.
+        desc: Description of column from manifest.
+        rows: Number of rows in table.
+
+    Returns:
+        Array or string view.
+    """
+
+    valid = _map(outdir, desc["valid"], VALID_DTYPE, rows) if "valid" in desc else None
+    encoding = desc["encoding"]
+    if encoding == "plain":
+        values = _map(outdir, desc["file"], desc["dtype"], rows)
+        if valid is None:
+            return values
+        return np.ma.MaskedArray(values, mask=~valid, copy=False)
+    if encoding == "offsets":
+        return _load_strings(outdir, desc, rows, valid)
+    validate(encoding == "dictionary", f"unknown column encoding {encoding}")
+    codes = _map(outdir, desc["codes"], desc["dtype"], rows)
+    values = _load_strings(outdir, desc["values"], desc["size"], None)
+    return DictionaryColumn(codes, values, valid)
+
+
+def _load_strings(
+    outdir: Path | str, desc: dict[str, Any], rows: int, valid: np.ndarray | None
+) -> StringColumn:
+    """
+    Memory-map a string column.
+
+    Args:
+        outdir: Output directory.
+        desc: Description of column from manifest.
+        rows: Number of values.
+        valid: Validity flags (if any).
+
+    Returns:
+        String view.
+    """
+
+    offsets = _map(outdir, desc["offsets"], OFFSET_DTYPE, rows + 1)
+    data = _map(outdir, desc["data"], "|u1", int(offsets[-1]))
+    return StringColumn(offsets, data, valid)
+
+
+def _map(outdir: Path | str, name: str, dtype: str, count: int) -> np.ndarray:
+    """
+    Memory-map an array read-only after checking its size.
+
+    Args:
+        outdir: Output directory.
+        name: File name.
+        dtype: NumPy type of elements.
+        count: Number of elements expected.
+
+    Returns:
+        Read-only array.
+
+    Raises:
+        ValueError: If the file's size does not match.
+    """
+
+    path = Path(outdir, name)
+    expected = count * np.dtype(dtype).itemsize
+    actual = path.stat().st_size
+    validate(actual == expected, f"{name} has {actual} bytes not {expected}")
+    if count == 0:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", shape=(count,))
+
+
+def _writer(
+    outdir: Path, stem: str, kind: type, nullable: bool, categorical: bool
+) -> Any:
+    """
+    Create a writer for one column.
+
+    Args:
+        outdir: Output directory.
+        stem: File name prefix.
+        kind: Python type of values.
+        nullable: Whether values may be `None`.
+        categorical: Whether to dictionary-encode strings.
+
+    Returns:
+        Column writer.
+    """
+
+    if kind is str:
+        writer: Any = (
+            _DictionaryWriter(outdir, stem)
+            if categorical
+            else _StringWriter(outdir, stem)
+        )
+    else:
+        writer = _NumericWriter(outdir, stem, kind)
+    return _NullableWriter(outdir, stem, writer) if nullable else writer
+
+
+def _resume(outdir: Path, desc: dict[str, Any], rows: int) -> Any:
+    """
+    Reopen a writer for one column written earlier.
+
+    Args:
+        outdir: Output directory.
+        desc: Description of column from manifest.
+        rows: Number of rows already written.
+
+    Returns:
+        Column writer that appends to existing files.
+
+    Raises:
+        ValueError: If the encoding is unknown or a file's size does not match.
+    """
+
+    if "valid" in desc:
+        return _NullableWriter.resume(outdir, desc, rows)
+    encoding = desc["encoding"]
+    if encoding == "plain":
+        return _NumericWriter.resume(outdir, desc, rows)
+    if encoding == "offsets":
+        return _StringWriter.resume(outdir, desc, rows)
+    validate(encoding == "dictionary", f"unknown column encoding {encoding}")
+    return _DictionaryWriter.resume(outdir, desc, rows)
@@ -0,0 +1,266 @@
+"""Compressed CSV output."""
+
+import bz2
+import gzip
+import io
+import lzma
+from collections import deque
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import ExitStack
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO, Any, TextIO
+
+from ._utils import validate
+
+# Compression methods mapped to file suffixes.
+SUFFIXES = {"gzip": ".gz", "bz2": ".bz2", "lzma": ".xz"}
+
+# Compression methods mapped to functions opening compressed files.
+OPENERS: dict[str, Callable[..., Any]] = {
+    "gzip": gzip.open,
+    "bz2": bz2.open,
+    "lzma": lzma.open,
+}
+
+# Compression methods mapped to valid levels.
+LEVELS = {"gzip": range(10), "bz2": range(1, 10), "lzma": range(10)}
+
+# Bytes of text compressed as one block when compressing in parallel.
+BLOCK_SIZE = 1024 * 1024
+
+
+@dataclass(frozen=True)
+class Compression:
+    """
+    Settings for compressed CSV output. Files compressed with several
+    threads are split into blocks that are compressed independently
+    and concatenated; the standard `gzip`, `bz2`, and `lzma` modules
+    (and command-line tools) read such files as if they were one
+    stream, though they are slightly larger.
+
+    Attributes:
+        method: Key in `SUFFIXES`.
+        level: Compression level (default for method if `None`).
+        threads: Number of threads compressing blocks in parallel.
+    """
+
+    method: str = "gzip"
+    level: int | None = None
+    threads: int = 1
+
+    def __post_init__(self):
+        """
+        Validate fields.
+
+        Raises:
+            ValueError: If validation fails.
+        """
+
+        validate(self.method in SUFFIXES, f"unknown compression {self.method}")
+        validate(
+            (self.level is None) or (self.level in LEVELS[self.method]),
+            f"invalid {self.method} compression level {self.level}",
+        )
+        validate(self.threads > 0, "require positive number of threads")
+
+    @property
+    def suffix(self) -> str:
+        """Suffix added to names of compressed files."""
+
+        return SUFFIXES[self.method]
+
+    def compress(self, data: bytes) -> bytes:
+        """
+        Compress a block of data as a complete stream.
+
+        Args:
+            data: Data to compress.
+
+        Returns:
+            Compressed data.
+        """
+
+        if self.method == "gzip":
+            level = 9 if self.level is None else self.level
+            return gzip.compress(data, compresslevel=level, mtime=0)
+        if self.method == "bz2":
+            return bz2.compress(data, 9 if self.level is None else self.level)
+        return lzma.compress(data, preset=self.level)
+
+    def open(self, path: Path, mode: str) -> io.BufferedIOBase:
+        """
+        Open a file for streaming compressed writes.
+
+        Args:
+            path: File to open.
+            mode: "wb" or "ab".
+
+        Returns:
+            Binary stream that compresses what is written to it (and
+            closes the file when it is closed).
+        """
+
+        if self.threads > 1:
+            with ExitStack() as stack:
+                raw = stack.enter_context(open(path, mode))
+                stream = _BlockWriter(raw, self.compress, self.threads)
+                stack.pop_all()
+            return stream
+        if self.method == "gzip":
+            level = 9 if self.level is None else self.level
+            return gzip.GzipFile(path, mode, compresslevel=level, mtime=0)
+        if self.method == "bz2":
+            level = 9 if self.level is None else self.level
+            return bz2.BZ2File(path, mode, compresslevel=level)
+        return lzma.LZMAFile(path, mode, preset=self.level)
+
+
+class _BlockWriter(io.BufferedIOBase):
+    """
+    Binary stream that compresses fixed-size blocks in a thread pool
+    and writes the results in order. At most two blocks per thread
+    are held at once.
+    """
+
+    def __init__(
+        self,
+        raw: IO[bytes],
+        compress: Callable[[bytes], bytes],
+        threads: int,
+        block_size: int = BLOCK_SIZE,
+    ):
+        """
+        Construct writer.
+
+        Args:
+            raw: Stream to write compressed blocks to (closed with this).
+            compress: Function compressing one block.
+            threads: Number of threads.
+            block_size: Bytes of uncompressed data per block.
+        """
+
+        super().__init__()
+        self._raw = raw
+        self._compress = compress
+        self._block_size = block_size
+        self._limit = 2 * threads
+        self._pool = ThreadPoolExecutor(threads)
+        self._pending: deque[Future] = deque()
+        self._buffer = bytearray()
+
+    def writable(self) -> bool:
+        """Stream is writable."""
+
+        return True
+
+    def write(self, data) -> int:  # type: ignore[override]
+        """
+        Buffer data, compressing complete blocks.
+
+        Args:
+            data: Bytes to write.
+
+        Returns:
+            Number of bytes accepted.
+        """
+
+        self._buffer += data
+        while len(self._buffer) >= self._block_size:
+            self._submit(bytes(self._buffer[: self._block_size]))
+            del self._buffer[: self._block_size]
+        return len(data)
+
+    def close(self):
+        """
+        Compress remaining data, write all blocks, and close. If
+        compressing or writing a block fails, blocks not yet started
+        are cancelled.
+        """
+
+        if self.closed:
+            return
+        try:
+            if self._buffer:
+                self._submit(bytes(self._buffer))
+                self._buffer.clear()
+            while self._pending:
+                self._raw.write(self._pending.popleft().result())
+        except BaseException:
+            self._pool.shutdown(cancel_futures=True)
+            raise
+        finally:
+            self._pool.shutdown()
+            self._raw.close()
+            super().close()
+
+    def _submit(self, block: bytes):
+        """
+        Start compressing a block, writing finished blocks if too many
+        are pending.
+
+        Args:
+            block: Uncompressed data.
+        """
+
+        self._pending.append(self._pool.submit(self._compress, block))
+        while len(self._pending) > self._limit:
+            self._raw.write(self._pending.popleft().result())
+
+
+def open_csv(
+    outdir: Path | str,
+    name: str,
+    mode: str = "r",
+    compression: Compression | None = None,
+) -> TextIO:
+    """
+    Open `<name>.csv` in a directory as text, adding a suffix and
+    compressing it if requested. Files are read or appended to in
+    whichever format they already have; writing a file removes copies
+    of it in other formats.
+
+    Args:
+        outdir: Directory.
+        name: File name without extension.
+        mode: "r", "w", or "a".
+        compression: How to compress files being written.
+
+    Returns:
+        Text stream.
+
+    Raises:
+        FileNotFoundError: If reading and the file does not exist.
+    """
+
+    assert mode in ("r", "w", "a"), f"invalid mode {mode}"
+    plain = Path(outdir, f"{name}.csv")
+    existing = [
+        method
+        for method, suffix in SUFFIXES.items()
+        if Path(f"{plain}{suffix}").is_file()
+    ]
+
+    if mode == "r":
+        if plain.is_file() or not existing:
+            return open(plain, "r", newline="")
+        path = Path(f"{plain}{SUFFIXES[existing[0]]}")
+        return OPENERS[existing[0]](path, "rt", encoding="utf-8", newline="")
+
+    if mode == "a" and (plain.is_file() or existing):
+        compression = None if plain.is_file() else Compression(existing[0])
+    else:
+        for method in existing:
+            Path(f"{plain}{SUFFIXES[method]}").unlink()
+        if compression is not None:
+            plain.unlink(missing_ok=True)
+
+    if compression is None:
+        return open(plain, mode, newline="")
+    path = Path(f"{plain}{compression.suffix}")
+    with ExitStack() as stack:
+        binary = stack.enter_context(compression.open(path, f"{mode}b"))
+        text = io.TextIOWrapper(binary, encoding="utf-8", newline="")
+        stack.pop_all()
+    return text
@@ -0,0 +1,422 @@
+"""Per-stage timing and throughput metrics."""
+
+import json
+import statistics
+import sys
+import time
+import tracemalloc
+from collections.abc import Callable, Iterator
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+from dataclasses import fields
+from pathlib import Path
+from typing import Any, TextIO
+
+try:
+    import resource
+except ImportError:  # pragma: no cover
+    resource = None
+
+from .parameters import JSON_INDENT
+
+# Name of metrics file in output directory.
+METRICS_FILE = "metrics.json"
+
+# Default number of allocation sites reported per stage when profiling memory.
+TOP_SITES = 5
+
+# Number of objects sampled to estimate sizes per field.
+SIZE_SAMPLE = 1000
+
+# Linux files used to reset and read this process's peak resident set size.
+CLEAR_REFS = Path("/proc/self/clear_refs")
+PROC_STATUS = Path("/proc/self/status")
+
+# Allocations to ignore when comparing snapshots (including this module's).
+SNAPSHOT_FILTERS = [
+    tracemalloc.Filter(False, __file__),
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+]
+
+# Columns of metrics table: key, heading, width, and format.
+COLUMNS = [
+    ("stage", "stage", 10, "{}"),
+    ("wall", "wall (s)", 10, "{:.3f}"),
+    ("cpu", "cpu (s)", 10, "{:.3f}"),
+    ("rows", "rows", 10, "{}"),
+    ("rows_per_sec", "rows/s", 12, "{:.0f}"),
+    ("bytes", "bytes", 12, "{}"),
+    ("peak_rss", "peak RSS", 12, "{}"),
+]
+
+
+class Metrics:
+    """
+    Record wall time, CPU time, rows produced, bytes written, and peak
+    resident set size for named stages of a run. Peak RSS is measured
+    within each stage where the platform allows the high-water mark to
+    be reset (Linux); the process's peak since startup is also saved.
+    Bytes written are the sizes of files created or rewritten in the
+    stage's output directory, or the growth of files that earlier stages
+    wrote (such as the database). If memory profiling is
+    enabled (which requires `tracemalloc` to be tracing), each stage
+    also records the memory it retained, its peak traced memory, and
+    the allocation sites that grew most, and tables record the average
+    size of their objects and fields (see `sizes`). A single stage may
+    also be run inside a profiler.
+
+    Attributes:
+        stages: One dictionary per completed stage, in order.
+        memory: Whether to profile memory.
+        top: Number of allocation sites to report per stage.
+        profile_stage: Name of stage to run inside `profiler`.
+        profiler: Function creating a context manager that profiles.
+    """
+
+    def __init__(
+        self,
+        memory: bool = False,
+        top: int = TOP_SITES,
+        profile_stage: str | None = None,
+        profiler: Callable[[], AbstractContextManager] | None = None,
+    ):
+        """
+        Construct empty record.
+
+        Args:
+            memory: Whether to profile memory.
+            top: Number of allocation sites to report per stage.
+            profile_stage: Name of stage to profile (if any).
+            profiler: Function creating a context manager that profiles.
+        """
+
+        self.stages: list[dict[str, Any]] = []
+        self.memory = memory
+        self.top = top
+        self.profile_stage = profile_stage
+        self.profiler = profiler
+        self._snapshot: tracemalloc.Snapshot | None = None
+        self._open: list[dict[str, Any]] = []
+        self._written: dict[Path, tuple[int, int]] = {}
+
+    @contextmanager
+    def stage(self, name: str, outdir: Path | str | None = None) -> Iterator[dict]:
+        """
+        Measure a stage. The caller may set `rows` in the yielded record;
+        bytes written are measured from the files in `outdir` that change
+        during the stage (see `_written_bytes`). Stages may be nested.
+
+        Args:
+            name: Stage name.
+            outdir: Directory the stage writes to (if any).
+
+        Yields:
+            Record for the stage.
+        """
+
+        record: dict[str, Any] = {
+            "stage": name,
+            "rows": None,
+            "bytes": None,
+            "peak_rss": None,
+        }
+        profiling = self.memory and tracemalloc.is_tracing()
+        if profiling:
+            if self._snapshot is None:
+                self._snapshot = _snapshot()
+            traced = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        profiled = (name == self.profile_stage) and (self.profiler is not None)
+        before = _file_states(outdir) if outdir is not None else {}
+        for outer in self._open:
+            _raise_peak(outer, _current_peak_rss())
+        local_peak = _reset_peak_rss()
+        self._open.append(record)
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            with self.profiler() if profiled else nullcontext():  # type: ignore[misc]
+                yield record
+        finally:
+            if profiling:
+                self._profile(record, traced)
+            record["wall"] = time.perf_counter() - wall
+            record["cpu"] = time.process_time() - cpu
+            self._open.remove(record)
+            if outdir is not None:
+                record["bytes"] = _written_bytes(outdir, before, self._written)
+            rows = record["rows"]
+            record["rows_per_sec"] = (
+                rows / record["wall"] if rows and record["wall"] > 0 else None
+            )
+            if local_peak:
+                _raise_peak(record, _current_peak_rss())
+            record["process_peak_rss"] = _peak_rss()
+            self.stages.append(record)
+
+    def _profile(self, record: dict[str, Any], traced: int):
+        """
+        Record memory retained by a stage and the allocation sites that
+        grew most since the previous stage.
+
+        Args:
+            record: Record for the stage.
+            traced: Traced memory at the start of the stage.
+        """
+
+        current, peak = tracemalloc.get_traced_memory()
+        record["retained"] = current - traced
+        record["traced_peak"] = peak
+        snapshot = _snapshot()
+        stats = snapshot.compare_to(self._snapshot, "lineno")  # type: ignore[arg-type]
+        record["top"] = [
+            {
+                "site": f"{s.traceback[0].filename}:{s.traceback[0].lineno}",
+                "size": s.size_diff,
+                "count": s.count_diff,
+            }
+            for s in stats[: self.top]
+        ]
+        self._snapshot = snapshot
+
+    def report(self, stream: TextIO = sys.stderr):
+        """
+        Print metrics as a table, followed by memory profiles (if any).
+
+        Args:
+            stream: Where to print.
+        """
+
+        print(_row({key: heading for key, heading, _, _ in COLUMNS}), file=stream)
+        for record in self.stages:
+            cells = {
+                key: "-" if record[key] is None else fmt.format(record[key])
+                for key, _, _, fmt in COLUMNS
+            }
+            print(_row(cells), file=stream)
+
+        for record in self.stages:
+            if "retained" not in record:
+                continue
+            print(
+                f"\n{record['stage']}: retained {record['retained']} bytes, "
+                f"traced peak {record['traced_peak']} bytes",
+                file=stream,
+            )
+            if "bytes_per_object" in record:
+                print(
+                    f"  {record['bytes_per_object']:.0f} bytes per object", file=stream
+                )
+                for name, size in record["bytes_per_field"].items():
+                    print(f"    {name}: {size:.0f} bytes", file=stream)
+            for site in record["top"]:
+                print(
+                    f"  {site['size']:+d} bytes in {site['count']:+d} blocks "
+                    f"at {site['site']}",
+                    file=stream,
+                )
+
+    def sizes(self, record: dict[str, Any], objects: list):
+        """
+        Record the average size of a sample of a table's objects and of
+        each of their fields (including the elements of list fields)
+        when profiling memory.
+
+        Args:
+            record: Record yielded by `stage`.
+            objects: Dataclass objects produced by the stage.
+        """
+
+        if not (self.memory and objects):
+            return
+        sample = objects[:SIZE_SAMPLE]
+        names = [f.name for f in fields(sample[0])]
+        per_field = {
+            name: statistics.fmean(_deep_size(getattr(obj, name)) for obj in sample)
+            for name in names
+        }
+        record["bytes_per_field"] = per_field
+        record["bytes_per_object"] = statistics.fmean(
+            sys.getsizeof(obj) for obj in sample
+        ) + sum(per_field.values())
+
+    def save(self, outdir: Path | str):
+        """
+        Save metrics as JSON.
+
+        Args:
+            outdir: Output directory.
+        """
+
+        with open(Path(outdir, METRICS_FILE), "w") as writer:
+            json.dump({"stages": self.stages}, writer, indent=JSON_INDENT)
+
+
+def _current_peak_rss() -> int | None:
+    """
+    Get this process's resident set size high-water mark, which may
+    have been reset by `_reset_peak_rss`.
+
+    Returns:
+        Size in bytes (or `None` if not available on this platform).
+    """
+
+    try:
+        with open(PROC_STATUS, "r") as reader:
+            for line in reader:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def _deep_size(value: Any) -> int:
+    """
+    Estimate memory used by a value, including the elements of lists,
+    tuples, and dictionaries (but not anything they refer to).
+
+    Args:
+        value: Value to measure.
+
+    Returns:
+        Size in bytes.
+    """
+
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple)):
+        size += sum(sys.getsizeof(v) for v in value)
+    return size
+
+
+def _file_states(dirname: Path | str) -> dict[Path, tuple[int, int, int]]:
+    """
+    Identify the files directly inside a directory.
+
+    Args:
+        dirname: Directory (which need not exist).
+
+    Returns:
+        Paths mapped to inode number, size, and modification time.
+    """
+
+    dirpath = Path(dirname)
+    if not dirpath.is_dir():
+        return {}
+    result = {}
+    for path in dirpath.iterdir():
+        stat = path.stat()
+        if path.is_file():
+            result[path] = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+    return result
+
+
+def _peak_rss() -> int | None:
+    """
+    Get peak resident set size of this process so far.
+
+    Returns:
+        Size in bytes (or `None` if not available on this platform).
+    """
+
+    if resource is None:  # pragma: no cover
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _raise_peak(record: dict[str, Any], peak: int | None):
+    """
+    Raise the peak RSS of a stage's record to at least a value.
+
+    Args:
+        record: Record for the stage.
+        peak: Size in bytes (ignored if `None`).
+    """
+
+    if peak is not None:
+        record["peak_rss"] = max(record["peak_rss"] or 0, peak)
+
+
+def _reset_peak_rss() -> bool:
+    """
+    Reset this process's resident set size high-water mark to its
+    current resident set size (possible on Linux only).
+
+    Returns:
+        Whether the high-water mark was reset.
+    """
+
+    try:
+        with open(CLEAR_REFS, "w") as writer:
+            writer.write("5")
+    except OSError:
+        return False
+    return _current_peak_rss() is not None
+
+
+def _row(cells: dict[str, str]) -> str:
+    """
+    Format one row of the metrics table, left-aligning the stage name
+    and right-aligning numbers.
+
+    Args:
+        cells: Column keys mapped to text.
+
+    Returns:
+        Formatted row.
+    """
+
+    return " ".join(
+        cells[key].ljust(width) if key == "stage" else cells[key].rjust(width)
+        for key, _, width, _ in COLUMNS
+    )
+
+
+def _snapshot() -> tracemalloc.Snapshot:
+    """
+    Take a snapshot of traced memory, ignoring allocations by the
+    import system, by `tracemalloc`, and by this module.
+
+    Returns:
+        Filtered snapshot.
+    """
+
+    return tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+
+
+def _written_bytes(
+    dirname: Path | str,
+    before: dict[Path, tuple[int, int, int]],
+    written: dict[Path, tuple[int, int]],
+) -> int:
+    """
+    Calculate bytes written to files directly inside a directory since
+    its files were identified. Files that are new, replaced, or changed
+    count in full, except that files last written by an earlier stage
+    and since extended in place count only by how much they grew.
+
+    Args:
+        dirname: Directory (which need not exist).
+        before: Result of `_file_states` at the start of the stage.
+        written: Files written by earlier stages mapped to inode number
+            and size then (updated with this stage's files).
+
+    Returns:
+        Size in bytes.
+    """
+
+    total = 0
+    for path, (ino, size, mtime) in _file_states(dirname).items():
+        if before.get(path) == (ino, size, mtime):
+            continue
+        previous = written.get(path)
+        if (previous is not None) and (previous[0] == ino) and (size >= previous[1]):
+            total += size - previous[1]
+        else:
+            total += size
+        written[path] = (ino, size)
+    return total
@@ -0,0 +1,165 @@
+"""Estimate rows, output size, memory, and time for a parameter set."""
+
+import json
+from collections.abc import Collection
+from functools import cache
+from pathlib import Path
+from typing import Any
+
+from ._base_mixin import BaseMixin
+from .assay import Assay
+from .grid import Grid
+from .machine import Machine
+from .parameters import Parameters
+from .person import Person
+from .rating import Rating
+from .species import Species
+from .specimen import Specimen
+
+# Constants measured by `benchmarks/bench.py --calibrate`.
+CALIBRATION_FILE = Path(__file__).parent / "calibration.json"
+
+# Classes whose tables are estimated.
+CLASSES: list[type[BaseMixin]] = [
+    Grid,
+    Machine,
+    Person,
+    Rating,
+    Assay,
+    Species,
+    Specimen,
+]
+
+# Tables with one genome per row, whose per-row sizes are adjusted by
+# the difference between `genome_length` and its calibrated value.
+GENOME_TABLES = {"species", "specimen"}
+
+# Size of header of `.npy` files.
+NPY_HEADER = 128
+
+# Bytes per grid cell in `.npy` files.
+NPY_CELL = 8
+
+# Bytes per megabyte (for messages).
+MB = 1024 * 1024
+
+
+def exceeded(
+    estimate: dict[str, Any],
+    memory_limit: int | None = None,
+    disk_limit: int | None = None,
+) -> list[str]:
+    """
+    Check an estimate against resource limits.
+
+    Args:
+        estimate: Result of `plan`.
+        memory_limit: Maximum peak memory in bytes (if any).
+        disk_limit: Maximum total output size in bytes (if any).
+
+    Returns:
+        Descriptions of limits that will be exceeded (empty if none).
+    """
+
+    result = []
+    if (memory_limit is not None) and (estimate["memory"] > memory_limit):
+        result.append(
+            f"estimated peak memory {estimate['memory'] / MB:.0f} MB "
+            f"exceeds limit of {memory_limit / MB:.0f} MB"
+        )
+    if (disk_limit is not None) and (estimate["total_bytes"] > disk_limit):
+        result.append(
+            f"estimated output {estimate['total_bytes'] / MB:.0f} MB "
+            f"exceeds limit of {disk_limit / MB:.0f} MB"
+        )
+    return result
+
+
+@cache
+def load_calibration(path: Path | str = CALIBRATION_FILE) -> dict[str, Any]:
+    """
+    Load calibration constants.
+
+    Args:
+        path: Calibration file.
+
+    Returns:
+        Constants saved by `benchmarks/bench.py --calibrate`.
+    """
+
+    with open(path, "r") as reader:
+        return json.load(reader)
+
+
+def plan(
+    params: Parameters,
+    compact: bool = False,
+    budget: int | None = None,
+    batched: Collection[type[BaseMixin]] = (),
+    calibration: dict[str, Any] | None = None,
+    npy: bool = False,
+) -> dict[str, Any]:
+    """
+    Estimate the resources needed to generate data without generating
+    it. Row counts are exact (except for sparse grids, whose cells are
+    counted as if dense); output sizes, memory, and time are scaled
+    from per-row constants measured by the benchmark suite, so they
+    are approximate and specific to the machine that measured them.
+    Summary tables are not included.
+
+    Args:
+        params: Data synthesis parameters.
+        compact: Use integer surrogate keys.
+        budget: Bytes of Python objects in each chunk of large tables.
+        batched: Classes generated in chunks if there is a budget.
+        calibration: Constants to use (default from `CALIBRATION_FILE`).
+        npy: Whether grids are also saved as `.npy` files.
+
+    Returns:
+        Dictionary with `rows` (table names mapped to row counts),
+        `bytes` (output formats mapped to sizes), `total_bytes`,
+        `memory` (peak resident memory in bytes), and `seconds`.
+    """
+
+    calibration = calibration if calibration is not None else load_calibration()
+    extra = params.genome_length - calibration["params"]["genome_length"]
+    constants = {}
+    for table, values in calibration["tables"].items():
+        adjust = extra if table in GENOME_TABLES else 0
+        constants[table] = {
+            key: value if key == "seconds" else value + adjust
+            for key, value in values.items()
+        }
+    db_key = "db_compact" if compact else "db"
+
+    rows: dict[str, int] = {}
+    held = 0.0
+    for cls in CLASSES:
+        counts = cls.num_rows(params)
+        rows.update(counts)
+        if (budget is None) or (cls not in batched):
+            held += sum(num * constants[t]["memory"] for t, num in counts.items())
+
+    nbytes = {
+        "csv": round(sum(num * constants[t]["csv"] for t, num in rows.items())),
+        "db": round(sum(num * constants[t][db_key] for t, num in rows.items())),
+        "npy": (
+            params.num_grids * (NPY_HEADER + NPY_CELL * params.grid_size**2)
+            if npy
+            else 0
+        ),
+        "png": round(
+            params.num_grids * params.grid_size**2 * calibration["png_per_cell"]
+        ),
+    }
+    memory = calibration["base_memory"] + calibration["peak_ratio"] * held
+    if budget is not None:
+        memory += budget
+
+    return {
+        "rows": rows,
+        "bytes": nbytes,
+        "total_bytes": sum(nbytes.values()),
+        "memory": round(memory),
+        "seconds": sum(num * constants[t]["seconds"] for t, num in rows.items()),
+    }
@@ -0,0 +1,144 @@
+"""CPU profiling with saved statistics and flame-graph output."""
+
+import cProfile
+import pstats
+import sys
+from collections import defaultdict
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from types import CodeType
+from typing import TextIO
+
+# Default key for sorting printed statistics.
+SORT_KEY = pstats.SortKey.CUMULATIVE.value
+
+# Keys statistics can be sorted by.
+SORT_KEYS = sorted(pstats.Stats.sort_arg_dict_default)
+
+# Default number of functions to print.
+NUM_STATS = 20
+
+# Maximum depth of collapsed stacks.
+MAX_STACK_DEPTH = 64
+
+# Collapsed stacks taking less than this many seconds are dropped.
+MIN_STACK_TIME = 1e-6
+
+# Type definitions.
+FuncType = CodeType | str
+
+
+@contextmanager
+def profile_context(
+    enabled: bool = False,
+    num_stats: int = NUM_STATS,
+    sort: str = SORT_KEY,
+    output: Path | str | None = None,
+    collapsed: Path | str | None = None,
+    stream: TextIO = sys.stderr,
+) -> Iterator[cProfile.Profile | None]:
+    """
+    Context manager for optional profiling. Statistics are printed to
+    `stream` (so that they do not mix with data written to standard
+    output) and may also be saved in `pstats` format and/or as
+    collapsed stacks for flame graph tools (see `collapsed_stacks`).
+
+    Args:
+        enabled: Whether to profile.
+        num_stats: Number of functions to print (0 to print none).
+        sort: Key to sort printed statistics by (see `SORT_KEYS`).
+        output: Where to save statistics in `pstats` format (if anywhere).
+        collapsed: Where to save collapsed stacks (if anywhere).
+        stream: Where to print statistics.
+
+    Yields:
+        Profiler (or `None` if not enabled).
+    """
+
+    if not enabled:
+        yield None
+        return
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        stats = pstats.Stats(profiler, stream=stream)
+        if output is not None:
+            stats.dump_stats(output)
+        if collapsed is not None:
+            with open(collapsed, "w") as writer:
+                for stack, micros in sorted(collapsed_stacks(profiler).items()):
+                    print(f"{stack} {micros}", file=writer)
+        if num_stats:
+            stats.sort_stats(sort)
+            stats.print_stats(num_stats)
+
+
+def collapsed_stacks(
+    profiler: cProfile.Profile, max_depth: int = MAX_STACK_DEPTH
+) -> dict[str, int]:
+    """
+    Convert profile statistics to collapsed stacks (semicolon-separated
+    function names mapped to time in microseconds) as used by flame
+    graph tools. `cProfile` only records caller/callee pairs, so the
+    time a function spends when reached by a particular path is
+    estimated by dividing its time among its callers in proportion to
+    the time each caller spent on that path. Recursive calls are not
+    expanded.
+
+    Args:
+        profiler: Profiler that has collected statistics.
+        max_depth: Maximum number of frames in a stack.
+
+    Returns:
+        Stacks mapped to time in microseconds.
+    """
+
+    entries = {entry.code: entry for entry in profiler.getstats()}
+    called = {sub.code for entry in entries.values() for sub in entry.calls or ()}
+
+    result: dict[str, float] = defaultdict(float)
+
+    def walk(func: FuncType, path: list[FuncType], own: float, total: float):
+        path = [*path, func]
+        result[";".join(_frame_name(f) for f in path)] += own
+        func_total = entries[func].totaltime
+        if (len(path) >= max_depth) or (func_total <= 0):
+            return
+        scale = total / func_total
+        for sub in entries[func].calls or ():
+            if (sub.code not in path) and (sub.totaltime * scale >= MIN_STACK_TIME):
+                walk(sub.code, path, sub.inlinetime * scale, sub.totaltime * scale)
+
+    for func, entry in entries.items():
+        if func not in called:
+            walk(func, [], entry.inlinetime, entry.totaltime)
+
+    return {
+        stack: round(seconds * 1_000_000)
+        for stack, seconds in result.items()
+        if round(seconds * 1_000_000) > 0
+    }
+
+
+def _frame_name(func: FuncType) -> str:
+    """
+    Name a function in a collapsed stack.
+
+    Args:
+        func: Code object (or description of a built-in function)
+            from profile statistics.
+
+    Returns:
+        Name with any semicolons or spaces replaced.
+    """
+
+    if isinstance(func, str):
+        name = func
+    else:
+        name = f"{func.co_filename}:{func.co_firstlineno}({func.co_name})"
+    return name.replace(";", ",").replace(" ", "_")
@@ -0,0 +1,348 @@
+"""Serve generated databases to local clients from a long-lived process."""
+
+import argparse
+import json
+import os
+import shutil
+import signal
+import socketserver
+import sys
+import tempfile
+import threading
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, BinaryIO
+from urllib.parse import parse_qs, urlparse
+
+from .cache import CACHE_DIR_VAR, DiskCache
+from .main import _db_key, _warm_up, in_memory
+from .parameters import Parameters
+
+# Default address for HTTP server.
+HOST = "127.0.0.1"
+PORT = 8765
+
+# Content type of database files.
+DB_CONTENT_TYPE = "application/vnd.sqlite3"
+
+# Size of blocks used to stream database files.
+BLOCK_SIZE = 1024 * 1024
+
+
+class Datasets:
+    """
+    Generate databases on request and keep them in an on-disk cache.
+    Synthesis uses process-wide state (identifiers and the random
+    stream), so only one database is generated at a time; requests for
+    cached databases do not wait for generation. Databases are opened
+    before they are handed out, so a file that is evicted while it is
+    being sent stays readable until it is closed.
+
+    Attributes:
+        cache: Where generated databases are kept.
+        generated: Number of databases generated.
+        requests: Number of requests answered.
+    """
+
+    def __init__(self, cache: DiskCache):
+        """
+        Construct dataset store.
+
+        Args:
+            cache: Where generated databases are kept.
+        """
+
+        self.cache = cache
+        self.generated = 0
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._count_lock = threading.Lock()
+
+    def open_db(
+        self,
+        params: Parameters,
+        compact: bool = False,
+        indexes: bool = True,
+        summaries: bool = False,
+    ) -> tuple[str, Path, BinaryIO]:
+        """
+        Find or generate the database for parameters and options and
+        open it. Within this process, eviction only happens while a
+        database is generated, so a file found missing is regenerated,
+        and a generated file is opened before the generation lock is
+        released.
+
+        Args:
+            params: Data synthesis parameters.
+            compact: Use integer surrogate keys.
+            indexes: Create default secondary indexes.
+            summaries: Materialize summary tables after loading.
+
+        Returns:
+            Cache key, path to database file, and open binary stream
+            (which the caller must close).
+
+        Raises:
+            LookupError: If the database could not be kept in the cache.
+        """
+
+        options: dict[str, Any] = {
+            "compact": compact,
+            "indexes": None if indexes else {},
+            "summaries": summaries,
+        }
+        key = _db_key(params, **options)
+        with self._count_lock:
+            self.requests += 1
+        if (found := self._open(key)) is not None:
+            return key, *found
+        with self._lock:
+            if (found := self._open(key)) is None:
+                in_memory(params, cache=None, disk_cache=self.cache, **options).close()
+                self.generated += 1
+                found = self._open(key)
+        if found is None:
+            raise LookupError(f"database {key} was evicted from the cache")
+        return key, *found
+
+    def _open(self, key: str) -> tuple[Path, BinaryIO] | None:
+        """
+        Open a cached database.
+
+        Args:
+            key: Cache key.
+
+        Returns:
+            Path and open binary stream (or `None` if not cached).
+        """
+
+        if (path := self.cache.db_path(key)) is None:
+            return None
+        try:
+            return path, open(path, "rb")
+        except FileNotFoundError:
+            return None
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """
+    Answer requests:
+
+    - `GET /health`: report status and counts as JSON.
+    - `POST /db`: body is a JSON object with `params` (fields of
+      `Parameters`; others take default values) and optional boolean
+      `compact`, `indexes`, and `summaries`. With `?format=path` (the
+      default) the reply is a JSON object with the cache `key` and the
+      database's `path` (which may later be evicted); with
+      `?format=bytes` it is the database itself. Failures are reported
+      as JSON: 503 if the database could not be kept in the cache and
+      500 if generation failed.
+    """
+
+    server: "_HTTPServer | _UnixServer"
+
+    def address_string(self) -> str:
+        """Describe client (Unix socket clients have no address)."""
+
+        if isinstance(self.client_address, tuple):
+            return super().address_string()
+        return "local"
+
+    def do_GET(self):
+        """Report status."""
+
+        if urlparse(self.path).path != "/health":
+            self._reply_json(HTTPStatus.NOT_FOUND, {"error": "unknown path"})
+            return
+        datasets = self.server.datasets
+        self._reply_json(
+            HTTPStatus.OK,
+            {
+                "status": "ok",
+                "generated": datasets.generated,
+                "requests": datasets.requests,
+            },
+        )
+
+    def do_POST(self):
+        """Find or generate a database."""
+
+        url = urlparse(self.path)
+        if url.path != "/db":
+            self._reply_json(HTTPStatus.NOT_FOUND, {"error": "unknown path"})
+            return
+        fmt = parse_qs(url.query).get("format", ["path"])[0]
+        if fmt not in ("path", "bytes"):
+            error = {"error": f"unknown format {fmt}"}
+            self._reply_json(HTTPStatus.BAD_REQUEST, error)
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            params = Parameters(**request.get("params", {}))
+            options = {
+                name: bool(request.get(name, default))
+                for name, default in (
+                    ("compact", False),
+                    ("indexes", True),
+                    ("summaries", False),
+                )
+            }
+        except (AttributeError, TypeError, ValueError) as exc:
+            self._reply_json(HTTPStatus.BAD_REQUEST, {"error": str(exc)})
+            return
+
+        try:
+            key, path, reader = self.server.datasets.open_db(params, **options)
+        except LookupError as exc:
+            self._reply_json(HTTPStatus.SERVICE_UNAVAILABLE, {"error": str(exc)})
+            return
+        except Exception as exc:  # noqa: BLE001 (reply instead of dropping)
+            self.log_error("generation failed: %r", exc)
+            error = {"error": f"generation failed: {exc}"}
+            self._reply_json(HTTPStatus.INTERNAL_SERVER_ERROR, error)
+            return
+
+        with reader:
+            if fmt == "path":
+                self._reply_json(HTTPStatus.OK, {"key": key, "path": str(path)})
+                return
+            self.send_response(HTTPStatus.OK)
+            self.send_header("Content-Type", DB_CONTENT_TYPE)
+            size = os.fstat(reader.fileno()).st_size
+            self.send_header("Content-Length", str(size))
+            self.send_header("X-Snailz-Key", key)
+            self.end_headers()
+            shutil.copyfileobj(reader, self.wfile, BLOCK_SIZE)
+
+    def _reply_json(self, status: HTTPStatus, body: dict[str, Any]):
+        """
+        Send a JSON reply.
+
+        Args:
+            status: HTTP status.
+            body: Data to send.
+        """
+
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class _HTTPServer(ThreadingHTTPServer):
+    """Threaded HTTP server listening on a port."""
+
+    datasets: Datasets
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Threaded HTTP server listening on a Unix socket."""
+
+    daemon_threads = True
+    datasets: Datasets
+
+
+def main(argv: list[str] | None = None) -> int:
+    """
+    Command-line driver for `snailz serve`.
+
+    Args:
+        argv: Command-line arguments after `serve` (default from `sys.argv`).
+
+    Returns:
+        Exit status.
+    """
+
+    args = _parse_args(argv)
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    with tempfile.TemporaryDirectory() as scratch:
+        datasets = Datasets(DiskCache(args.cache_dir or scratch))
+        server = serve(datasets, args.host, args.port, args.socket)
+        print(f"serving on {_address(server)}", file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            if args.socket:
+                Path(args.socket).unlink(missing_ok=True)
+    return 0
+
+
+def serve(
+    datasets: Datasets,
+    host: str = HOST,
+    port: int = PORT,
+    socket_path: Path | str | None = None,
+) -> _HTTPServer | _UnixServer:
+    """
+    Create a server (without starting it). Name generators for the
+    default locale are loaded first so that the first request does
+    not pay for them.
+
+    Args:
+        datasets: Where to find or generate databases.
+        host: Host to listen on.
+        port: Port to listen on (0 to choose one).
+        socket_path: Unix socket to listen on instead of HTTP port.
+
+    Returns:
+        Server whose `serve_forever` method answers requests.
+    """
+
+    _warm_up([Parameters().locale])
+    server: _HTTPServer | _UnixServer
+    if socket_path is None:
+        server = _HTTPServer((host, port), _Handler)
+    else:
+        server = _UnixServer(str(socket_path), _Handler)
+    server.datasets = datasets
+    return server
+
+
+def _address(server: _HTTPServer | _UnixServer) -> str:
+    """
+    Describe the address a server is listening on.
+
+    Args:
+        server: Server.
+
+    Returns:
+        URL or socket path.
+    """
+
+    if isinstance(server.server_address, tuple):
+        host, port = server.server_address[:2]
+        return f"http://{host}:{port}"
+    return str(server.server_address)
+
+
+def _parse_args(argv: list[str] | None) -> argparse.Namespace:
+    """
+    Parse command-line arguments.
+
+    Args:
+        argv: Arguments to parse.
+
+    Returns:
+        Object holding values from command-line arguments.
+    """
+
+    parser = argparse.ArgumentParser(prog="snailz serve")
+    parser.add_argument(
+        "--cache-dir",
+        default=os.environ.get(CACHE_DIR_VAR),
+        help=f"cache of databases (default ${CACHE_DIR_VAR} or temporary)",
+    )
+    parser.add_argument("--host", default=HOST, help="host to listen on")
+    parser.add_argument("--port", type=int, default=PORT, help="port to listen on")
+    parser.add_argument(
+        "--socket", default=None, help="Unix socket to listen on instead of a port"
+    )
+    return parser.parse_args(argv)
@@ -0,0 +1,147 @@
+"""Precomputed summary tables for analysis queries."""
+
+from sqlite_utils import Database
+
+from ._base_mixin import COMPACT_KEY
+from ._utils import lat_lon
+
+# Prefix for names of summary tables.
+SUMMARY_PREFIX = "summary_"
+
+# Number of equal-width bins in specimen histograms.
+HISTOGRAM_BINS = 10
+
+# Pollution statistics per grid ({key} filled in). Cells missing from
+# `grid_cells` (as in sparse grids) count as zero.
+SUMMARY_GRID = """
+create table summary_grid as
+select
+    g.{key} as grid_id,
+    g.size * g.size as num_cells,
+    coalesce(sum(c.value > 0.0), 0) as num_polluted,
+    case
+        when count(c.value) < g.size * g.size then min(coalesce(min(c.value), 0.0), 0.0)
+        else min(c.value)
+    end as min_value,
+    coalesce(max(c.value), 0.0) as max_value,
+    coalesce(sum(c.value), 0.0) / (g.size * g.size) as mean_value
+from grid as g left join grid_cells as c on c.grid_id = g.{key}
+group by g.{key}
+"""
+
+# Assay reading aggregates per machine or person ({group} and {key} filled in).
+SUMMARY_ASSAY = """
+create table summary_assay_by_{name} as
+select
+    a.{group} as {group},
+    r.contents as contents,
+    count(distinct a.{key}) as num_assays,
+    count(*) as num_readings,
+    min(r.reading) as min_reading,
+    max(r.reading) as max_reading,
+    avg(r.reading) as mean_reading
+from assay as a join assay_readings as r on r.assay_id = a.{key}
+group by a.{group}, r.contents
+"""
+
+# Mass and diameter histograms by grid and variety ({bins} filled in).
+# Specimens are located by grid extent (see `_grid_bounds`) rather than
+# by joining `grid_cells`, which may omit zero cells.
+SUMMARY_SPECIMEN_HISTOGRAM = """
+create table summary_specimen_histogram as
+with located as (
+    select
+        gb.grid_id as grid_id,
+        coalesce(s.variety, 'unknown') as variety,
+        s.mass as mass,
+        s.diameter as diameter
+    from specimen as s join temp.grid_bounds as gb
+    on s.lat between gb.lat_lo and gb.lat_hi and s.lon between gb.lon_lo and gb.lon_hi
+),
+measured as (
+    select grid_id, variety, 'mass' as measure, mass as value from located
+    union all
+    select grid_id, variety, 'diameter' as measure, diameter as value from located
+),
+bounds as (
+    select measure, min(value) as lo, (max(value) - min(value)) / {bins} as width
+    from measured
+    group by measure
+),
+binned as (
+    select
+        m.grid_id as grid_id,
+        m.variety as variety,
+        m.measure as measure,
+        coalesce(min(cast((m.value - b.lo) / nullif(b.width, 0.0) as integer), {bins} - 1), 0) as bin,
+        b.lo as lo,
+        b.width as width
+    from measured as m join bounds as b on m.measure = b.measure
+)
+select
+    grid_id,
+    variety,
+    measure,
+    bin,
+    lo + bin * width as bin_lo,
+    lo + (bin + 1) * width as bin_hi,
+    count(*) as num_specimens
+from binned
+group by grid_id, variety, measure, bin
+"""
+
+
+def summarize(db: Database, compact: bool = False, bins: int = HISTOGRAM_BINS):
+    """
+    Materialize summary tables after all data has been loaded so that
+    dashboards can query small aggregates instead of raw tables.
+
+    Args:
+        db: Database connector.
+        compact: Whether the database uses the compact schema.
+        bins: Number of bins in specimen histograms.
+    """
+
+    assert bins > 0, f"require positive number of histogram bins not {bins}"
+    key = COMPACT_KEY if compact else "ident"
+
+    with db.conn:
+        db.execute(SUMMARY_GRID.format(key=key))
+        for name, group in (("machine", "machine_id"), ("person", "person_id")):
+            db.execute(SUMMARY_ASSAY.format(name=name, group=group, key=key))
+        _grid_bounds(db, key)
+        db.execute(SUMMARY_SPECIMEN_HISTOGRAM.format(bins=int(bins)))
+        db.execute("drop table temp.grid_bounds")
+
+    tables = [
+        name
+        for name in db.table_names()
+        if not name.startswith(("sqlite_", SUMMARY_PREFIX))
+    ]
+    db["summary_table_counts"].insert_all(  # type: ignore[possibly-missing-attribute]
+        {"name": name, "records": db[name].count} for name in tables
+    )
+
+
+def _grid_bounds(db: Database, key: str):
+    """
+    Create temporary table of the latitude and longitude ranges of the
+    cells of each grid.
+
+    Args:
+        db: Database connector.
+        key: Name of grid key column.
+    """
+
+    db.execute(
+        "create temp table grid_bounds "
+        "(grid_id, lat_lo real, lat_hi real, lon_lo real, lon_hi real)"
+    )
+    rows = []
+    for grid_id, size, spacing, lat0, lon0 in db.execute(
+        f"select {key}, size, spacing, lat0, lon0 from grid"
+    ).fetchall():
+        extent = (size - 1) * spacing
+        lat_hi, lon_hi = lat_lon(lat0, lon0, extent, extent)
+        rows.append((grid_id, lat0, lat_hi, lon0, lon_hi))
+    db.conn.executemany("insert into temp.grid_bounds values (?, ?, ?, ?, ?)", rows)
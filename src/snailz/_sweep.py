@@ -0,0 +1,210 @@
+"""Generate families of datasets in parallel."""
+
+import argparse
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import replace
+from pathlib import Path
+from typing import Any
+
+from .main import _ensure_dir, _override, _save_all, _warm_up
+from .parameters import JSON_INDENT, Parameters
+
+# Name of manifest file in sweep output directory.
+MANIFEST_FILE = "sweep.json"
+
+# Type definitions.
+VariantType = dict[str, Any]
+
+
+def main(argv: list[str] | None = None) -> int:
+    """
+    Command-line driver for `snailz sweep`.
+
+    Args:
+        argv: Command-line arguments after `sweep` (default from `sys.argv`).
+
+    Returns:
+        Exit status.
+    """
+
+    args = _parse_args(argv)
+    if args.params:
+        with open(args.params, "r") as reader:
+            base = Parameters(**json.load(reader))
+    else:
+        base = Parameters()
+
+    sweep(
+        args.outdir,
+        base,
+        _parse_grid(base, args.vary),
+        workers=args.workers,
+        compact=args.compact,
+        indexes=None if args.indexes else {},
+        summaries=args.summaries,
+    )
+    return 0
+
+
+def sweep(
+    outdir: Path | str,
+    base: Parameters,
+    grid: dict[str, list],
+    workers: int | None = None,
+    **options: Any,
+) -> dict[str, Any]:
+    """
+    Generate one dataset for each combination of parameter values in a
+    process pool. Each dataset is written to a numbered subdirectory of
+    `outdir`, and a manifest describing the sweep is written to
+    `MANIFEST_FILE` in `outdir`. Workers import `snailz` and load name
+    generators for the sweep's locales once when they start, so that
+    each variant only pays for generating and saving its data.
+
+    Args:
+        outdir: Output directory.
+        base: Parameters shared by all variants.
+        grid: Names of parameters mapped to values to try.
+        workers: Number of worker processes (default one per CPU).
+        options: Passed to `main._save_all` (e.g., `compact`).
+
+    Returns:
+        Manifest.
+    """
+
+    variants = _variants(base, grid)
+    width = len(str(max(0, len(variants) - 1)))
+    jobs = [
+        (Path(outdir, f"{i:0{width}d}"), params, options)
+        for i, (_, params) in enumerate(variants)
+    ]
+    locales = sorted({params.locale for _, params in variants})
+
+    _ensure_dir(outdir)
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_warm_up, initargs=(locales,)
+    ) as pool:
+        seconds = list(pool.map(_run, jobs))
+
+    manifest = {
+        "base": json.loads(base.as_json()),
+        "grid": grid,
+        "variants": [
+            {
+                "dir": dirname.name,
+                "overrides": overrides,
+                "seconds": elapsed,
+            }
+            for (overrides, _), (dirname, _, _), elapsed in zip(variants, jobs, seconds)
+        ],
+    }
+    with open(Path(outdir, MANIFEST_FILE), "w") as writer:
+        json.dump(manifest, writer, indent=JSON_INDENT)
+    return manifest
+
+
+def _parse_args(argv: list[str] | None) -> argparse.Namespace:
+    """
+    Parse command-line arguments.
+
+    Args:
+        argv: Arguments to parse.
+
+    Returns:
+        Object holding values from command-line arguments.
+    """
+
+    parser = argparse.ArgumentParser(prog="snailz sweep")
+    parser.add_argument(
+        "--compact", action="store_true", help="use integer keys in database"
+    )
+    parser.add_argument(
+        "--no-indexes",
+        dest="indexes",
+        action="store_false",
+        help="do not index database after loading",
+    )
+    parser.add_argument("--outdir", required=True, help="output directory")
+    parser.add_argument("--params", default=None, help="base JSON parameter file")
+    parser.add_argument(
+        "--summaries", action="store_true", help="add summary tables to database"
+    )
+    parser.add_argument(
+        "--vary",
+        required=True,
+        nargs="+",
+        help="name=value,value,... parameters to vary",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count(),
+        help="number of worker processes",
+    )
+    return parser.parse_args(argv)
+
+
+def _parse_grid(base: Parameters, specs: list[str]) -> dict[str, list]:
+    """
+    Parse `name=value,value,...` specifications.
+
+    Args:
+        base: Parameters whose field types values are converted to.
+        specs: Specifications from command line.
+
+    Returns:
+        Names of parameters mapped to values to try.
+    """
+
+    result = {}
+    for spec in specs:
+        fields = spec.split("=")
+        assert len(fields) == 2, f"malformed variation {spec}"
+        key, values = fields
+        assert key not in result, f"duplicate variation {key}"
+        result[key] = [_override(base, key, v) for v in values.split(",")]
+    return result
+
+
+def _run(job: tuple[Path, Parameters, dict[str, Any]]) -> float:
+    """
+    Generate one variant in a worker process.
+
+    Args:
+        job: Output directory, parameters, and options for `_save_all`.
+
+    Returns:
+        Elapsed time in seconds.
+    """
+
+    outdir, params, options = job
+    start = time.perf_counter()
+    _ensure_dir(outdir)
+    _save_all(outdir, params, **options)
+    return time.perf_counter() - start
+
+
+def _variants(
+    base: Parameters, grid: dict[str, list]
+) -> list[tuple[VariantType, Parameters]]:
+    """
+    Construct parameters for every combination of values in a grid.
+
+    Args:
+        base: Parameters shared by all variants.
+        grid: Names of parameters mapped to values to try.
+
+    Returns:
+        `(overrides, parameters)` pairs in row-major order.
+    """
+
+    keys = list(grid)
+    result = []
+    for values in itertools.product(*(grid[key] for key in keys)):
+        overrides = dict(zip(keys, values))
+        result.append((overrides, replace(base, **overrides)))
+    return result
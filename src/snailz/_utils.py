@@ -1,11 +1,17 @@
 """Utilities."""
 
-from datetime import date, timedelta
 import math
 import random
+import re
+from collections.abc import Iterable, Sequence
+from datetime import date, timedelta
+from typing import Any, overload
+
+import numpy as np
 from sqlite_utils import Database
-from typing import Any, Generator
 
+# Name of database file in output directory.
+DB_FILE = "snailz.db"
 
 # Convert lat/lon to distances.
 METERS_PER_DEGREE_LAT = 111_320.0
@@ -13,8 +19,13 @@ METERS_PER_DEGREE_LAT = 111_320.0
 # Make lat/lon realistic by rounding to 5 decimal places (2m accuracy).
 LAT_LON_PRECISION = 5
 
+# Default minimum number of digits in generated IDs.
+ID_WIDTH = 4
+
+# Generated IDs are a non-numeric stem followed by an integer key.
+ID_PATTERN = re.compile(r"\D+(\d+)")
+
 # Type definitions.
-IdGeneratorType = Generator[str, None, None]
 ForeignKeysType = list[tuple[str, str, str]]
 
 
@@ -38,49 +49,279 @@ class UnquotedDatabase(Database):
         return super().execute(sql, parameters)
 
 
-def id_generator(stem: str, digits: int) -> IdGeneratorType:
+class IdAllocator:
+    """
+    Allocate unique IDs of the form 'stemDDDD'. Numbers are handed out
+    in contiguous ranges so that batches (or shards of a batch being
+    generated in parallel) can format their own IDs without further
+    coordination. IDs that need more than `width` digits are widened
+    rather than rejected.
+
+    Attributes:
+        width: Minimum number of digits in formatted IDs.
     """
-    Generate unique IDs of the form 'stemDDDD'.
 
-    Args:
-        stem: Distinguishing prefix.
-        digits: Number of digits in IDs.
+    def __init__(self, width: int = ID_WIDTH):
+        """
+        Construct allocator.
 
-    Returns:
-        Sequence of IDs.
+        Args:
+            width: Minimum number of digits in formatted IDs.
+        """
+
+        self.width = width
+        self._next: dict[str, int] = {}
+        self.reset(width)
+
+    def reset(self, width: int | None = None):
+        """
+        Restart numbering for all stems, e.g., at the start of a
+        synthesis run.
+
+        Args:
+            width: New minimum number of digits (if given).
+        """
+
+        if width is not None:
+            validate(width > 0, f"ID width must be positive not {width}")
+            self.width = width
+        self._next = {}
+
+    def allocate(self, stem: str, count: int) -> range:
+        """
+        Allocate a contiguous range of integer keys.
+
+        Args:
+            stem: Distinguishing prefix.
+            count: Number of keys required.
+
+        Returns:
+            Range of integer keys.
+        """
+
+        validate(count >= 0, f"cannot allocate {count} IDs")
+        start = self._next.get(stem, 1)
+        self._next[stem] = start + count
+        return range(start, start + count)
+
+    def resume(self, stem: str, last: int):
+        """
+        Continue numbering after an existing key, e.g., when appending
+        to previously-generated data.
+
+        Args:
+            stem: Distinguishing prefix.
+            last: Largest integer key already in use.
+        """
+
+        validate(last >= 0, f"cannot resume IDs after {last}")
+        self._next[stem] = last + 1
+
+    def shards(self, stem: str, sizes: Sequence[int]) -> list[range]:
+        """
+        Allocate one contiguous block and split it into consecutive
+        ranges of the given sizes.
+
+        Args:
+            stem: Distinguishing prefix.
+            sizes: Number of keys required by each shard.
+
+        Returns:
+            One range of integer keys per shard.
+        """
+
+        block = self.allocate(stem, sum(sizes))
+        result = []
+        start = block.start
+        for size in sizes:
+            result.append(range(start, start + size))
+            start += size
+        return result
+
+    def format(self, stem: str, number: int) -> str:
+        """
+        Format an integer key as an ID.
+
+        Args:
+            stem: Distinguishing prefix.
+            number: Integer key.
+
+        Returns:
+            ID string.
+        """
+
+        return f"{stem}{number:0{self.width}d}"
+
+    def idents(self, stem: str, keys: range | int) -> list[str]:
+        """
+        Format a range of integer keys as IDs, allocating the range
+        first if only a count is given.
+
+        Args:
+            stem: Distinguishing prefix.
+            keys: Range of integer keys or number of keys to allocate.
+
+        Returns:
+            List of ID strings.
+        """
+
+        if isinstance(keys, int):
+            keys = self.allocate(stem, keys)
+        width = self.width
+        return [f"{stem}{i:0{width}d}" for i in keys]
+
+    def next(self, stem: str) -> str:
+        """
+        Allocate a single ID.
+
+        Args:
+            stem: Distinguishing prefix.
+
+        Returns:
+            ID string.
+        """
+
+        return self.format(stem, self.allocate(stem, 1).start)
+
+    @staticmethod
+    def key(ident: str) -> int:
+        """
+        Recover the integer key from an ID.
+
+        Args:
+            ident: ID string.
+
+        Returns:
+            Integer key.
+
+        Raises:
+            ValueError: If ID is not a non-numeric stem followed by digits.
+        """
+
+        match = ID_PATTERN.fullmatch(ident)
+        validate(match is not None, f"malformed ID {ident}")
+        return int(match.group(1))  # type: ignore[possibly-missing-attribute]
+
+
+def create_table(
+    db: Database,
+    name: str,
+    columns: dict[str, type],
+    pk: str | tuple[str, ...] | None = None,
+    foreign_keys: ForeignKeysType | None = None,
+    not_null: set[str] | frozenset[str] | None = None,
+    without_rowid: bool = False,
+):
     """
+    Create a table explicitly rather than letting sqlite-utils infer
+    it from inserted rows.
+
+    Args:
+        db: Database connector.
+        name: Table name.
+        columns: Column names and Python types.
+        pk: Primary key column(s).
+        foreign_keys: `(column, other_table, other_column)` triples.
+        not_null: Columns that must not be null.
+        without_rowid: Create a `WITHOUT ROWID` table (requires `pk`).
+    """
+
+    sql = db.create_table_sql(
+        name,
+        columns,
+        pk=pk,
+        foreign_keys=foreign_keys or [],
+        not_null=set(not_null or ()),
+    ).strip()
+    if without_rowid:
+        assert pk is not None, f"WITHOUT ROWID table {name} requires primary key"
+        sql = f"{sql.rstrip(';')} WITHOUT ROWID;"
+    db.execute(sql)
 
-    i = 1
-    while True:
-        temp = str(i)
-        assert len(temp) <= digits, f"ID generation overflow {stem}: {i}"
-        yield f"{stem}{temp.zfill(digits)}"
-        i += 1
 
+def insert_rows(db: Database, name: str, keys: Sequence[str], rows: Iterable[dict]):
+    """
+    Insert rows into an existing table without inspecting or altering
+    its schema. Unlike sqlite-utils' `insert_all`, this does not commit,
+    so callers can group several inserts in one transaction.
+
+    Args:
+        db: Database connector.
+        name: Table name.
+        keys: Column names.
+        rows: Dictionaries mapping column names to values.
+    """
 
+    sql = (
+        f"insert into {name} ({', '.join(keys)}) values ({', '.join('?' * len(keys))})"
+    )
+    db.conn.executemany(
+        sql,
+        (
+            tuple(
+                row[k].isoformat() if isinstance(row[k], date) else row[k] for k in keys
+            )
+            for row in rows
+        ),
+    )
+
+
+@overload
 def lat_lon(
     lat0: float, lon0: float, x_offset_m: float, y_offset_m: float
-) -> tuple[float, float]:
+) -> tuple[float, float]: ...
+
+
+@overload
+def lat_lon(
+    lat0: float, lon0: float, x_offset_m: np.ndarray, y_offset_m: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]: ...
+
+
+def lat_lon(lat0, lon0, x_offset_m, y_offset_m):
     """
     Calculate latitude and longitude from a base point with offsets.
+    Latitude depends only on the Y offset and longitude only on the X
+    offset, so passing arrays of X and Y offsets (which may differ in
+    length) produces the longitude and latitude axes of a grid.
 
     Args:
         lat0: Reference latitude.
         lon0: Reference longitude.
-        x_offset_m: X offset (m).
-        y_offset_m: Y offset (m).
+        x_offset_m: X offset(s) (m).
+        y_offset_m: Y offset(s) (m).
 
     Returns:
-        `(lat, lon)` pair.
+        `(lat, lon)` pair of values or of arrays.
     """
 
-    lat = lat0 + y_offset_m / METERS_PER_DEGREE_LAT
+    lat = lat0 + np.asarray(y_offset_m, dtype=np.float64) / METERS_PER_DEGREE_LAT
     m_per_deg_lon = METERS_PER_DEGREE_LAT * math.cos(math.radians(lat0))
-    lon = lon0 + x_offset_m / m_per_deg_lon
-    return round(lat, LAT_LON_PRECISION), round(lon, LAT_LON_PRECISION)
+    lon = lon0 + np.asarray(x_offset_m, dtype=np.float64) / m_per_deg_lon
+    return _round_lat_lon(lat), _round_lat_lon(lon)
+
 
+def _round_lat_lon(values: np.ndarray) -> Any:
+    """
+    Round latitudes or longitudes using Python's `round` (which rounds
+    the exact decimal value, unlike `np.round`) so that results do not
+    depend on whether they were computed singly or in arrays.
+
+    Args:
+        values: Zero-dimensional or one-dimensional array.
 
-def random_date(min_date: date, max_date: date, p_date_missing: float = 0.0) -> date | None:
+    Returns:
+        Rounded float or array of rounded values.
+    """
+
+    if values.ndim == 0:
+        return round(float(values), LAT_LON_PRECISION)
+    return np.array([round(v, LAT_LON_PRECISION) for v in values.tolist()])
+
+
+def random_date(
+    min_date: date, max_date: date, p_date_missing: float = 0.0
+) -> date | None:
     """
     Select random date in range (inclusive) with a defined
     probability of the date being `None` (missing).
@@ -131,3 +372,27 @@ def validate_lat_lon(caller: str, lat: float, lon: float):
 
     validate(-90.0 <= lat <= 90.0, f"invalid {caller} latitutde {lat}")
     validate(-180.0 <= lon <= 180.0, f"invalid {caller} longitude {lon}")
+
+
+def validate_lat_lon_batch(caller: str, lats: Sequence[float], lons: Sequence[float]):
+    """
+    Validate many latitudes and longitudes at once by checking their
+    extremes.
+
+    Args:
+        caller: Name of calling function.
+        lats: Latitudes.
+        lons: Longitudes.
+
+    Raises:
+        ValueError: If any latitude or longitude is invalid.
+    """
+
+    if len(lats) == 0:
+        return
+    validate_lat_lon(caller, min(lats), min(lons))
+    validate_lat_lon(caller, max(lats), max(lons))
+
+
+# Shared allocator for all entity classes.
+IDS = IdAllocator()
@@ -1,23 +1,38 @@
 """Pollution measurement."""
 
+import random
+from collections.abc import Iterator
 from dataclasses import dataclass, field
 from datetime import date
 from pathlib import Path
-import random
-from sqlite_utils import Database
 from typing import ClassVar, Self
 
-from ._base_mixin import BaseMixin
-from ._utils import ForeignKeysType, IdGeneratorType, id_generator, random_date, validate
+from sqlite_utils import Database
+
+from ._base_mixin import COMPACT_KEY, BaseMixin
+from ._columnar import ColumnStore
+from ._compress import Compression, open_csv
+from ._utils import (
+    IDS,
+    ForeignKeysType,
+    IdAllocator,
+    create_table,
+    insert_rows,
+    random_date,
+    validate,
+    validate_lat_lon_batch,
+)
 from .grid import Grid
 from .parameters import Parameters
 from .rating import Rating
 
-
 ASSAY_PRECISION = 2
 
+# Columns of long-form assay readings.
+READING_KEYS = ("assay_id", "reading_id", "contents", "reading")
 
-@dataclass
+
+@dataclass(slots=True)
 class Assay(BaseMixin):
     """
     A single pollution assay.
@@ -41,8 +56,21 @@ class Assay(BaseMixin):
         ("machine_id", "machine", "ident"),
     ]
     nullable_keys: ClassVar[set[str]] = {"performed"}
+    categorical_keys: ClassVar[set[str]] = {"person_id", "machine_id"}
     pivot_keys: ClassVar[set[str]] = {"contents", "readings"}
-    _next_id: ClassVar[IdGeneratorType] = id_generator("A", 4)
+    param_keys: ClassVar[set[str]] = {
+        "num_assays",
+        "assay_size",
+        "assay_certified",
+        "grid_std_dev",
+        "start_date",
+        "end_date",
+        "p_date_missing",
+    }
+    lookup_keys: ClassVar[dict[str, list[tuple[str, ...]]]] = {
+        "assay_readings": [("contents", "reading")],
+    }
+    id_stem: ClassVar[str] = "A"
 
     ident: str = ""
     lat: float = 0.0
@@ -59,10 +87,10 @@ class Assay(BaseMixin):
         """
         validate(
             (self.performed is None) or (self.performed > date.min),
-            "assay must have sensible date"
+            "assay must have sensible date",
         )
 
-        self.ident = next(self._next_id)
+        self.ident = IDS.next(self.id_stem)
 
     @classmethod
     def make(
@@ -81,16 +109,21 @@ class Assay(BaseMixin):
         """
 
         result = []
-        for _ in range(params.num_assays):
+        axes = {g.ident: g.lat_lon_axes() for g in grids}
+        for ident in IDS.idents(cls.id_stem, params.num_assays):
             g = random.choice(grids)
             x, y = random.randint(0, g.size - 1), random.randint(0, g.size - 1)
-            lat, lon = g.lat_lon(x, y)
+            lats, lons = axes[g.ident]
+            lat, lon = lats[y], lons[x]
             rat = random.choice(ratings)
-            performed = random_date(params.start_date, params.end_date, params.p_date_missing)
+            performed = random_date(
+                params.start_date, params.end_date, params.p_date_missing
+            )
             contents = cls._random_contents(params)
             readings = cls._random_readings(params, contents, g[x, y], rat.certified)
             result.append(
-                Assay(
+                cls._trusted(
+                    ident=ident,
                     lat=lat,
                     lon=lon,
                     person_id=rat.person_id,
@@ -100,10 +133,52 @@ class Assay(BaseMixin):
                     readings=readings,
                 )
             )
+
+        validate_lat_lon_batch(
+            "assay", [a.lat for a in result], [a.lon for a in result]
+        )
         return result
 
     @classmethod
-    def save_csv(cls, outdir: Path | str, objects: list):
+    def load_db(cls, db: Database, compact: bool = False) -> list["Assay"]:
+        """
+        Reconstruct assays from database, restoring contents and
+        readings from their long form.
+
+        Args:
+            db: Database connector.
+            compact: Whether the database uses the compact schema.
+
+        Returns:
+            List of assays.
+        """
+
+        assays = super(Assay, cls).load_db(db, compact)
+        cursor = db.execute(
+            "select assay_id, contents, reading from assay_readings "
+            "order by assay_id, reading_id"
+        )
+        idents = cls._ident_map(db, "assay") if compact else None
+
+        contents: dict[str, list[str]] = {a.ident: [] for a in assays}
+        readings: dict[str, list[float]] = {a.ident: [] for a in assays}
+        for assay_id, content, reading in cursor:
+            ident = idents[assay_id] if idents else assay_id
+            contents[ident].append(content)
+            readings[ident].append(reading)
+        for a in assays:
+            a.contents = "".join(contents[a.ident])
+            a.readings = readings[a.ident]
+        return assays
+
+    @classmethod
+    def save_csv(
+        cls,
+        outdir: Path | str,
+        objects: list,
+        append: bool = False,
+        compression: Compression | None = None,
+    ):
         """
         Save assays as CSV. Scalar properties of all assays are saved in
         one file; assay measurements are pivoted to long form and saved
@@ -112,18 +187,59 @@ class Assay(BaseMixin):
         Args:
             outdir: Output directory.
             objects: `Assay` objects to save.
+            append: Add rows to existing files instead of replacing them.
+            compression: How to compress files (if at all).
+        """
+
+        super(Assay, cls).save_csv(outdir, objects, append, compression)
+
+        mode = "a" if append else "w"
+        with open_csv(outdir, "assay_readings", mode, compression) as stream:
+            writer = cls._csv_dict_writer(stream, READING_KEYS, header=not append)
+            writer.writerows(cls._assay_readings(objects))
+
+    @classmethod
+    def save_columns(cls, store: ColumnStore, objects: list):
+        """
+        Save assays as column files. Scalar properties of all assays
+        are saved in one table; assay readings are pivoted to long form
+        and saved in a separate table.
+
+        Args:
+            store: Where to write columns.
+            objects: `Assay` objects to save.
         """
 
-        super().save_csv(outdir, objects)
+        super(Assay, cls).save_columns(store, objects)
+        store.append(
+            "assay_readings",
+            {"assay_id": str, "reading_id": int, "contents": str, "reading": float},
+            cls._assay_readings(objects),
+            categorical={"contents"},
+        )
 
-        with open(Path(outdir, "assay_readings.csv"), "w", newline="") as stream:
-            pivoted = cls._assay_readings(objects)
-            writer = cls._csv_dict_writer(stream, list(pivoted[0].keys()))
-            for obj in pivoted:
-                writer.writerow(obj)
+    @classmethod
+    def append_db(cls, db: Database, objects: list, compact: bool = False):
+        """
+        Insert assays and their readings into existing tables without
+        committing.
+
+        Args:
+            db: Database connector.
+            objects: `Assay` objects to insert.
+            compact: Whether the database uses the compact schema.
+        """
+
+        super(Assay, cls).append_db(db, objects, compact)
+        insert_rows(
+            db,
+            "assay_readings",
+            READING_KEYS,
+            cls._assay_readings(objects, compact),
+        )
 
     @classmethod
-    def save_db(cls, db: Database, objects: list):
+    def save_db(cls, db: Database, objects: list, compact: bool = False):
         """
         Save assays to database. Scalar properties of all assays are
         saved in one table; assay readings are pivoted to long form
@@ -132,17 +248,49 @@ class Assay(BaseMixin):
         Args:
             db: Database connector.
             objects: `Assay` objects to save.
+            compact: Use integer surrogate keys.
         """
 
-        super().save_db(db, objects)
+        super(Assay, cls).save_db(db, objects, compact)
 
         table = db["assay_readings"]
-        table.insert_all(  # type: ignore[possibly-missing-attribute]
-            cls._assay_readings(objects),
+        if not compact:
+            table.insert_all(  # type: ignore[possibly-missing-attribute]
+                cls._assay_readings(objects),
+                pk=("assay_id", "reading_id"),
+                foreign_keys=[("assay_id", "assay", "ident")],
+            )
+            return
+
+        create_table(
+            db,
+            "assay_readings",
+            {"assay_id": int, "reading_id": int, "contents": str, "reading": float},
             pk=("assay_id", "reading_id"),
-            foreign_keys=[("assay_id", "assay", "ident")],
+            foreign_keys=[("assay_id", "assay", COMPACT_KEY)],
+            without_rowid=True,
+        )
+        table.insert_all(  # type: ignore[possibly-missing-attribute]
+            cls._assay_readings(objects, compact=True)
         )
 
+    @classmethod
+    def num_rows(cls, params: Parameters) -> dict[str, int]:
+        """
+        Predict rows generated from parameters.
+
+        Args:
+            params: Data synthesis parameters.
+
+        Returns:
+            Table names mapped to numbers of rows.
+        """
+
+        return {
+            "assay": params.num_assays,
+            "assay_readings": params.num_assays * params.assay_size,
+        }
+
     @classmethod
     def table_name(cls) -> str:
         """Database table name."""
@@ -150,22 +298,30 @@ class Assay(BaseMixin):
         return "assay"
 
     @classmethod
-    def _assay_readings(cls, assays: list[Self]) -> list[dict[str, str | float]]:
+    def _assay_readings(
+        cls, assays: list[Self], compact: bool = False
+    ) -> Iterator[dict[str, str | float]]:
         """
-        Get assay readings in long format for persistence.
+        Get assay readings in long format for persistence. Rows are
+        generated lazily so that writers can stream them.
 
         Args:
             assays: Assays to pivot.
+            compact: Refer to assays by integer key instead of identifier.
 
-        Returns:
-            List of persistable dictionaries.
+        Yields:
+            Persistable dictionaries.
         """
 
-        return [
-            {"assay_id": a.ident, "reading_id": i + 1, "contents": c, "reading": r}
-            for a in assays
-            for i, (c, r) in enumerate(zip(a.contents, a.readings))
-        ]
+        for a in assays:
+            key = IdAllocator.key(a.ident) if compact else a.ident
+            for i, (c, r) in enumerate(zip(a.contents, a.readings)):
+                yield {
+                    "assay_id": key,
+                    "reading_id": i + 1,
+                    "contents": c,
+                    "reading": r,
+                }
 
     @classmethod
     def _random_contents(cls, params: Parameters) -> str:
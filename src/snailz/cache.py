@@ -0,0 +1,464 @@
+"""Caches of generated databases."""
+
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import uuid
+from collections import OrderedDict
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import asdict, is_dataclass
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
+from typing import Any
+
+from ._utils import DB_FILE, validate
+from .parameters import Parameters
+
+# Default limits for in-memory cache.
+MAX_ENTRIES = 8
+MAX_BYTES = 256 * 1024 * 1024
+
+# Default size limit for on-disk cache.
+DISK_MAX_BYTES = 4 * 1024 * 1024 * 1024
+
+# Environment variable naming default on-disk cache directory.
+CACHE_DIR_VAR = "SNAILZ_CACHE_DIR"
+
+# Prefix of staging directories inside on-disk cache.
+STAGING_PREFIX = ".staging-"
+
+
+def fingerprint(params: Parameters, **options: Any) -> str:
+    """
+    Create a canonical hash of parameters, generation options, and the
+    version of this package.
+
+    Args:
+        params: Data synthesis parameters.
+        options: Other settings that affect the generated data
+            (JSON-serializable values or dataclasses).
+
+    Returns:
+        Hexadecimal SHA-256 digest.
+    """
+
+    canonical = json.dumps(
+        {
+            "params": json.loads(params.as_json()),
+            "options": options,
+            "version": _version(),
+        },
+        sort_keys=True,
+        separators=(",", ":"),
+        default=_as_dict,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class MemoryCache:
+    """
+    Bounded least-recently-used cache of in-memory SQLite databases.
+    The cache holds private copies: `get` restores a fresh connection
+    using SQLite's backup API so callers cannot modify cached data.
+
+    Attributes:
+        max_entries: Maximum number of databases to keep.
+        max_bytes: Maximum total size of cached databases.
+    """
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, max_bytes: int = MAX_BYTES):
+        """
+        Construct empty cache.
+
+        Args:
+            max_entries: Maximum number of databases to keep.
+            max_bytes: Maximum total size of cached databases.
+        """
+
+        validate(max_entries >= 0, f"invalid maximum cache entries {max_entries}")
+        validate(max_bytes >= 0, f"invalid maximum cache size {max_bytes}")
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, tuple[sqlite3.Connection, int]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, key: str) -> bool:
+        """Check whether a database is cached under a key."""
+
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self) -> int:
+        """Number of cached databases."""
+
+        with self._lock:
+            return len(self._entries)
+
+    @property
+    def nbytes(self) -> int:
+        """Total size of cached databases."""
+
+        with self._lock:
+            return sum(size for _, size in self._entries.values())
+
+    def clear(self):
+        """Discard all cached databases."""
+
+        with self._lock:
+            for conn, _ in self._entries.values():
+                conn.close()
+            self._entries.clear()
+
+    def get(self, key: str) -> sqlite3.Connection | None:
+        """
+        Restore a cached database.
+
+        Args:
+            key: Cache key (see `fingerprint`).
+
+        Returns:
+            New connection to a copy of the cached database or `None`.
+        """
+
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            cached, _ = self._entries[key]
+            return _copy(cached)
+
+    def put(self, key: str, conn: sqlite3.Connection):
+        """
+        Cache a copy of a database, evicting least-recently-used
+        entries to stay within limits. Databases larger than the size
+        limit are not cached.
+
+        Args:
+            key: Cache key (see `fingerprint`).
+            conn: Connection to database to copy.
+        """
+
+        size = _size(conn)
+        if (self.max_entries == 0) or (size > self.max_bytes):
+            return
+
+        copy = _copy(conn, check_same_thread=False)
+        with self._lock:
+            if key in self._entries:
+                self._entries.pop(key)[0].close()
+            self._entries[key] = (copy, size)
+            total = sum(s for _, s in self._entries.values())
+            while (len(self._entries) > self.max_entries) or (total > self.max_bytes):
+                _, (evicted, evicted_size) = self._entries.popitem(last=False)
+                evicted.close()
+                total -= evicted_size
+
+
+class DiskCache:
+    """
+    Persistent content-addressed cache of generated output stored as
+    one directory per key under `root`. Entries are staged in a
+    private directory and published by renaming it, so concurrent runs
+    never see partial entries; if two runs publish the same key, the
+    first one wins. Least-recently-used entries are evicted when the
+    total size exceeds `max_bytes`.
+
+    Attributes:
+        root: Cache directory.
+        max_bytes: Maximum total size of cached entries.
+        link: Restore entries by hard-linking instead of copying files.
+            (Output files then share storage with the cache, so they
+            must not be modified in place.)
+    """
+
+    def __init__(
+        self, root: Path | str, max_bytes: int = DISK_MAX_BYTES, link: bool = False
+    ):
+        """
+        Construct cache, creating its directory if necessary.
+
+        Args:
+            root: Cache directory.
+            max_bytes: Maximum total size of cached entries.
+            link: Restore entries by hard-linking.
+        """
+
+        validate(max_bytes >= 0, f"invalid maximum cache size {max_bytes}")
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.link = link
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    @classmethod
+    def from_env(cls) -> "DiskCache | None":
+        """
+        Construct cache in directory named by `SNAILZ_CACHE_DIR`.
+
+        Returns:
+            Cache or `None` if environment variable not set.
+        """
+
+        root = os.environ.get(CACHE_DIR_VAR)
+        return cls(root) if root else None
+
+    def __contains__(self, key: str) -> bool:
+        """Check whether an entry is cached under a key."""
+
+        return self._entry(key).is_dir()
+
+    @property
+    def nbytes(self) -> int:
+        """Total size of cached entries."""
+
+        return sum(size for _, size, _ in self._entries())
+
+    @contextmanager
+    def staging(self) -> Iterator[Path]:
+        """
+        Create a private directory to write a new entry into; it is
+        removed on exit unless it has been published.
+
+        Yields:
+            Path to staging directory.
+        """
+
+        staging = self.root / f"{STAGING_PREFIX}{uuid.uuid4().hex}"
+        staging.mkdir()
+        try:
+            yield staging
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    def publish(self, key: str, staging: Path | str):
+        """
+        Atomically move a staged directory into the cache and evict
+        old entries (other than this one) to stay within the size limit.
+
+        Args:
+            key: Cache key (see `fingerprint`).
+            staging: Directory created by `staging`.
+        """
+
+        try:
+            os.rename(staging, self._entry(key))
+        except OSError:
+            # Another run published this key first.
+            return
+        self.evict(keep=key)
+
+    def publish_db(self, key: str, conn: sqlite3.Connection):
+        """
+        Cache a copy of a database.
+
+        Args:
+            key: Cache key (see `fingerprint`).
+            conn: Connection to database to copy.
+        """
+
+        with self.staging() as staging:
+            dest = sqlite3.connect(staging / DB_FILE)
+            try:
+                conn.backup(dest)
+            finally:
+                dest.close()
+            self.publish(key, staging)
+
+    def restore(self, key: str, outdir: Path | str) -> bool:
+        """
+        Copy or link the files of a cached entry into a directory.
+
+        Args:
+            key: Cache key (see `fingerprint`).
+            outdir: Output directory (created if necessary).
+
+        Returns:
+            Whether the entry was found and restored.
+        """
+
+        entry = self._entry(key)
+        try:
+            files = [p for p in entry.iterdir() if p.is_file()]
+            outpath = Path(outdir)
+            outpath.mkdir(parents=True, exist_ok=True)
+            for src in files:
+                dst = outpath / src.name
+                dst.unlink(missing_ok=True)
+                if self.link:
+                    try:
+                        os.link(src, dst)
+                        continue
+                    except OSError:
+                        pass
+                shutil.copyfile(src, dst)
+            os.utime(entry)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def restore_db(self, key: str) -> sqlite3.Connection | None:
+        """
+        Load a cached database into memory.
+
+        Args:
+            key: Cache key (see `fingerprint`).
+
+        Returns:
+            Connection to in-memory copy of database or `None`.
+        """
+
+        path = self._entry(key) / DB_FILE
+        if not path.is_file():
+            return None
+        src = sqlite3.connect(f"{path.as_uri()}?mode=ro", uri=True)
+        try:
+            result = sqlite3.connect(":memory:")
+            src.backup(result)
+        finally:
+            src.close()
+        os.utime(path.parent)
+        return result
+
+    def db_path(self, key: str) -> Path | None:
+        """
+        Find a cached database and mark its entry as recently used. The
+        file must not be modified, and may be removed if the entry is
+        later evicted.
+
+        Args:
+            key: Cache key (see `fingerprint`).
+
+        Returns:
+            Path to database file or `None`.
+        """
+
+        path = self._entry(key) / DB_FILE
+        try:
+            os.utime(path.parent)
+        except FileNotFoundError:
+            return None
+        return path if path.is_file() else None
+
+    def evict(self, keep: str | None = None):
+        """
+        Remove least-recently-used entries until the cache is within
+        its size limit.
+
+        Args:
+            keep: Key of entry that must not be evicted.
+        """
+
+        entries = sorted(self._entries(), key=lambda e: e[2])
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            if path.name == keep:
+                continue
+            doomed = self.root / f"{STAGING_PREFIX}{uuid.uuid4().hex}"
+            try:
+                os.rename(path, doomed)
+            except OSError:
+                continue
+            shutil.rmtree(doomed, ignore_errors=True)
+            total -= size
+
+    def _entries(self) -> list[tuple[Path, int, float]]:
+        """
+        Find published entries.
+
+        Returns:
+            List of `(path, size, last_used)` triples.
+        """
+
+        result = []
+        for path in self.root.iterdir():
+            if path.name.startswith(STAGING_PREFIX) or not path.is_dir():
+                continue
+            try:
+                size = sum(p.stat().st_size for p in path.iterdir())
+                result.append((path, size, path.stat().st_mtime))
+            except FileNotFoundError:
+                continue
+        return result
+
+    def _entry(self, key: str) -> Path:
+        """Path to entry for key."""
+
+        return self.root / key
+
+
+# Shared in-memory cache used by `in_memory` by default. (The default
+# on-disk cache is found by `DiskCache.from_env` when it is needed.)
+MEMORY_CACHE = MemoryCache()
+
+
+def _as_dict(value: Any) -> dict[str, Any]:
+    """
+    Convert a dataclass option to a dictionary for fingerprinting.
+
+    Args:
+        value: Option that `json` cannot serialize directly.
+
+    Returns:
+        Fields of dataclass.
+
+    Raises:
+        TypeError: If value is not a dataclass instance.
+    """
+
+    if is_dataclass(value) and not isinstance(value, type):
+        return asdict(value)
+    raise TypeError(f"cannot fingerprint {type(value).__name__}")
+
+
+def _copy(
+    conn: sqlite3.Connection, check_same_thread: bool = True
+) -> sqlite3.Connection:
+    """
+    Copy a database into a new in-memory database.
+
+    Args:
+        conn: Connection to database to copy.
+        check_same_thread: Restrict new connection to creating thread.
+
+    Returns:
+        Connection to copy.
+    """
+
+    result = sqlite3.connect(":memory:", check_same_thread=check_same_thread)
+    conn.backup(result)
+    return result
+
+
+def _version() -> str:
+    """
+    Get version of this package.
+
+    Returns:
+        Version string (or placeholder if package metadata unavailable).
+    """
+
+    try:
+        return version("snailz")
+    except PackageNotFoundError:
+        return "unknown"
+
+
+def _size(conn: sqlite3.Connection) -> int:
+    """
+    Calculate size of database in bytes.
+
+    Args:
+        conn: Database connection.
+
+    Returns:
+        Number of bytes used by database pages.
+    """
+
+    page_count = conn.execute("pragma page_count").fetchone()[0]
+    page_size = conn.execute("pragma page_size").fetchone()[0]
+    return page_count * page_size
@@ -1,30 +1,43 @@
 """Sampling grids."""
 
-from dataclasses import InitVar, dataclass, field
+import csv
 import io
 import itertools
 import math
-import numpy as np
+import random
+from collections.abc import Iterator
+from dataclasses import InitVar, dataclass, field
 from pathlib import Path
+from typing import Any, ClassVar
+
+import numpy as np
 from PIL import Image
-import random
 from sqlite_utils import Database
-from typing import Any, ClassVar
 
-from ._base_mixin import BaseMixin
+from ._base_mixin import COMPACT_KEY, BaseMixin
+from ._columnar import ColumnStore
+from ._compress import Compression, open_csv
 from ._utils import (
-    IdGeneratorType,
-    id_generator,
+    IDS,
+    IdAllocator,
+    create_table,
     lat_lon,
     validate,
     validate_lat_lon,
+    validate_lat_lon_batch,
 )
 from .parameters import Parameters
 
-
 # Legal moves for random walk that fills grid.
 MOVES = [[-1, 0], [1, 0], [0, -1], [0, 1]]
 
+# Columns of long-form grid cells in CSV and default database schema.
+CELL_KEYS = ("grid_id", "lat", "lon", "value")
+
+# Fraction of size**2 / log(size) cells visited by the filling random
+# walk, measured by simulation and rounded up so estimates err high.
+SPARSE_FILL = 0.45
+
 # Decimal places in grid values.
 GRID_PRECISION = 2
 
@@ -35,7 +48,7 @@ BORDER_WIDTH = 8
 CELL_SIZE = 32
 
 
-@dataclass
+@dataclass(slots=True)
 class Grid(BaseMixin):
     """
     A single survey grid.
@@ -46,19 +59,34 @@ class Grid(BaseMixin):
         spacing: size of individual cell (m)
         lat0: reference latitude of cell (0, 0)
         lon0: reference longitude of cell (0, 0)
-        cells: pollution measurements for cells
+        cells: pollution measurements for cells (a list of all values
+            or, for sparse grids, a dictionary mapping the indices of
+            nonzero cells to their values)
     """
 
     primary_key: ClassVar[str] = "ident"
     pivot_keys: ClassVar[set[str]] = {"cells"}
-    _next_id: ClassVar[IdGeneratorType] = id_generator("G", 4)
+    param_keys: ClassVar[set[str]] = {
+        "num_grids",
+        "grid_size",
+        "grid_spacing",
+        "grid_separation",
+        "grid_std_dev",
+        "grid_sparse",
+        "lat0",
+        "lon0",
+    }
+    lookup_keys: ClassVar[dict[str, list[tuple[str, ...]]]] = {
+        "grid_cells": [("lat", "lon", "value")],
+    }
+    id_stem: ClassVar[str] = "G"
 
     ident: str = ""
     size: int = 0
     spacing: float = 0.0
     lat0: float = 0.0
     lon0: float = 0.0
-    cells: list[float] = field(default_factory=list)
+    cells: list[float] | dict[int, float] = field(default_factory=list)
     params: InitVar[Parameters | None] = None
 
     def __post_init__(self, params: Parameters | None):
@@ -81,10 +109,8 @@ class Grid(BaseMixin):
         validate_lat_lon("grid", self.lat0, self.lon0)
         validate(params is not None, "params required for initializing grid")
 
-        self.ident = next(self._next_id)
-        self.cells = [0.0 for _ in range(self.size * self.size)]
-        self._fill()
-        self._randomize(params)
+        self.ident = IDS.next(self.id_stem)
+        self._populate(params)
 
     def __str__(self) -> str:
         """
@@ -115,6 +141,8 @@ class Grid(BaseMixin):
 
         self._validate_coords(key)
         x, y = key
+        if isinstance(self.cells, dict):
+            return self.cells.get(x * self.size + y, 0.0)
         return self.cells[x * self.size + y]
 
     def __setitem__(self, key: tuple[int, int], value: float):
@@ -145,19 +173,103 @@ class Grid(BaseMixin):
         """
 
         origins = cls._make_origins(params)
-        return [
-            Grid(
+        validate_lat_lon_batch("grid", [o[0] for o in origins], [o[1] for o in origins])
+        idents = IDS.idents(cls.id_stem, len(origins))
+        result = [
+            cls._trusted(
+                ident=ident,
                 size=params.grid_size,
                 spacing=params.grid_spacing,
                 lat0=origin[0],
                 lon0=origin[1],
-                params=params,
             )
-            for origin in origins
+            for ident, origin in zip(idents, origins)
         ]
+        for g in result:
+            g._populate(params)
+        return result
+
+    @classmethod
+    def load_db(cls, db: Database, compact: bool = False) -> list["Grid"]:
+        """
+        Reconstruct grids from database, restoring cell values from
+        their long form.
+
+        Args:
+            db: Database connector.
+            compact: Whether the database uses the compact schema.
+
+        Returns:
+            List of grids.
+        """
+
+        grids = super(Grid, cls).load_db(db, compact)
+        if compact:
+            idents = cls._ident_map(db, "grid")
+            cursor = db.execute(
+                "select grid_id, value from grid_cells order by grid_id, x, y"
+            )
+            rows = ((idents[grid_id], value) for grid_id, value in cursor)
+        else:
+            rows = db.execute("select grid_id, value from grid_cells order by rowid")
+
+        cells: dict[str, list[float]] = {g.ident: [] for g in grids}
+        for grid_id, value in rows:
+            cells[grid_id].append(value)
+        for g in grids:
+            g.cells = cells[g.ident]
+            if len(g.cells) < g.size * g.size:
+                g._sparse_from_db(db, compact)
+        return grids
 
     @classmethod
-    def save_csv(cls, outdir: Path | str, objects: list):
+    def load_npy(cls, outdir: Path | str) -> list["Grid"]:
+        """
+        Reconstruct grids from `grid.csv` and the binary files written
+        by `save_npy`. Cell values are memory-mapped read-only rather
+        than read, so grids larger than memory can be sampled.
+
+        Args:
+            outdir: Output directory.
+
+        Returns:
+            List of grids.
+
+        Raises:
+            ValueError: If a binary file's shape does not match its grid.
+        """
+
+        with open_csv(outdir, cls.table_name()) as stream:
+            rows = list(csv.DictReader(stream))
+
+        result = []
+        for row in rows:
+            size = int(row["size"])
+            cells = np.load(Path(outdir, f"{row['ident']}.npy"), mmap_mode="r")
+            validate(
+                cells.shape == (size, size),
+                f"grid {row['ident']} has shape {cells.shape} not {(size, size)}",
+            )
+            result.append(
+                cls._trusted(
+                    ident=row["ident"],
+                    size=size,
+                    spacing=float(row["spacing"]),
+                    lat0=float(row["lat0"]),
+                    lon0=float(row["lon0"]),
+                    cells=cells.reshape(-1),
+                )
+            )
+        return result
+
+    @classmethod
+    def save_csv(
+        cls,
+        outdir: Path | str,
+        objects: list,
+        append: bool = False,
+        compression: Compression | None = None,
+    ):
         """
         Save grids as CSV. Scalar properties of all grids are saved in
         one file; grid cell values are pivoted to long form and saved
@@ -166,18 +278,39 @@ class Grid(BaseMixin):
         Args:
             outdir: Output directory.
             objects: `Grid` objects to save.
+            append: Add rows to existing files instead of replacing them.
+            compression: How to compress files (if at all).
         """
 
-        super().save_csv(outdir, objects)
+        super(Grid, cls).save_csv(outdir, objects, append, compression)
 
-        with open(Path(outdir, "grid_cells.csv"), "w", newline="") as stream:
-            pivoted = cls._grid_cells(objects)
-            writer = cls._csv_dict_writer(stream, list(pivoted[0].keys()))
-            for obj in pivoted:
-                writer.writerow(obj)
+        mode = "a" if append else "w"
+        with open_csv(outdir, "grid_cells", mode, compression) as stream:
+            writer = cls._csv_dict_writer(stream, CELL_KEYS, header=not append)
+            writer.writerows(cls._grid_cells(objects))
 
     @classmethod
-    def save_db(cls, db: Database, objects: list):
+    def save_columns(cls, store: ColumnStore, objects: list):
+        """
+        Save grids as column files. Scalar properties of all grids are
+        saved in one table; grid cell values are pivoted to long form
+        and saved in a separate table.
+
+        Args:
+            store: Where to write columns.
+            objects: `Grid` objects to save.
+        """
+
+        super(Grid, cls).save_columns(store, objects)
+        store.append(
+            "grid_cells",
+            {"grid_id": str, "lat": float, "lon": float, "value": float},
+            cls._grid_cells(objects),
+            categorical={"grid_id"},
+        )
+
+    @classmethod
+    def save_db(cls, db: Database, objects: list, compact: bool = False):
         """
         Save grids to database. Scalar properties of all grids are
         saved in one table; grid cell values are pivoted to long form
@@ -186,9 +319,10 @@ class Grid(BaseMixin):
         Args:
             db: Database connector.
             objects: `Grid` objects to save.
+            compact: Use integer surrogate keys.
         """
 
-        super().save_db(db, objects)
+        super(Grid, cls).save_db(db, objects, compact)
 
         grid_table = db["grid"]
         grid_table.add_column("image", bytes)  # type: ignore[possibly-missing-attribute]
@@ -196,15 +330,87 @@ class Grid(BaseMixin):
         for g in objects:
             buf = io.BytesIO()
             g.as_image(scale).save(buf, format="PNG")
-            grid_table.update(g.ident, {"image": buf.getvalue()})  # type: ignore[possibly-missing-attribute]
+            key = IdAllocator.key(g.ident) if compact else g.ident
+            grid_table.update(key, {"image": buf.getvalue()})  # type: ignore[possibly-missing-attribute]
 
         table = db["grid_cells"]
+        if not compact:
+            table.insert_all(  # type: ignore[possibly-missing-attribute]
+                cls._grid_cells(objects),
+                pk=("grid_id", "lat", "lon"),
+                foreign_keys=[("grid_id", "grid", "ident")],
+            )
+            return
+
+        create_table(
+            db,
+            "grid_cells",
+            {
+                "grid_id": int,
+                "x": int,
+                "y": int,
+                "lat": float,
+                "lon": float,
+                "value": float,
+            },
+            pk=("grid_id", "x", "y"),
+            foreign_keys=[("grid_id", "grid", COMPACT_KEY)],
+            without_rowid=True,
+        )
         table.insert_all(  # type: ignore[possibly-missing-attribute]
-            cls._grid_cells(objects),
-            pk=("grid_id", "lat", "lon"),
-            foreign_keys=[("grid_id", "grid", "ident")],
+            cls._grid_cells(objects, compact=True)
         )
 
+    @classmethod
+    def save_npy(cls, outdir: Path | str, objects: list):
+        """
+        Save each grid's cell values as a `float64` NumPy array of shape
+        `(size, size)` indexed by `[x, y]` in `<ident>.npy` (see
+        `load_npy`). Scalar properties are saved by `save_csv`. Sparse
+        grids are refused rather than expanded, since storing every zero
+        cell would undo the savings of the sparse representation.
+
+        Args:
+            outdir: Output directory.
+            objects: `Grid` objects to save.
+
+        Raises:
+            ValueError: If a grid is sparse.
+        """
+
+        for g in objects:
+            validate(
+                not isinstance(g.cells, dict),
+                f"cannot save sparse grid {g.ident} as a dense array",
+            )
+        for g in objects:
+            np.save(Path(outdir, f"{g.ident}.npy"), g.as_array())
+
+    @classmethod
+    def num_rows(cls, params: Parameters) -> dict[str, int]:
+        """
+        Predict rows generated from parameters. Sparse grids only store
+        the cells visited by the filling random walk, so their cells
+        are estimated rather than counted.
+
+        Args:
+            params: Data synthesis parameters.
+
+        Returns:
+            Table names mapped to numbers of rows.
+        """
+
+        size = params.grid_size
+        if not params.grid_sparse:
+            cells = size**2
+        elif size < 3:
+            cells = 0
+        else:
+            cells = min(
+                (size - 2) ** 2, math.ceil(SPARSE_FILL * size**2 / math.log(size))
+            )
+        return {"grid": params.num_grids, "grid_cells": params.num_grids * cells}
+
     @classmethod
     def table_name(cls) -> str:
         """Database table name."""
@@ -212,20 +418,62 @@ class Grid(BaseMixin):
         return "grid"
 
     @classmethod
-    def _grid_cells(cls, grids):
+    def _grid_cells(
+        cls, grids: list["Grid"], compact: bool = False
+    ) -> Iterator[dict[str, Any]]:
         """
-        Pivot grid cell values to long format for persistence.
+        Pivot grid cell values to long format for persistence. Rows are
+        generated lazily so that writers can stream them; sparse grids
+        only produce rows for nonzero cells.
 
         Args:
             grids: `Grid` objects to pivot.
+            compact: Key cells by integer grid key and (x, y) indices.
+
+        Yields:
+            Persistable dictionaries.
         """
 
-        return [
-            {"grid_id": g.ident, **g.lat_lon(x, y, True), "value": g[x, y]}
-            for g in grids
-            for x in range(g.size)
-            for y in range(g.size)
-        ]
+        for g in grids:
+            lats, lons = g.lat_lon_axes()
+            cells, size = g.cells, g.size
+            key = IdAllocator.key(g.ident) if compact else g.ident
+            indices = sorted(cells) if isinstance(cells, dict) else range(size * size)
+            for i in indices:
+                x, y = divmod(i, size)
+                yield cls._cell_row(key, x, y, lats[y], lons[x], cells[i], compact)
+
+    @staticmethod
+    def _cell_row(
+        key: int | str,
+        x: int,
+        y: int,
+        lat: float,
+        lon: float,
+        value: float,
+        compact: bool,
+    ) -> dict[str, Any]:
+        """
+        Construct the persistable dictionary for one grid cell.
+
+        Args:
+            key: Grid key or identifier.
+            x: X index of cell.
+            y: Y index of cell.
+            lat: Latitude of cell.
+            lon: Longitude of cell.
+            value: Cell value.
+            compact: Include (x, y) indices.
+
+        Returns:
+            Persistable dictionary.
+        """
+
+        row: dict[str, Any] = {"grid_id": key}
+        if compact:
+            row.update(x=x, y=y)
+        row.update(lat=lat, lon=lon, value=value)
+        return row
 
     @classmethod
     def _make_origins(cls, params):
@@ -246,6 +494,21 @@ class Grid(BaseMixin):
         dim = params.grid_size * params.grid_spacing * params.grid_separation
         return [lat_lon(params.lat0, params.lon0, x * dim, y * dim) for x, y in actual]
 
+    def as_array(self) -> np.ndarray:
+        """
+        Get cell values as an array (without copying if the grid was
+        loaded by `load_npy`; sparse grids are expanded).
+
+        Returns:
+            `(size, size)` array indexed by `[x, y]`.
+        """
+
+        if isinstance(self.cells, dict):
+            result = np.zeros(self.size * self.size, dtype=np.float64)
+            result[list(self.cells.keys())] = list(self.cells.values())
+            return result.reshape(self.size, self.size)
+        return np.asarray(self.cells, dtype=np.float64).reshape(self.size, self.size)
+
     def as_image(self, scale: float) -> Image.Image:
         """
         Convert grid to image.
@@ -290,6 +553,19 @@ class Grid(BaseMixin):
         lat, lon = lat_lon(self.lat0, self.lon0, x * self.spacing, y * self.spacing)
         return {"lat": lat, "lon": lon} if as_dict else (lat, lon)
 
+    def lat_lon_axes(self) -> tuple[list[float], list[float]]:
+        """
+        Calculate latitudes of all grid rows and longitudes of all grid
+        columns at once, so that cell `(x, y)` is at `(lats[y], lons[x])`.
+
+        Returns:
+            `(lats, lons)` pair of lists indexed by Y and X coordinate.
+        """
+
+        offsets = np.arange(self.size) * self.spacing
+        lats, lons = lat_lon(self.lat0, self.lon0, offsets, offsets)
+        return lats.tolist(), lons.tolist()
+
     def min_max(self) -> tuple[float, float]:
         """
         Find smallest and largest values in grid.
@@ -298,6 +574,13 @@ class Grid(BaseMixin):
             `(min, max)` pair.
         """
 
+        if isinstance(self.cells, np.ndarray):
+            return float(self.cells.min()), float(self.cells.max())
+        if isinstance(self.cells, dict):
+            values = list(self.cells.values())
+            if len(values) < self.size * self.size:
+                values.append(0.0)
+            return min(values), max(values)
         return min(self.cells), max(self.cells)
 
     def _fill(self):
@@ -313,6 +596,21 @@ class Grid(BaseMixin):
             x += m[0]
             y += m[1]
 
+    def _populate(self, params: Parameters | None):
+        """
+        Create cells and fill them with random values.
+
+        Args:
+            params: Parameters object.
+        """
+
+        if (params is not None) and params.grid_sparse:
+            self.cells = {}
+        else:
+            self.cells = [0.0 for _ in range(self.size * self.size)]
+        self._fill()
+        self._randomize(params)
+
     def _randomize(self, params: Parameters | None):
         """
         Randomize values in grid after filling.
@@ -322,6 +620,20 @@ class Grid(BaseMixin):
         """
 
         assert params is not None
+        if isinstance(self.cells, dict):
+            # Visit filled cells in the same order as dense grids so
+            # that both consume the same random values.
+            for i in sorted(self.cells):
+                value = round(
+                    abs(random.normalvariate(self.cells[i], params.grid_std_dev)),
+                    GRID_PRECISION,
+                )
+                if value > 0.0:
+                    self.cells[i] = value
+                else:
+                    del self.cells[i]
+            return
+
         for i, val in enumerate(self.cells):
             if val > 0.0:
                 self.cells[i] = round(
@@ -331,6 +643,34 @@ class Grid(BaseMixin):
             else:
                 self.cells[i] = 0.0
 
+    def _sparse_from_db(self, db: Database, compact: bool):
+        """
+        Rebuild sparse cells from the rows saved for this grid, which
+        only cover nonzero cells. Rows in the default schema are located
+        by their latitude and longitude.
+
+        Args:
+            db: Database connector.
+            compact: Whether the database uses the compact schema.
+        """
+
+        if compact:
+            cursor = db.execute(
+                "select x, y, value from grid_cells where grid_id = ?",
+                [IdAllocator.key(self.ident)],
+            )
+            located = cursor.fetchall()
+        else:
+            lats, lons = self.lat_lon_axes()
+            ys = {lat: y for y, lat in enumerate(lats)}
+            xs = {lon: x for x, lon in enumerate(lons)}
+            cursor = db.execute(
+                "select lat, lon, value from grid_cells where grid_id = ?",
+                [self.ident],
+            )
+            located = [(xs[lon], ys[lat], value) for lat, lon, value in cursor]
+        self.cells = {x * self.size + y: value for x, y, value in sorted(located)}
+
     def _validate_coords(self, key: tuple[int, int]):
         """
         Validate (x, y) coordinate pair.
@@ -1,14 +1,13 @@
 """Laboratory machinery."""
 
-from dataclasses import dataclass
 import random
+from dataclasses import dataclass
 from typing import ClassVar
 
 from ._base_mixin import BaseMixin
-from ._utils import IdGeneratorType, id_generator, validate
+from ._utils import IDS, validate
 from .parameters import Parameters
 
-
 PREFIX = [
     "Aero",
     "Auto",
@@ -47,7 +46,7 @@ SUFFIX = [
 ]
 
 
-@dataclass
+@dataclass(slots=True)
 class Machine(BaseMixin):
     """
     A piece of experimental machinery.
@@ -58,7 +57,8 @@ class Machine(BaseMixin):
     """
 
     primary_key: ClassVar[str] = "ident"
-    _next_id: ClassVar[IdGeneratorType] = id_generator("M", 4)
+    param_keys: ClassVar[set[str]] = {"num_machines"}
+    id_stem: ClassVar[str] = "M"
 
     ident: str = ""
     name: str = ""
@@ -69,7 +69,7 @@ class Machine(BaseMixin):
         validate(self.ident == "", "machine ID cannot be set externally")
         validate(len(self.name) > 0, "name cannot be empty")
 
-        self.ident = next(self._next_id)
+        self.ident = IDS.next(self.id_stem)
 
     @classmethod
     def make(cls, params: Parameters) -> list["Machine"]:
@@ -87,11 +87,28 @@ class Machine(BaseMixin):
             f"cannot generate {params.num_machines} machine names"
         )
         pairs = [(p, s) for p in PREFIX for s in SUFFIX]
+        idents = IDS.idents(cls.id_stem, params.num_machines)
         return [
-            Machine(name=f"{p} {s}")
-            for (p, s) in random.sample(pairs, k=params.num_machines)
+            cls._trusted(ident=ident, name=f"{p} {s}")
+            for ident, (p, s) in zip(
+                idents, random.sample(pairs, k=params.num_machines)
+            )
         ]
 
+    @classmethod
+    def num_rows(cls, params: Parameters) -> dict[str, int]:
+        """
+        Predict rows generated from parameters.
+
+        Args:
+            params: Data synthesis parameters.
+
+        Returns:
+            Table names mapped to numbers of rows.
+        """
+
+        return {"machine": params.num_machines}
+
     @classmethod
     def table_name(cls) -> str:
         """Database table name."""
@@ -1,34 +1,93 @@
 """Synthesize data."""
 
 import argparse
-from contextlib import contextmanager
-import cProfile
-from faker import Faker
+import hashlib
 import json
-from pathlib import Path
-import pstats
 import random
+import shutil
 import sqlite3
 import sys
-from typing import Any, Type
+import tracemalloc
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, replace
+from functools import partial
+from pathlib import Path
+from typing import Any, Literal
+
+from faker import Faker
+from sqlite_utils import Database
 
+from ._base_mixin import COMPACT_KEY, BaseMixin, IndexKeysType
+from ._columnar import MANIFEST_FILE, ColumnStore
+from ._compress import SUFFIXES, Compression, open_csv
+from ._metrics import Metrics
+from ._plan import MB, exceeded, plan
+from ._profile import NUM_STATS, SORT_KEY, SORT_KEYS, profile_context
+from ._summary import SUMMARY_PREFIX, summarize
+from ._utils import DB_FILE, IDS, IdAllocator, UnquotedDatabase
 from .assay import Assay
+from .cache import (
+    CACHE_DIR_VAR,
+    MEMORY_CACHE,
+    DiskCache,
+    MemoryCache,
+    fingerprint,
+)
 from .grid import Grid
 from .machine import Machine
-from .parameters import Parameters
+from .parameters import JSON_INDENT, Parameters
 from .person import Person
 from .rating import Rating
 from .species import Species
 from .specimen import Specimen
-from ._base_mixin import BaseMixin
-from ._utils import UnquotedDatabase
 
+# Name of file recording table fingerprints in output directory.
+STAGES_FILE = "stages.json"
 
-DB_FILE = "snailz.db"
+# Tables in order of synthesis with the tables each one depends on.
+STAGES: dict[type[BaseMixin], list[type[BaseMixin]]] = {
+    Grid: [],
+    Person: [],
+    Machine: [],
+    Rating: [Person, Machine],
+    Assay: [Grid, Rating],
+    Species: [],
+    Specimen: [Grid, Species],
+}
+
+# Tables whose rows are independent, so they can be generated in
+# batches, mapped to the parameter giving the number of rows.
+BATCHED: dict[type[BaseMixin], str] = {
+    Assay: "num_assays",
+    Specimen: "num_specimens",
+}
+
+# Stages of `_save_all` after synthesis.
+SAVE_STAGES = ["csv", "db", "columns", "npy", "images"]
+
+# Rows generated to estimate memory per row in out-of-core mode.
+SAMPLE_ROWS = 256
+
+# Ratio of peak memory while saving a chunk to memory held by its
+# objects (allows for pivoted rows and database/CSV row dictionaries).
+CHUNK_OVERHEAD = 4
 
 
 def main():
-    """Main command-line driver."""
+    """
+    Main command-line driver (`snailz sweep ...` runs `_sweep.main` and
+    `snailz serve ...` runs `_serve.main`).
+    """
+
+    if sys.argv[1:2] == ["sweep"]:
+        from ._sweep import main as sweep_main
+
+        return sweep_main(sys.argv[2:])
+    if sys.argv[1:2] == ["serve"]:
+        from ._serve import main as serve_main
+
+        return serve_main(sys.argv[2:])
 
     args = _parse_args()
     if args.defaults:
@@ -36,27 +95,359 @@ def main():
         return 0
 
     params = _initialize(args)
+    assert not (args.npy and params.grid_sparse), "--npy cannot save sparse grids"
 
     if args.schema:
-        conn = in_memory(params)
-        cursor = conn.cursor()
-        cursor.execute("select sql from sqlite_master where type='table';")
-        for stmt in cursor.fetchall():
-            print(stmt[0])
+        for stmt in _schema(args.compact, args.summaries):
+            print(stmt)
         return 0
 
-    with _profile_context(enabled=args.profile):
-        data = _synthesize(params)
-        _save_params(args.outdir, params)
-        if args.outdir not in (None, "-"):
-            classes = [Grid, Machine, Person, Rating, Assay, Species, Specimen]
-            _save_csv(args.outdir, classes, data)
-            _save_db(args.outdir, classes, data)
-            _save_images(args.outdir, data[Grid])
+    budget = None if args.chunk_budget is None else args.chunk_budget * MB
+    if args.plan or (args.memory_limit is not None) or (args.disk_limit is not None):
+        estimate = plan(params, args.compact, budget, BATCHED, npy=args.npy)
+        problems = exceeded(
+            estimate,
+            None if args.memory_limit is None else args.memory_limit * MB,
+            None if args.disk_limit is None else args.disk_limit * MB,
+        )
+        if args.plan:
+            print(json.dumps(estimate, indent=JSON_INDENT))
+            for problem in problems:
+                print(f"warning: {problem}", file=sys.stderr)
+            return 0
+        if problems and not args.append:
+            for problem in problems:
+                print(f"refusing to run: {problem}", file=sys.stderr)
+            return 1
+
+    profiler = partial(
+        profile_context,
+        True,
+        num_stats=args.profile_depth,
+        sort=args.profile_sort,
+        output=args.profile_output,
+        collapsed=args.profile_collapsed,
+    )
+    metrics = Metrics(
+        memory=args.profile_memory,
+        profile_stage=args.profile_stage,
+        profiler=profiler,
+    )
+    whole_run = args.profile and (args.profile_stage is None)
+    with (
+        profiler() if whole_run else nullcontext(),
+        _trace_memory(args.profile_memory),
+    ):
+        if args.append:
+            assert args.outdir not in (None, "-"), "--append requires --outdir"
+            _append(args.outdir, params, _parse_counts(args.append))
+            return 0
+
+        if args.outdir in (None, "-"):
+            _synthesize(params, metrics=metrics)
+            _save_params(args.outdir, params)
+            if args.metrics or args.profile_memory:
+                metrics.report()
+            return 0
+
+        options = {
+            "compact": args.compact,
+            "indexes": None if args.indexes else {},
+            "summaries": args.summaries,
+            "compression": _compression(args),
+            "columns": args.columns,
+            "npy": args.npy,
+        }
+        save = partial(
+            _save_all,
+            params=params,
+            reuse=args.reuse,
+            budget=budget,
+            metrics=metrics,
+            **options,
+        )
+        cache = DiskCache(args.cache_dir) if args.cache_dir else DiskCache.from_env()
+        if cache is None:
+            save(args.outdir)
+        else:
+            key = fingerprint(params, outputs="all", **options)
+            with metrics.stage("cache", args.outdir):
+                restored = cache.restore(key, args.outdir)
+            if not restored:
+                _save_cached(cache, key, args.outdir, save, metrics)
+
+        if args.metrics or args.profile_memory:
+            metrics.save(args.outdir)
+            metrics.report()
 
     return 0
 
 
+def _save_cached(
+    cache: DiskCache,
+    key: str,
+    outdir: Path | str,
+    save: Callable[[Path | str], None],
+    metrics: Metrics,
+):
+    """
+    Generate output into the on-disk cache and restore it from there.
+    If another run published the same key first, the cache's copy is
+    used; if that copy cannot be restored (e.g., because a concurrent
+    run evicted it), files are copied from the staging directory, or
+    regenerated in the output directory if it has been published.
+
+    Args:
+        cache: On-disk cache.
+        key: Cache key (see `fingerprint`).
+        outdir: Output directory.
+        save: Function saving all output to a directory.
+        metrics: Record of per-stage metrics to add to.
+    """
+
+    with cache.staging() as staging:
+        save(staging)
+        cache.publish(key, staging)
+        with metrics.stage("cache", outdir):
+            restored = cache.restore(key, outdir)
+            if (not restored) and staging.is_dir():
+                shutil.copytree(staging, outdir, dirs_exist_ok=True)
+                restored = True
+    if not restored:
+        save(outdir)
+
+
+@dataclass
+class Previous:
+    """
+    Output of a previous run whose tables may be reused.
+
+    Attributes:
+        db: Database connector.
+        compact: Whether the database uses the compact schema.
+        stages: Table names mapped to fingerprints (see `_stage_fingerprints`).
+    """
+
+    db: Database
+    compact: bool
+    stages: dict[str, str]
+
+    @classmethod
+    def load(cls, dirname: Path | str) -> "Previous | None":
+        """
+        Open output of a previous run.
+
+        Args:
+            dirname: Output directory of previous run.
+
+        Returns:
+            Previous output or `None` if directory lacks database or
+            stage fingerprints.
+        """
+
+        dbpath, stagespath = Path(dirname, DB_FILE), Path(dirname, STAGES_FILE)
+        if not (dbpath.is_file() and stagespath.is_file()):
+            return None
+        with open(stagespath, "r") as reader:
+            recorded = json.load(reader)
+        conn = sqlite3.connect(f"{dbpath.resolve().as_uri()}?mode=ro", uri=True)
+        return cls(Database(conn), recorded["compact"], recorded["stages"])
+
+
+def _append(outdir: Path | str, params: Parameters, counts: dict[str, int]):
+    """
+    Extend the database and CSV files in an existing output directory
+    with more rows. Grids, ratings, and species are read back from the
+    database; ID numbering continues after the last existing row, and
+    each batch is generated from a random stream seeded by the table's
+    stream and that row's key, so appending is repeatable. All inserts
+    happen in a single transaction. Summary tables (if any) are rebuilt,
+    column files written by `--columns` (if any) are extended and their
+    manifest rewritten, and fingerprints of extended tables are dropped from `stages.json`
+    so that `--reuse` will not mistake them for freshly-generated ones.
+
+    Args:
+        outdir: Output directory of a previous run.
+        params: Data synthesis parameters of that run.
+        counts: Names of tables in `BATCHED` mapped to number of rows to add.
+    """
+
+    dbpath = Path(outdir, DB_FILE)
+    assert dbpath.is_file(), f"no database to append to in {outdir}"
+    batched = {cls.table_name(): cls for cls in BATCHED}
+    for name, count in counts.items():
+        assert name in batched, f"cannot append to table {name}"
+        assert count > 0, f"require positive number of rows for {name} not {count}"
+
+    db = UnquotedDatabase(dbpath)
+    compact = COMPACT_KEY in db["grid"].columns_dict  # type: ignore[possibly-missing-attribute]
+    IDS.reset(params.id_width)
+
+    grids = Grid.load_db(db, compact)
+    upstream: dict[str, Callable[[Parameters], list]] = {
+        "assay": lambda p: Assay.make(p, grids, Rating.load_db(db, compact)),
+        "specimen": lambda p: Specimen.make(p, grids, Species.load_db(db, compact)[0]),
+    }
+
+    data: dict[type[BaseMixin], list] = {}
+    for name, count in counts.items():
+        cls = batched[name]
+        last = _last_key(db, cls, compact)
+        IDS.resume(cls.id_stem, last)
+        random.seed(_stage_seed(params, cls, offset=last))
+        data[cls] = upstream[name](replace(params, **{BATCHED[cls]: count}))
+
+    with db.conn:
+        for cls, objects in data.items():
+            cls.append_db(db, objects, compact)
+
+    summary_tables = [n for n in db.table_names() if n.startswith(SUMMARY_PREFIX)]
+    if summary_tables:
+        for table in summary_tables:
+            db[table].drop()  # type: ignore[possibly-missing-attribute]
+        summarize(db, compact)
+    db.close()
+
+    for cls, objects in data.items():
+        cls.save_csv(outdir, objects, append=True)
+
+    if Path(outdir, MANIFEST_FILE).is_file():
+        store = ColumnStore.resume(outdir)
+        for cls, objects in data.items():
+            cls.save_columns(store, objects)
+        store.close()
+
+    stagespath = Path(outdir, STAGES_FILE)
+    if stagespath.is_file():
+        with open(stagespath, "r") as reader:
+            recorded = json.load(reader)
+        for cls in data:
+            recorded["stages"].pop(cls.table_name(), None)
+        with open(stagespath, "w") as writer:
+            json.dump(recorded, writer, indent=JSON_INDENT)
+
+
+def _chunks(
+    params: Parameters,
+    cls: type[BaseMixin],
+    make: Callable[[Parameters], list],
+    budget: int,
+) -> Iterator[list]:
+    """
+    Generate a table in chunks whose objects fit in an allocation
+    budget. The first chunk is a small sample whose retained size (as
+    traced by `tracemalloc`) sets the size of the remaining chunks.
+    Chunks draw successively from the table's random stream and ID
+    sequence, so together they are identical to the table generated in
+    one piece. The budget only bounds the Python objects of one chunk:
+    it does not bound the process's peak memory, which also includes
+    the other tables, the database, and interpreter overheads.
+
+    Args:
+        params: Data synthesis parameters.
+        cls: Class in `BATCHED` to generate.
+        make: Factory taking parameters with an adjusted row count.
+        budget: Bytes of Python objects allowed in each chunk.
+
+    Yields:
+        Lists of objects.
+    """
+
+    assert budget > 0, f"require positive chunk budget not {budget}"
+    key = BATCHED[cls]
+    total = getattr(params, key)
+    random.seed(_stage_seed(params, cls))
+
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    sample = make(replace(params, **{key: min(total, SAMPLE_ROWS)}))
+    row_bytes = max(1, (tracemalloc.get_traced_memory()[0] - before) // len(sample))
+    if not tracing:
+        tracemalloc.stop()
+
+    done = len(sample)
+    yield sample
+    del sample
+
+    size = max(1, budget // (CHUNK_OVERHEAD * row_bytes))
+    while done < total:
+        count = min(size, total - done)
+        yield make(replace(params, **{key: count}))
+        done += count
+
+
+def _measure_chunks(
+    metrics: Metrics, name: str, chunks: Iterator[list]
+) -> Iterator[list]:
+    """
+    Measure a table generated in chunks as one stage that stays open
+    until the last chunk has been produced. Since chunks are generated
+    as they are consumed, the stage's times include the time spent
+    saving them, and it is recorded after the stages that ran before
+    the table was consumed.
+
+    Args:
+        metrics: Record of per-stage metrics to add to.
+        name: Stage name.
+        chunks: Lists of objects (see `_chunks`).
+
+    Yields:
+        Lists of objects.
+    """
+
+    with metrics.stage(name) as record:
+        record["rows"] = 0
+        for chunk in chunks:
+            if not record["rows"]:
+                metrics.sizes(record, chunk)
+            record["rows"] += len(chunk)
+            yield chunk
+
+
+def _compression(args: argparse.Namespace) -> Compression | None:
+    """
+    Construct CSV compression settings from command-line arguments.
+
+    Args:
+        args: Command-line arguments.
+
+    Returns:
+        Compression settings (or `None` if CSV files are not compressed).
+    """
+
+    if args.compress is None:
+        assert args.compress_level is None, "--compress-level requires --compress"
+        assert args.compress_threads == 1, "--compress-threads requires --compress"
+        return None
+    return Compression(args.compress, args.compress_level, args.compress_threads)
+
+
+def _db_key(
+    params: Parameters,
+    compact: bool = False,
+    indexes: IndexKeysType | None = None,
+    summaries: bool = False,
+) -> str:
+    """
+    Create cache key for a database generated by `in_memory`.
+
+    Args:
+        params: Data synthesis parameters.
+        compact: Use integer surrogate keys.
+        indexes: Secondary indexes to create.
+        summaries: Materialize summary tables after loading.
+
+    Returns:
+        Cache key (see `cache.fingerprint`).
+    """
+
+    return fingerprint(
+        params, outputs="db", compact=compact, indexes=indexes, summaries=summaries
+    )
+
+
 def _ensure_dir(dirname: Path | str):
     """
     Ensure directory exists.
@@ -70,6 +461,55 @@ def _ensure_dir(dirname: Path | str):
         dirpath.mkdir(exist_ok=True)
 
 
+def _faker(params: Parameters) -> Faker:
+    """
+    Construct name generator seeded from the current random stream.
+
+    Args:
+        params: Data synthesis parameters.
+
+    Returns:
+        Seeded name generator.
+    """
+
+    fake = Faker(params.locale)
+    fake.seed_instance(random.getrandbits(64))
+    return fake
+
+
+def _index_db(
+    db: Database,
+    classes: list[type[BaseMixin]],
+    compact: bool = False,
+    indexes: IndexKeysType | None = None,
+):
+    """
+    Create secondary indexes in bulk after all data has been loaded,
+    then update the query planner's statistics.
+
+    Args:
+        db: Database connector.
+        classes: Classes whose tables have been saved.
+        compact: Whether the database uses the compact schema.
+        indexes: Table names mapped to column tuples to index (default
+            taken from classes' `index_keys`; empty to skip indexing).
+    """
+
+    if indexes is None:
+        indexes = {}
+        for cls in classes:
+            for table, keys in cls.index_keys(compact).items():
+                indexes.setdefault(table, []).extend(keys)
+
+    if not indexes:
+        return
+
+    for table, keys in indexes.items():
+        for columns in keys:
+            db[table].create_index(columns, if_not_exists=True)  # type: ignore[possibly-missing-attribute]
+    db.analyze()
+
+
 def _initialize(args: argparse.Namespace) -> Parameters:
     """
     Initialize for data synthesis.
@@ -84,6 +524,9 @@ def _initialize(args: argparse.Namespace) -> Parameters:
     if args.params:
         with open(args.params, "r") as reader:
             params = Parameters(**json.load(reader))
+    elif args.append and args.outdir not in (None, "-"):
+        with open(Path(args.outdir, "params.json"), "r") as reader:
+            params = Parameters(**json.load(reader))
     else:
         params = Parameters()
 
@@ -91,15 +534,55 @@ def _initialize(args: argparse.Namespace) -> Parameters:
         fields = ov.split("=")
         assert len(fields) == 2, f"malformed override {ov}"
         key, value = fields
-        assert hasattr(params, key), f"unknown override key {key}"
-        prior = getattr(params, key)
-        setattr(params, key, type(prior)(value))
+        setattr(params, key, _override(params, key, value))
 
     random.seed(params.seed)
 
     return params
 
 
+def _last_key(db: Database, cls: type[BaseMixin], compact: bool) -> int:
+    """
+    Find the integer key of the last row saved in a table.
+
+    Args:
+        db: Database connector.
+        cls: Class of table.
+        compact: Whether the database uses the compact schema.
+
+    Returns:
+        Largest key in use (0 if table is empty).
+    """
+
+    name = cls.table_name()
+    if compact:
+        row = db.execute(f"select max({COMPACT_KEY}) from {name}").fetchone()
+        return row[0] or 0
+    row = db.execute(f"select ident from {name} order by rowid desc limit 1").fetchone()
+    return IdAllocator.key(row[0]) if row else 0
+
+
+def _override(params: Parameters, key: str, value: str) -> Any:
+    """
+    Convert text to the type of a parameter.
+
+    Args:
+        params: Data synthesis parameters.
+        key: Name of parameter.
+        value: Text from command line.
+
+    Returns:
+        Converted value.
+    """
+
+    assert hasattr(params, key), f"unknown override key {key}"
+    prior = getattr(params, key)
+    if isinstance(prior, bool):
+        assert value in ("true", "false"), f"malformed boolean override {key}={value}"
+        return value == "true"
+    return type(prior)(value)
+
+
 def _parse_args() -> argparse.Namespace:
     """
     Parse command-line arguments.
@@ -109,79 +592,359 @@ def _parse_args() -> argparse.Namespace:
     """
 
     parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--append",
+        default=None,
+        nargs="+",
+        help="table=count rows to add to existing output (assay, specimen)",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=None,
+        help=f"on-disk cache of generated output (default ${CACHE_DIR_VAR})",
+    )
+    parser.add_argument(
+        "--chunk-budget",
+        type=int,
+        default=None,
+        help="generate large tables in chunks whose objects take at most this many MB",
+    )
+    parser.add_argument(
+        "--columns",
+        action="store_true",
+        help="also write tables as binary column files",
+    )
+    parser.add_argument(
+        "--compact", action="store_true", help="use integer keys in database"
+    )
+    parser.add_argument(
+        "--compress",
+        default=None,
+        choices=sorted(SUFFIXES),
+        help="compress CSV files",
+    )
+    parser.add_argument(
+        "--compress-level",
+        type=int,
+        default=None,
+        help="compression level (default depends on method)",
+    )
+    parser.add_argument(
+        "--compress-threads",
+        type=int,
+        default=1,
+        help="compress blocks of each CSV file in this many threads",
+    )
     parser.add_argument(
         "--defaults", action="store_true", help="show default parameters"
     )
+    parser.add_argument(
+        "--disk-limit",
+        type=int,
+        default=None,
+        help="refuse runs estimated to write more than this many MB",
+    )
+    parser.add_argument(
+        "--memory-limit",
+        type=int,
+        default=None,
+        help="refuse runs estimated to need more than this many MB of memory",
+    )
+    parser.add_argument(
+        "--metrics",
+        action="store_true",
+        help="write per-stage timings to metrics.json and stderr",
+    )
+    parser.add_argument(
+        "--no-indexes",
+        dest="indexes",
+        action="store_false",
+        help="do not index database after loading",
+    )
+    parser.add_argument(
+        "--npy",
+        action="store_true",
+        help="also save dense grids as NumPy arrays",
+    )
     parser.add_argument("--outdir", default=None, help="output directory")
     parser.add_argument(
         "--override", default=[], nargs="+", help="name=value parameters"
     )
     parser.add_argument("--params", default=None, help="JSON parameter file")
+    parser.add_argument(
+        "--plan",
+        action="store_true",
+        help="show estimated rows, output size, memory, and time, then exit",
+    )
     parser.add_argument("--profile", action="store_true", help="enable profiling")
+    parser.add_argument(
+        "--profile-collapsed",
+        default=None,
+        help="file to write collapsed stacks to for flame graphs",
+    )
+    parser.add_argument(
+        "--profile-depth",
+        type=int,
+        default=NUM_STATS,
+        help="number of functions to report when profiling",
+    )
+    parser.add_argument(
+        "--profile-memory",
+        action="store_true",
+        help="report memory retained and top allocation sites for each stage",
+    )
+    parser.add_argument(
+        "--profile-output", default=None, help="file to save profile statistics to"
+    )
+    parser.add_argument(
+        "--profile-sort",
+        default=SORT_KEY,
+        choices=SORT_KEYS,
+        help="key to sort profile statistics by",
+    )
+    parser.add_argument(
+        "--profile-stage",
+        default=None,
+        choices=[cls.table_name() for cls in STAGES] + SAVE_STAGES,
+        help="profile only this stage",
+    )
+    parser.add_argument(
+        "--reuse", default=None, help="reuse unchanged tables from previous output"
+    )
     parser.add_argument("--schema", action="store_true", help="show database schema")
+    parser.add_argument(
+        "--summaries", action="store_true", help="add summary tables to database"
+    )
     return parser.parse_args()
 
 
-@contextmanager
-def _profile_context(enabled=False, num_stats=20):
+def _parse_counts(specs: list[str]) -> dict[str, int]:
     """
-    Context manager for optional profiling.
+    Parse `table=count` specifications.
+
+    Args:
+        specs: Specifications from command line.
+
+    Returns:
+        Table names mapped to counts.
     """
 
-    if enabled:
-        profiler = cProfile.Profile()
-        profiler.enable()
-        try:
-            yield profiler
-        finally:
-            profiler.disable()
-            stats = pstats.Stats(profiler)
-            stats.sort_stats(pstats.SortKey.CUMULATIVE)
-            stats.print_stats(num_stats)
-    else:
-        yield None
+    result = {}
+    for spec in specs:
+        fields = spec.split("=")
+        assert len(fields) == 2, f"malformed count {spec}"
+        result[fields[0]] = int(fields[1])
+    return result
 
 
-def _save_csv(
-    outdir: Path | str, classes: list[Type[BaseMixin]], data: dict[Type[BaseMixin], Any]
+def _save_all(
+    outdir: Path | str,
+    params: Parameters,
+    compact: bool = False,
+    indexes: IndexKeysType | None = None,
+    summaries: bool = False,
+    reuse: Path | str | None = None,
+    budget: int | None = None,
+    metrics: Metrics | None = None,
+    compression: Compression | None = None,
+    columns: bool = False,
+    npy: bool = False,
 ):
     """
-    Save synthesized data as CSV.
+    Synthesize data and save parameters, CSV, database, column files
+    and binary grids (if requested), and images. Tables generated in
+    chunks are saved in every format by a single `chunks` stage (see
+    `_save_chunks`), after the other tables have been loaded into the
+    database and before it is indexed.
 
     Args:
         outdir: Output directory.
+        params: Data synthesis parameters.
+        compact: Use integer surrogate keys.
+        indexes: Secondary indexes to create (see `_index_db`).
+        summaries: Materialize summary tables after loading.
+        reuse: Output directory of previous run to reuse tables from.
+        budget: Bytes of Python objects in each chunk of large tables (see
+            `_synthesize`; default generates tables in one piece).
+        metrics: Record of per-stage metrics to add to.
+        compression: How to compress CSV files (if at all).
+        columns: Save tables as column files (see `ColumnStore`).
+        npy: Save dense grids as NumPy arrays (see `Grid.save_npy`).
+    """
+
+    metrics = metrics if metrics is not None else Metrics()
+    previous = Previous.load(reuse) if reuse else None
+    data = _synthesize(params, previous, budget, metrics)
+    if previous is not None:
+        previous.db.close()
+
+    _save_params(outdir, params)
+    _save_stages(outdir, params, compact)
+    classes = [Grid, Machine, Person, Rating, Assay, Species, Specimen]
+    store = ColumnStore(outdir) if columns else None
+    with metrics.stage("csv", outdir) as record:
+        record["rows"] = _save_csv(outdir, classes, data, compression)
+    dbpath = Path(outdir, DB_FILE)
+    dbpath.unlink(missing_ok=True)
+    db = UnquotedDatabase(dbpath)
+    with metrics.stage("db", outdir) as record:
+        record["rows"] = _save_db(db, classes, data, compact)
+    if any(not isinstance(data[cls], list) for cls in classes):
+        with metrics.stage("chunks", outdir) as record:
+            record["rows"] = _save_chunks(
+                outdir, db, classes, data, compact, compression, store
+            )
+    with metrics.stage("index", outdir):
+        _index_db(db, classes, compact, indexes)
+    if summaries:
+        with metrics.stage("summaries", outdir):
+            summarize(db, compact)
+    db.close()
+    if store is not None:
+        with metrics.stage("columns", outdir) as record:
+            record["rows"] = _save_columns(store, classes, data)
+    if npy:
+        with metrics.stage("npy", outdir) as record:
+            Grid.save_npy(outdir, data[Grid])
+            record["rows"] = len(data[Grid])
+    with metrics.stage("images", outdir) as record:
+        _save_images(outdir, data[Grid])
+        record["rows"] = len(data[Grid])
+
+
+def _save_columns(
+    store: ColumnStore,
+    classes: list[type[BaseMixin]],
+    data: dict[type[BaseMixin], Any],
+) -> int:
+    """
+    Save synthesized data as column files and write their manifest.
+    Tables generated in chunks are skipped: `_save_chunks` writes their
+    columns as it consumes them.
+
+    Args:
+        store: Where to write columns.
         classes: Ordered list of classes to save.
         data: Class-to-data dictionary of values to save.
+
+    Returns:
+        Number of objects saved.
+    """
+
+    rows = 0
+    for cls in classes:
+        if isinstance(data[cls], list):
+            cls.save_columns(store, data[cls])
+            rows += len(data[cls])
+    store.close()
+    return rows
+
+
+def _save_csv(
+    outdir: Path | str,
+    classes: list[type[BaseMixin]],
+    data: dict[type[BaseMixin], Any],
+    compression: Compression | None = None,
+) -> int:
+    """
+    Save synthesized data as CSV. Tables generated in chunks are
+    skipped: `_save_chunks` writes their CSV files as it consumes them.
+
+    Args:
+        outdir: Output directory.
+        classes: Ordered list of classes to save.
+        data: Class-to-data dictionary of values to save.
+        compression: How to compress files (if at all).
+
+    Returns:
+        Number of objects saved.
     """
 
     _ensure_dir(outdir)
+    rows = 0
     for cls in classes:
-        cls.save_csv(outdir, data[cls])
+        if isinstance(data[cls], list):
+            cls.save_csv(outdir, data[cls], compression=compression)
+            rows += len(data[cls])
 
     for g in data[Grid]:
-        with open(Path(outdir, f"{g.ident}.csv"), "w") as writer:
+        with open_csv(outdir, g.ident, "w", compression) as writer:
             print(g, file=writer)
 
+    return rows
+
 
 def _save_db(
-    outdir: Path | str, classes: list[Type[BaseMixin]], data: dict[Type[BaseMixin], Any]
-):
+    db: Database,
+    classes: list[type[BaseMixin]],
+    data: dict[type[BaseMixin], Any],
+    compact: bool = False,
+) -> int:
     """
-    Save synthesized data to database.
+    Save synthesized data to database without indexing it. Tables
+    generated in chunks are skipped: `_save_chunks` writes them.
 
     Args:
-        outdir: Output directory.
+        db: Database connector.
         classes: Ordered list of classes to save.
         data: Class-to-data dictionary of values to save.
+        compact: Use integer surrogate keys.
+
+    Returns:
+        Number of objects saved.
     """
 
-    _ensure_dir(outdir)
-    dbpath = Path(outdir, DB_FILE)
-    dbpath.unlink(missing_ok=True)
+    rows = 0
+    for cls in classes:
+        if isinstance(data[cls], list):
+            cls.save_db(db, data[cls], compact)
+            rows += len(data[cls])
+    return rows
 
-    db = UnquotedDatabase(dbpath)
+
+def _save_chunks(
+    outdir: Path | str,
+    db: Database,
+    classes: list[type[BaseMixin]],
+    data: dict[type[BaseMixin], Any],
+    compact: bool = False,
+    compression: Compression | None = None,
+    store: ColumnStore | None = None,
+) -> int:
+    """
+    Save tables generated in chunks to the database, to CSV, and to
+    column files (if any) one chunk at a time, so that only one chunk
+    is held in memory. Must be called after `_save_db` so that the
+    tables these refer to exist.
+
+    Args:
+        outdir: Output directory.
+        db: Database connector.
+        classes: Ordered list of classes to save.
+        data: Class-to-data dictionary of values to save.
+        compact: Use integer surrogate keys.
+        compression: How to compress CSV files.
+        store: Where to write columns (if anywhere).
+
+    Returns:
+        Number of objects saved.
+    """
+
+    rows = 0
     for cls in classes:
-        cls.save_db(db, data[cls])
+        if isinstance(data[cls], list):
+            continue
+        for i, chunk in enumerate(data[cls]):
+            if i == 0:
+                cls.save_db(db, chunk, compact)
+            else:
+                with db.conn:
+                    cls.append_db(db, chunk, compact)
+            cls.save_csv(outdir, chunk, append=(i > 0), compression=compression)
+            if store is not None:
+                cls.save_columns(store, chunk)
+            rows += len(chunk)
+    return rows
 
 
 def _save_images(outdir: Path | str, grids: list[Grid]):
@@ -218,24 +981,80 @@ def _save_params(outdir: Path | str, params: Parameters):
             writer.write(params.as_json())
 
 
-def _synthesize(params: Parameters) -> dict[Type[BaseMixin], Any]:
+def _save_stages(outdir: Path | str, params: Parameters, compact: bool):
+    """
+    Save table fingerprints so later runs can reuse unchanged tables.
+
+    Args:
+        outdir: Output directory.
+        params: Data synthesis parameters.
+        compact: Whether the database uses the compact schema.
+    """
+
+    _ensure_dir(outdir)
+    with open(Path(outdir, STAGES_FILE), "w") as writer:
+        json.dump(
+            {"compact": compact, "stages": _stage_fingerprints(params)},
+            writer,
+            indent=JSON_INDENT,
+        )
+
+
+def _synthesize(
+    params: Parameters,
+    previous: "Previous | None" = None,
+    budget: int | None = None,
+    metrics: Metrics | None = None,
+) -> dict[type[BaseMixin], Any]:
     """
-    Synthesize data.
+    Synthesize data. Each table is generated from its own random
+    stream seeded from `params.seed` and the table name, so a table's
+    values depend only on the parameters in its class's `param_keys`
+    and on its upstream tables; tables whose fingerprints match those
+    of a previous run are loaded from that run's database instead.
+
+    If a chunk budget is given, tables in `BATCHED` are not generated
+    here: their values are instead lazy iterators over chunks (see
+    `_chunks`), which must be consumed one table at a time in order,
+    and their metrics are recorded as they are consumed (see
+    `_measure_chunks`).
 
     Args:
         params: Data synthesis parameters.
+        previous: Output of a previous run to reuse tables from.
+        budget: Bytes of Python objects allowed in each chunk of rows.
+        metrics: Record of per-stage metrics to add to.
 
     Returns:
         Dictionary mapping classes to generated data.
     """
 
-    grids = Grid.make(params)
-    persons = Person.make(params, Faker(params.locale))
-    machines = Machine.make(params)
-    ratings = Rating.make(params, persons, machines)
-    assays = Assay.make(params, grids, ratings)
-    species = Species.make(params)
-    specimens = Specimen.make(params, grids, species[0])
+    IDS.reset(params.id_width)
+    fingerprints = _stage_fingerprints(params)
+    metrics = metrics if metrics is not None else Metrics()
+
+    def stage(cls: type[BaseMixin], make: Callable[[Parameters], list]) -> Any:
+        name = cls.table_name()
+        reused = previous and (previous.stages.get(name) == fingerprints[name])
+        if (not reused) and (budget is not None) and (cls in BATCHED):
+            return _measure_chunks(metrics, name, _chunks(params, cls, make, budget))
+        with metrics.stage(name) as record:
+            if reused:
+                result = cls.load_db(previous.db, previous.compact)  # type: ignore[possibly-missing-attribute]
+            else:
+                random.seed(_stage_seed(params, cls))
+                result = make(params)
+            record["rows"] = len(result)
+            metrics.sizes(record, result)
+            return result
+
+    grids = stage(Grid, lambda p: Grid.make(p))
+    persons = stage(Person, lambda p: Person.make(p, _faker(p)))
+    machines = stage(Machine, lambda p: Machine.make(p))
+    ratings = stage(Rating, lambda p: Rating.make(p, persons, machines))
+    assays = stage(Assay, lambda p: Assay.make(p, grids, ratings))
+    species = stage(Species, lambda p: Species.make(p))
+    specimens = stage(Specimen, lambda p: Specimen.make(p, grids, species[0]))
     return {
         Assay: assays,
         Grid: grids,
@@ -247,25 +1066,170 @@ def _synthesize(params: Parameters) -> dict[Type[BaseMixin], Any]:
     }
 
 
-def in_memory(params: Parameters) -> sqlite3.Connection:
+def _schema(compact: bool = False, summaries: bool = False) -> list[str]:
+    """
+    Get table definitions without synthesizing a full dataset. The
+    schema does not depend on parameter values, so it is read from a
+    database built from the (minimal) default parameters, bypassing
+    caches and secondary indexes.
+
+    Args:
+        compact: Use integer surrogate keys.
+        summaries: Include summary tables.
+
+    Returns:
+        `CREATE TABLE` statements in creation order.
+    """
+
+    conn = in_memory(
+        Parameters(),
+        compact=compact,
+        indexes={},
+        summaries=summaries,
+        cache=None,
+        disk_cache=False,
+    )
+    cursor = conn.execute(
+        "select sql from sqlite_master where type='table' and name not like 'sqlite_%';"
+    )
+    result = [row[0] for row in cursor.fetchall()]
+    conn.close()
+    return result
+
+
+def _stage_fingerprints(params: Parameters) -> dict[str, str]:
+    """
+    Fingerprint each table by the parameters it depends on and the
+    fingerprints of its upstream tables.
+
+    Args:
+        params: Data synthesis parameters.
+
+    Returns:
+        Table names mapped to hexadecimal digests.
+    """
+
+    result: dict[str, str] = {}
+    for cls, upstream in STAGES.items():
+        keys = {"seed"} | cls.param_keys
+        if cls.id_stem:
+            keys.add("id_width")
+        text = json.dumps(
+            {
+                "params": {key: getattr(params, key) for key in keys},
+                "upstream": [result[u.table_name()] for u in upstream],
+            },
+            sort_keys=True,
+            default=str,
+        )
+        result[cls.table_name()] = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    return result
+
+
+def _stage_seed(params: Parameters, cls: type[BaseMixin], offset: int = 0) -> int:
+    """
+    Derive seed for a table's random stream.
+
+    Args:
+        params: Data synthesis parameters.
+        cls: Class of table being generated.
+        offset: Key of last existing row when appending (see `_append`).
+
+    Returns:
+        Seed derived from `params.seed`, table name, and offset.
+    """
+
+    text = f"{params.seed}:{cls.table_name()}"
+    if offset:
+        text = f"{text}:{offset}"
+    return int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+
+
+@contextmanager
+def _trace_memory(enabled: bool = False) -> Iterator[None]:
+    """
+    Context manager for optional memory tracing with `tracemalloc`.
+
+    Args:
+        enabled: Whether to trace allocations.
+    """
+
+    if not enabled:
+        yield
+        return
+    tracemalloc.start()
+    try:
+        yield
+    finally:
+        tracemalloc.stop()
+
+
+def _warm_up(locales: list[str]):
+    """
+    Load name generator data for locales so that later runs in this
+    process do not pay for it.
+
+    Args:
+        locales: Locales to load.
+    """
+
+    for locale in locales:
+        Faker(locale)
+
+
+def in_memory(
+    params: Parameters,
+    compact: bool = False,
+    indexes: IndexKeysType | None = None,
+    summaries: bool = False,
+    cache: MemoryCache | None = MEMORY_CACHE,
+    disk_cache: DiskCache | Literal[False] | None = None,
+) -> sqlite3.Connection:
     """
     Generate all data and return an in-memory SQLite database connection.
+    Databases are cached by parameters and options (in memory and, if
+    configured, on disk), so a repeated call returns a fresh copy of a
+    previously-generated database.
 
     Args:
         params: Data synthesis parameters.
+        compact: Use integer surrogate keys.
+        indexes: Secondary indexes to create (default from classes;
+            empty to skip indexing).
+        summaries: Materialize summary tables after loading.
+        cache: Cache of generated databases (`None` to disable).
+        disk_cache: On-disk cache of generated databases (`None` to
+            use the one named by `SNAILZ_CACHE_DIR` when called, if
+            set; `False` to disable).
 
     Returns:
         Connection to in-memory SQLite database holding all generated data.
     """
 
-    random.seed(params.seed)
+    if disk_cache is None:
+        disk_cache = DiskCache.from_env()
+    key = _db_key(params, compact, indexes, summaries)
+    if (cache is not None) and ((conn := cache.get(key)) is not None):
+        return conn
+    if disk_cache and ((conn := disk_cache.restore_db(key)) is not None):
+        if cache is not None:
+            cache.put(key, conn)
+        return conn
+
     data = _synthesize(params)
 
     classes = [Grid, Machine, Person, Rating, Assay, Species, Specimen]
     db = UnquotedDatabase(memory=True)
     for cls in classes:
-        cls.save_db(db, data[cls])
+        cls.save_db(db, data[cls], compact)
+    _index_db(db, classes, compact, indexes)
+    if summaries:
+        summarize(db, compact)
 
+    if cache is not None:
+        cache.put(key, db.conn)
+    if disk_cache:
+        disk_cache.publish_db(key, db.conn)
     return db.conn
 
 
@@ -1,13 +1,13 @@
 """Data generation parameters."""
 
+import json
 from dataclasses import dataclass
 from datetime import date
-from faker.config import AVAILABLE_LOCALES
-import json
 from typing import Any
 
-from ._utils import validate, validate_lat_lon
+from faker.config import AVAILABLE_LOCALES
 
+from ._utils import validate, validate_lat_lon
 
 # Indentation for JSON output.
 JSON_INDENT = 2
@@ -37,6 +37,9 @@ class Parameters:
     grid_std_dev: float = 0.5
     """Standard deviation of noise applied to grid pollution values."""
 
+    grid_sparse: bool = False
+    """Store and export only nonzero grid cells."""
+
     lat0: float = 48.8666632
     """Reference latitude for all grids."""
 
@@ -109,6 +112,9 @@ class Parameters:
     p_date_missing: float = 0.1
     """Probability that specimen collection date is missing."""
 
+    id_width: int = 4
+    """Minimum number of digits in generated identifiers."""
+
     def __post_init__(self):
         """Validate fields."""
 
@@ -137,14 +143,17 @@ class Parameters:
         )
         validate(self.num_specimens > 0, "require positive number of specimens")
         validate(
-            0.0 <= self.p_variety_missing <= 1.0, "require missing variety probability in [0..1]"
+            0.0 <= self.p_variety_missing <= 1.0,
+            "require missing variety probability in [0..1]",
         )
         validate(
             self.start_date <= self.end_date, "require non-negative survey date range"
         )
         validate(
-            0.0 <= self.p_date_missing <= 1.0, "require missing date probability in [0..1]"
+            0.0 <= self.p_date_missing <= 1.0,
+            "require missing date probability in [0..1]",
         )
+        validate(self.id_width > 0, "require positive identifier width")
 
     def as_json(self, indent: int = JSON_INDENT) -> str:
         """
@@ -1,16 +1,17 @@
 """Staff."""
 
-from dataclasses import dataclass
-from faker import Faker
 import random
+from dataclasses import dataclass
 from typing import ClassVar
 
+from faker import Faker
+
 from ._base_mixin import BaseMixin
-from ._utils import IdGeneratorType, ForeignKeysType, id_generator, validate
+from ._utils import IDS, ForeignKeysType, validate
 from .parameters import Parameters
 
 
-@dataclass
+@dataclass(slots=True)
 class Person(BaseMixin):
     """
     A single person.
@@ -25,7 +26,8 @@ class Person(BaseMixin):
     primary_key: ClassVar[str] = "ident"
     foreign_keys: ClassVar[ForeignKeysType] = [("supervisor_id", "person", "ident")]
     nullable_keys: ClassVar[set[str]] = {"supervisor_id"}
-    _next_id: ClassVar[IdGeneratorType] = id_generator("P", 4)
+    param_keys: ClassVar[set[str]] = {"num_persons", "supervisor_frac", "locale"}
+    id_stem: ClassVar[str] = "P"
 
     ident: str = ""
     family: str = ""
@@ -44,7 +46,7 @@ class Person(BaseMixin):
         validate(len(self.family) > 0, "family name cannot be empty")
         validate(len(self.personal) > 0, "personal name cannot be empty")
 
-        self.ident = next(self._next_id)
+        self.ident = IDS.next(self.id_stem)
 
     @classmethod
     def make(cls, params: Parameters, fake: Faker) -> list["Person"]:
@@ -63,29 +65,63 @@ class Person(BaseMixin):
         num_supervisors = max(1, int(params.supervisor_frac * params.num_persons))
         num_staff = params.num_persons - num_supervisors
 
+        staff_keys, supervisor_keys = IDS.shards(
+            cls.id_stem, [num_staff, num_supervisors]
+        )
         staff = [
-            cls(
-                family=fake.last_name(),
-                personal=fake.first_name(),
-            )
-            for _ in range(num_staff)
+            cls._random(fake, ident) for ident in IDS.idents(cls.id_stem, staff_keys)
         ]
-
         supervisors = [
-            cls(
-                family=fake.last_name(),
-                personal=fake.first_name(),
-            )
-            for _ in range(num_supervisors)
+            cls._random(fake, ident)
+            for ident in IDS.idents(cls.id_stem, supervisor_keys)
         ]
+        validate(
+            all(p.family and p.personal for p in staff + supervisors),
+            "generated names cannot be empty",
+        )
 
         for person in staff:
             person.supervisor_id = random.choice(supervisors).ident
 
         return staff + supervisors
 
+    @classmethod
+    def num_rows(cls, params: Parameters) -> dict[str, int]:
+        """
+        Predict rows generated from parameters.
+
+        Args:
+            params: Data synthesis parameters.
+
+        Returns:
+            Table names mapped to numbers of rows.
+        """
+
+        return {"person": params.num_persons}
+
     @classmethod
     def table_name(cls) -> str:
         """Database table name."""
 
         return "person"
+
+    @classmethod
+    def _random(cls, fake: Faker, ident: str) -> "Person":
+        """
+        Construct a person with random names without per-object
+        validation.
+
+        Args:
+            fake: Name generator.
+            ident: Pre-allocated unique identifier.
+
+        Returns:
+            New person without a supervisor.
+        """
+
+        return cls._trusted(
+            ident=ident,
+            family=fake.last_name(),
+            personal=fake.first_name(),
+            supervisor_id=None,
+        )
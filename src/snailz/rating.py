@@ -1,8 +1,8 @@
 """Ratings on machinery."""
 
-from dataclasses import dataclass
 import itertools
 import random
+from dataclasses import dataclass
 from typing import ClassVar
 
 from ._base_mixin import BaseMixin
@@ -12,7 +12,7 @@ from .parameters import Parameters
 from .person import Person
 
 
-@dataclass
+@dataclass(slots=True)
 class Rating(BaseMixin):
     """
     A person's rating on a machine.
@@ -27,6 +27,9 @@ class Rating(BaseMixin):
         ("person_id", "person", "ident"),
         ("machine_id", "machine", "ident"),
     ]
+    compact_primary_key: ClassVar[tuple[str, str]] = ("person_id", "machine_id")
+    categorical_keys: ClassVar[set[str]] = {"person_id", "machine_id"}
+    param_keys: ClassVar[set[str]] = {"ratings_frac", "p_certified"}
 
     person_id: str = ""
     machine_id: str = ""
@@ -36,7 +39,7 @@ class Rating(BaseMixin):
     def make(
         cls, params: Parameters, persons: list[Person], machines: list[Machine]
     ) -> list["Rating"]:
-        """Construct multiple ratings.
+        """Construct multiple ratings, ordered by person and machine.
 
         Args:
             params: Data generation parameters.
@@ -49,7 +52,8 @@ class Rating(BaseMixin):
 
         num = max(1, int(params.ratings_frac * len(persons) * len(machines)))
         possible = list(itertools.product(persons, machines))
-        actual = random.sample(possible, k=num)
+        chosen = sorted(random.sample(range(len(possible)), k=num))
+        actual = [possible[i] for i in chosen]
         return [
             Rating(
                 person_id=p.ident,
@@ -59,6 +63,21 @@ class Rating(BaseMixin):
             for (p, m) in actual
         ]
 
+    @classmethod
+    def num_rows(cls, params: Parameters) -> dict[str, int]:
+        """
+        Predict rows generated from parameters.
+
+        Args:
+            params: Data synthesis parameters.
+
+        Returns:
+            Table names mapped to numbers of rows.
+        """
+
+        num = int(params.ratings_frac * params.num_persons * params.num_machines)
+        return {"rating": max(1, num)}
+
     @classmethod
     def table_name(cls) -> str:
         """Database table name."""
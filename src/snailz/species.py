@@ -1,15 +1,17 @@
 """Details of snail species."""
 
+import random
 from dataclasses import dataclass, field
 from pathlib import Path
-import random
-from sqlite_utils import Database
 from typing import ClassVar
 
+from sqlite_utils import Database
+
 from ._base_mixin import BaseMixin
+from ._columnar import ColumnStore
+from ._compress import Compression, open_csv
 from .parameters import Parameters
 
-
 BASES = {
     "A": "CGT",
     "C": "AGT",
@@ -18,7 +20,7 @@ BASES = {
 }
 
 
-@dataclass
+@dataclass(slots=True)
 class Species(BaseMixin):
     """
     A set of generated specimens.
@@ -31,6 +33,7 @@ class Species(BaseMixin):
     """
 
     pivot_keys: ClassVar[set[str]] = {"loci"}
+    param_keys: ClassVar[set[str]] = {"genome_length", "num_loci"}
 
     reference: str = ""
     loci: list[int] = field(default_factory=list)
@@ -64,7 +67,32 @@ class Species(BaseMixin):
         ]
 
     @classmethod
-    def save_csv(cls, outdir: Path | str, objects: list):
+    def load_db(cls, db: Database, compact: bool = False) -> list["Species"]:
+        """
+        Reconstruct species from database, restoring mutation loci
+        from their long form.
+
+        Args:
+            db: Database connector.
+            compact: Whether the database uses the compact schema.
+
+        Returns:
+            List containing a single `Species`.
+        """
+
+        species = super(Species, cls).load_db(db, compact)
+        cursor = db.execute("select locus from species_loci order by ident")
+        species[0].loci = [locus for (locus,) in cursor]
+        return species
+
+    @classmethod
+    def save_csv(
+        cls,
+        outdir: Path | str,
+        objects: list,
+        append: bool = False,
+        compression: Compression | None = None,
+    ):
         """
         Save species as CSV. `objects` must be passed in a list to be
         consistent with other classes' `save_csv` methods. Scalar
@@ -74,20 +102,46 @@ class Species(BaseMixin):
         Args:
             outdir: Output directory.
             objects: List containing `Species` to save.
+            append: Add rows to existing files instead of replacing them.
+            compression: How to compress files (if at all).
 
         """
 
         assert isinstance(objects, list)
-        super().save_csv(outdir, objects)
+        super(Species, cls).save_csv(outdir, objects, append, compression)
 
-        with open(Path(outdir, "species_loci.csv"), "w", newline="") as stream:
+        mode = "a" if append else "w"
+        with open_csv(outdir, "species_loci", mode, compression) as stream:
             pivoted = objects[0]._loci_to_dict()
-            writer = cls._csv_dict_writer(stream, list(pivoted[0].keys()))
+            writer = cls._csv_dict_writer(
+                stream, list(pivoted[0].keys()), header=not append
+            )
             for obj in pivoted:
                 writer.writerow(obj)
 
     @classmethod
-    def save_db(cls, db: Database, objects: list):
+    def save_columns(cls, store: ColumnStore, objects: list):
+        """
+        Save species as column files. `objects` must be passed in a
+        list to be consistent with other classes' `save_columns`
+        methods. Mutation loci are pivoted to long form and saved in a
+        separate table.
+
+        Args:
+            store: Where to write columns.
+            objects: List containing `Species` to save.
+        """
+
+        assert isinstance(objects, list)
+        super(Species, cls).save_columns(store, objects)
+        store.append(
+            "species_loci",
+            {"ident": int, "locus": int},
+            objects[0]._loci_to_dict(),
+        )
+
+    @classmethod
+    def save_db(cls, db: Database, objects: list, compact: bool = False):
         """
         Save species to database. `objects` must be passed in a
         list to be consistent with other classes' `save_csv` methods.
@@ -98,15 +152,30 @@ class Species(BaseMixin):
         Args:
             db: Database connector.
             objects: List containing `Species` to save.
+            compact: Use compact schema (which is unchanged for species).
         """
 
         assert isinstance(objects, list)
-        super().save_db(db, objects)
+        super(Species, cls).save_db(db, objects, compact)
         table = db["species_loci"]
         table.insert_all(  # type: ignore[possibly-missing-attribute]
             objects[0]._loci_to_dict(), pk="ident"
         )
 
+    @classmethod
+    def num_rows(cls, params: Parameters) -> dict[str, int]:
+        """
+        Predict rows generated from parameters.
+
+        Args:
+            params: Data synthesis parameters.
+
+        Returns:
+            Table names mapped to numbers of rows.
+        """
+
+        return {"species": 1, "species_loci": params.num_loci}
+
     @classmethod
     def table_name(cls) -> str:
         """Database table name."""
@@ -1,24 +1,23 @@
 """Sampled specimens."""
 
-from dataclasses import dataclass
-from datetime import date
 import math
 import random
+from dataclasses import dataclass
+from datetime import date
 from typing import ClassVar
 
 from ._base_mixin import BaseMixin
 from ._utils import (
-    IdGeneratorType,
-    id_generator,
+    IDS,
     random_date,
     validate,
     validate_lat_lon,
+    validate_lat_lon_batch,
 )
 from .grid import Grid
 from .parameters import Parameters
 from .species import Species
 
-
 # Mass and diameter precision.
 SPECIMEN_PRECISION = 1
 
@@ -26,7 +25,7 @@ SPECIMEN_PRECISION = 1
 VARIETIES = ["banded", "whorled", "spotted", "plain"]
 
 
-@dataclass
+@dataclass(slots=True)
 class Specimen(BaseMixin):
     """
     A single specimen.
@@ -43,7 +42,24 @@ class Specimen(BaseMixin):
     """
 
     nullable_keys: ClassVar[set[str]] = {"collected", "variety"}
-    _next_id: ClassVar[IdGeneratorType] = id_generator("S", 4)
+    categorical_keys: ClassVar[set[str]] = {"variety"}
+    param_keys: ClassVar[set[str]] = {
+        "num_specimens",
+        "p_mutation",
+        "p_variety_missing",
+        "mass_beta_0",
+        "mass_beta_1",
+        "mass_sigma",
+        "diam_ratio",
+        "diam_sigma",
+        "start_date",
+        "end_date",
+        "p_date_missing",
+    }
+    lookup_keys: ClassVar[dict[str, list[tuple[str, ...]]]] = {
+        "specimen": [("lat", "lon"), ("variety", "mass", "diameter")],
+    }
+    id_stem: ClassVar[str] = "S"
 
     ident: str = ""
     lat: float = 0.0
@@ -69,14 +85,14 @@ class Specimen(BaseMixin):
         validate(self.diameter > 0, "specimen must have positive diameter")
         validate(
             (self.collected is None) or (self.collected > date.min),
-            "specimen must have sensible collection date"
+            "specimen must have sensible collection date",
         )
         validate(
             (self.variety is None) or (self.variety in VARIETIES),
-            f"specimen variety must be None or one of {VARIETIES}"
+            f"specimen variety must be None or one of {VARIETIES}",
         )
 
-        self.ident = next(self._next_id)
+        self.ident = IDS.next(self.id_stem)
         self.mass = round(self.mass, SPECIMEN_PRECISION)
         self.diameter = round(self.diameter, SPECIMEN_PRECISION)
 
@@ -96,30 +112,52 @@ class Specimen(BaseMixin):
             List of specimens.
         """
 
-        result = []
+        rows = []
+        axes = {g.ident: g.lat_lon_axes() for g in grids}
         for _ in range(params.num_specimens):
             g = random.choice(grids)
             x = random.randint(0, g.size - 1)
             y = random.randint(0, g.size - 1)
-            lat, lon = g.lat_lon(x, y)
+            lats, lons = axes[g.ident]
+            lat, lon = lats[y], lons[x]
             genome = species.random_genome(params)
             mass = cls.random_mass(params, g[x, y])
             diameter = cls.random_diameter(params, mass)
-            collected = random_date(params.start_date, params.end_date, params.p_date_missing)
-            variety = None if (params.p_variety_missing > 0.0 and random.random() < params.p_variety_missing) else random.choice(VARIETIES)
-            result.append(
-                Specimen(
-                    lat=lat,
-                    lon=lon,
-                    genome=genome,
-                    mass=mass,
-                    diameter=diameter,
-                    collected=collected,
-                    variety=variety,
+            collected = random_date(
+                params.start_date, params.end_date, params.p_date_missing
+            )
+            variety = (
+                None
+                if (
+                    params.p_variety_missing > 0.0
+                    and random.random() < params.p_variety_missing
                 )
+                else random.choice(VARIETIES)
             )
-
-        return result
+            rows.append((lat, lon, genome, mass, diameter, collected, variety))
+
+        lats, lons, genomes, masses, diameters, _, _ = zip(*rows)
+        validate_lat_lon_batch("specimen", lats, lons)
+        validate(min(len(g) for g in genomes) > 0, "specimen must have genome")
+        validate(min(masses) > 0, "specimen must have positive mass")
+        validate(min(diameters) > 0, "specimen must have positive diameter")
+
+        idents = IDS.idents(cls.id_stem, len(rows))
+        return [
+            cls._trusted(
+                ident=ident,
+                lat=lat,
+                lon=lon,
+                genome=genome,
+                mass=round(mass, SPECIMEN_PRECISION),
+                diameter=round(diameter, SPECIMEN_PRECISION),
+                collected=collected,
+                variety=variety,
+            )
+            for ident, (lat, lon, genome, mass, diameter, collected, variety) in zip(
+                idents, rows
+            )
+        ]
 
     @classmethod
     def random_diameter(cls, params: Parameters, mass: float) -> float:
@@ -153,6 +191,20 @@ class Specimen(BaseMixin):
         log_mass = random.gauss(mu, params.mass_sigma)
         return math.exp(log_mass)
 
+    @classmethod
+    def num_rows(cls, params: Parameters) -> dict[str, int]:
+        """
+        Predict rows generated from parameters.
+
+        Args:
+            params: Data synthesis parameters.
+
+        Returns:
+            Table names mapped to numbers of rows.
+        """
+
+        return {"specimen": params.num_specimens}
+
     @classmethod
     def table_name(cls) -> str:
         """Database table name."""
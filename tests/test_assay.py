@@ -3,6 +3,8 @@
 import csv
 from dataclasses import fields
 from pathlib import Path
+
+import pytest
 from sqlite_utils import Database
 
 from snailz import Assay, Grid, Machine, Parameters, Person, Rating
@@ -30,7 +32,7 @@ def test_assay_random_readings_length_and_precision():
 
 def test_assay_assay_readings_long_format():
     a = Assay(contents="CT", readings=[1.1, 2.2])
-    rows = Assay._assay_readings([a])
+    rows = list(Assay._assay_readings([a]))
     assert rows == [
         {"assay_id": a.ident, "reading_id": 1, "contents": "C", "reading": 1.1},
         {"assay_id": a.ident, "reading_id": 2, "contents": "T", "reading": 2.2},
@@ -72,9 +74,9 @@ def test_assay_persist_to_db():
     grids = [Grid(size=1, spacing=1.0, params=params)]
     persons = [Person(family="A", personal="B")]
     machines = [Machine(name="M1")]
-    ratings = [Rating(
-        person_id=persons[0].ident, machine_id=machines[0].ident, certified=True
-    )]
+    ratings = [
+        Rating(person_id=persons[0].ident, machine_id=machines[0].ident, certified=True)
+    ]
     assays = Assay.make(params, grids, ratings)
 
     Grid.save_db(db, grids)
@@ -86,3 +88,52 @@ def test_assay_persist_to_db():
     assert set(r["ident"] for r in rows) == set(a.ident for a in assays)
     field_names = {f.name for f in fields(assays[0])}
     assert set(rows[0].keys()).issubset(field_names)
+
+
+def test_assay_persist_to_compact_db():
+    db = Database(memory=True)
+    params = Parameters(num_assays=3, assay_size=4)
+    grids = [Grid(size=1, spacing=1.0, params=params)]
+    persons = [Person(family="A", personal="B")]
+    machines = [Machine(name="M1")]
+    ratings = [
+        Rating(person_id=persons[0].ident, machine_id=machines[0].ident, certified=True)
+    ]
+    assays = Assay.make(params, grids, ratings)
+
+    Grid.save_db(db, grids, compact=True)
+    Person.save_db(db, persons, compact=True)
+    Machine.save_db(db, machines, compact=True)
+    Rating.save_db(db, ratings, compact=True)
+    Assay.save_db(db, assays, compact=True)
+
+    joined = db.execute(
+        "select assay.ident, person.ident from assay "
+        "join person on assay.person_id = person.id"
+    ).fetchall()
+    assert joined == [(a.ident, persons[0].ident) for a in assays]
+    readings = db.execute(
+        "select count(*) from assay_readings join assay on assay_id = assay.id"
+    ).fetchone()[0]
+    assert readings == 3 * 4
+    indexed = {tuple(i.columns) for i in db[Assay.table_name()].indexes}
+    assert ("ident",) in indexed
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_assay_load_db_round_trip(compact):
+    db = Database(memory=True)
+    params = Parameters(num_assays=4, assay_size=3, p_date_missing=0.5)
+    grids = [Grid(size=2, spacing=1.0, params=params)]
+    persons = [Person(family="A", personal="B")]
+    machines = [Machine(name="M1")]
+    ratings = [
+        Rating(person_id=persons[0].ident, machine_id=machines[0].ident, certified=True)
+    ]
+    assays = Assay.make(params, grids, ratings)
+
+    Grid.save_db(db, grids, compact=compact)
+    Person.save_db(db, persons, compact=compact)
+    Machine.save_db(db, machines, compact=compact)
+    Assay.save_db(db, assays, compact=compact)
+    assert Assay.load_db(db, compact=compact) == assays
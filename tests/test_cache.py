@@ -0,0 +1,138 @@
+"""Test caches of generated databases."""
+
+import os
+import sqlite3
+from dataclasses import replace
+from pathlib import Path
+
+from snailz import DiskCache, MemoryCache, Parameters, in_memory
+from snailz.cache import CACHE_DIR_VAR, fingerprint
+
+
+def _db(value):
+    conn = sqlite3.connect(":memory:")
+    conn.execute("create table t(v)")
+    conn.execute("insert into t values(?)", (value,))
+    conn.commit()
+    return conn
+
+
+def test_fingerprint_is_canonical():
+    assert fingerprint(Parameters(), a=1, b=2) == fingerprint(Parameters(), b=2, a=1)
+    assert fingerprint(Parameters()) != fingerprint(Parameters(seed=1))
+    assert fingerprint(Parameters()) != fingerprint(Parameters(), compact=True)
+
+
+def test_memory_cache_returns_independent_copies():
+    cache = MemoryCache()
+    cache.put("k", _db(1))
+    first = cache.get("k")
+    first.execute("delete from t")
+    second = cache.get("k")
+    assert second.execute("select v from t").fetchall() == [(1,)]
+    assert cache.get("missing") is None
+
+
+def test_memory_cache_evicts_least_recently_used():
+    cache = MemoryCache(max_entries=2)
+    cache.put("a", _db(1))
+    cache.put("b", _db(2))
+    cache.get("a")
+    cache.put("c", _db(3))
+    assert "a" in cache
+    assert "b" not in cache
+    assert len(cache) == 2
+
+
+def test_memory_cache_respects_size_limit():
+    cache = MemoryCache(max_bytes=1)
+    cache.put("a", _db(1))
+    assert len(cache) == 0
+    assert cache.nbytes == 0
+
+
+def test_in_memory_uses_cache():
+    cache = MemoryCache()
+    params = Parameters(num_assays=3)
+    first = in_memory(params, cache=cache)
+    assert len(cache) == 1
+    first.execute("delete from assay_readings")
+    second = in_memory(params, cache=cache)
+    assert len(cache) == 1
+    assert second.execute("select count(*) from assay_readings").fetchone()[0] == 6
+    in_memory(params, compact=True, cache=cache)
+    assert len(cache) == 2
+
+
+def _publish(cache, key, text):
+    with cache.staging() as staging:
+        Path(staging, "data.txt").write_text(text)
+        cache.publish(key, staging)
+
+
+def test_disk_cache_publishes_and_restores(tmp_path):
+    cache = DiskCache(tmp_path / "cache")
+    assert not cache.restore("k", tmp_path / "out")
+    _publish(cache, "k", "hello")
+    assert "k" in cache
+    assert cache.restore("k", tmp_path / "out")
+    assert Path(tmp_path, "out", "data.txt").read_text() == "hello"
+    assert not any(p.name.startswith(".staging-") for p in cache.root.iterdir())
+
+
+def test_disk_cache_first_publisher_wins(tmp_path):
+    cache = DiskCache(tmp_path)
+    _publish(cache, "k", "first")
+    _publish(cache, "k", "second")
+    cache.restore("k", tmp_path / "out")
+    assert Path(tmp_path, "out", "data.txt").read_text() == "first"
+
+
+def test_disk_cache_links_files(tmp_path):
+    cache = DiskCache(tmp_path / "cache", link=True)
+    _publish(cache, "k", "hello")
+    cache.restore("k", tmp_path / "out")
+    assert os.stat(tmp_path / "out" / "data.txt").st_nlink == 2
+
+
+def test_disk_cache_evicts_least_recently_used(tmp_path):
+    cache = DiskCache(tmp_path, max_bytes=10)
+    _publish(cache, "a", "12345")
+    os.utime(cache.root / "a", (0, 0))
+    _publish(cache, "b", "12345")
+    _publish(cache, "c", "12345")
+    assert "a" not in cache
+    assert ("b" in cache) and ("c" in cache)
+    assert cache.nbytes == 10
+
+
+def test_in_memory_uses_disk_cache(tmp_path):
+    disk = DiskCache(tmp_path)
+    params = Parameters(num_specimens=4)
+    first = in_memory(params, cache=None, disk_cache=disk)
+    assert len(list(tmp_path.iterdir())) == 1
+    first.execute("delete from specimen")
+    second = in_memory(params, cache=None, disk_cache=disk)
+    assert second.execute("select count(*) from specimen").fetchone()[0] == 4
+
+
+def test_in_memory_reads_cache_dir_when_called(tmp_path, monkeypatch):
+    params = Parameters(num_specimens=4)
+    monkeypatch.setenv(CACHE_DIR_VAR, str(tmp_path / "env"))
+    in_memory(params, cache=None).close()
+    assert len(list((tmp_path / "env").iterdir())) == 1
+    in_memory(params, cache=None, disk_cache=False).close()
+    monkeypatch.delenv(CACHE_DIR_VAR)
+    in_memory(replace(params, seed=1), cache=None).close()
+    assert len(list((tmp_path / "env").iterdir())) == 1
+
+
+def test_disk_cache_db_path(tmp_path):
+    cache = DiskCache(tmp_path)
+    assert cache.db_path("k") is None
+    cache.publish_db("k", _db(7))
+    os.utime(cache.root / "k", (0, 0))
+    path = cache.db_path("k")
+    assert path is not None and path.parent == cache.root / "k"
+    assert os.stat(cache.root / "k").st_mtime > 0
+    assert sqlite3.connect(path).execute("select v from t").fetchone()[0] == 7
@@ -0,0 +1,170 @@
+"""Test columnar binary export."""
+
+import json
+import sqlite3
+from datetime import date
+
+import numpy as np
+import pytest
+
+from snailz import Parameters
+from snailz._columnar import (
+    MANIFEST_FILE,
+    ColumnStore,
+    DictionaryColumn,
+    StringColumn,
+    load_columns,
+)
+from snailz.main import _append, _save_all
+
+TYPES = {"name": str, "kind": str, "size": float, "when": date, "ok": bool}
+
+
+def _rows(start, count):
+    return [
+        {
+            "name": f"n{i}" if i % 3 else None,
+            "kind": "abc"[i % 3],
+            "size": i / 2,
+            "when": date(2024, 1, 1 + i % 28) if i % 2 else None,
+            "ok": i % 2 == 0,
+        }
+        for i in range(start, start + count)
+    ]
+
+
+def test_column_store_round_trip(tmp_path):
+    store = ColumnStore(tmp_path)
+    options = {"nullable": {"name", "when"}, "categorical": {"kind"}}
+    store.append("t", TYPES, _rows(0, 5), **options)
+    store.append("t", TYPES, _rows(5, 4), **options)
+    manifest = store.close()
+    assert manifest["tables"]["t"]["rows"] == 9
+
+    columns = load_columns(tmp_path)["t"]
+    expected = _rows(0, 9)
+    assert isinstance(columns["name"], StringColumn)
+    assert list(columns["name"]) == [r["name"] for r in expected]
+    assert isinstance(columns["kind"], DictionaryColumn)
+    assert columns["kind"].codes.dtype == np.dtype("u1")
+    assert list(columns["kind"]) == [r["kind"] for r in expected]
+    assert isinstance(columns["size"], np.memmap)
+    assert columns["size"].tolist() == [r["size"] for r in expected]
+    assert columns["when"].tolist() == [r["when"] for r in expected]
+    assert columns["ok"].tolist() == [int(r["ok"]) for r in expected]
+
+
+def test_column_store_resumes_tables(tmp_path):
+    options = {"nullable": {"name", "when"}, "categorical": {"kind"}}
+    store = ColumnStore(tmp_path)
+    store.append("t", TYPES, _rows(0, 5), **options)
+    store.close()
+    store = ColumnStore.resume(tmp_path)
+    store.append("t", TYPES, _rows(5, 4), **options)
+    assert store.close()["tables"]["t"]["rows"] == 9
+
+    columns = load_columns(tmp_path)["t"]
+    expected = _rows(0, 9)
+    assert list(columns["name"]) == [r["name"] for r in expected]
+    assert list(columns["kind"]) == [r["kind"] for r in expected]
+    assert columns["size"].tolist() == [r["size"] for r in expected]
+    assert columns["when"].tolist() == [r["when"] for r in expected]
+    assert columns["ok"].tolist() == [int(r["ok"]) for r in expected]
+
+
+def test_resumed_dictionary_widens(tmp_path):
+    store = ColumnStore(tmp_path)
+    store.append(
+        "t", {"k": str}, ({"k": str(i)} for i in range(200)), categorical={"k"}
+    )
+    store.close()
+    store = ColumnStore.resume(tmp_path)
+    store.append(
+        "t", {"k": str}, ({"k": str(i)} for i in range(400)), categorical={"k"}
+    )
+    store.close()
+    column = load_columns(tmp_path)["t"]["k"]
+    assert column.codes.dtype == np.dtype("<u2")
+    assert list(column) == [str(i) for i in range(200)] + [str(i) for i in range(400)]
+
+
+def test_column_files_are_little_endian(tmp_path):
+    store = ColumnStore(tmp_path)
+    store.append("t", {"x": int}, [{"x": 1}, {"x": 256}])
+    store.close()
+    assert (tmp_path / "t.x.bin").read_bytes() == (
+        (1).to_bytes(8, "little") + (256).to_bytes(8, "little")
+    )
+
+
+def test_dictionary_codes_widen(tmp_path):
+    store = ColumnStore(tmp_path)
+    for count in (200, 400):
+        rows = ({"k": str(i)} for i in range(count))
+        store.append("t", {"k": str}, rows, categorical={"k"})
+    store.close()
+    column = load_columns(tmp_path)["t"]["k"]
+    assert column.codes.dtype == np.dtype("<u2")
+    assert list(column) == [str(i) for i in range(200)] + [str(i) for i in range(400)]
+
+
+def test_load_columns_checks_file_sizes(tmp_path):
+    store = ColumnStore(tmp_path)
+    store.append("t", {"x": float}, [{"x": 1.0}])
+    store.close()
+    (tmp_path / "t.x.bin").write_bytes(b"\0")
+    with pytest.raises(ValueError):
+        load_columns(tmp_path)
+
+
+def test_empty_table(tmp_path):
+    store = ColumnStore(tmp_path)
+    store.append("t", {"s": str, "x": int}, [])
+    store.close()
+    columns = load_columns(tmp_path)["t"]
+    assert len(columns["s"]) == 0
+    assert len(columns["x"]) == 0
+
+
+def test_save_all_columns_match_database(tmp_path):
+    params = Parameters(num_assays=20, num_specimens=20)
+    _save_all(tmp_path, params, columns=True, budget=1)
+    _check_columns_match_database(tmp_path)
+
+
+def test_only_assay_contents_are_categorical(tmp_path):
+    _save_all(tmp_path, Parameters(num_assays=5), columns=True)
+    readings = load_columns(tmp_path)["assay_readings"]
+    assert isinstance(readings["assay_id"], StringColumn)
+    assert isinstance(readings["contents"], DictionaryColumn)
+
+
+def test_append_extends_columns(tmp_path):
+    params = Parameters(num_assays=5, num_specimens=5)
+    _save_all(tmp_path, params, columns=True)
+    _append(tmp_path, params, {"assay": 3, "specimen": 4})
+    tables = load_columns(tmp_path)
+    assert len(tables["assay"]["ident"]) == 8
+    assert len(tables["specimen"]["ident"]) == 9
+    _check_columns_match_database(tmp_path)
+
+
+def _check_columns_match_database(outdir):
+    tables = load_columns(outdir)
+    manifest = json.loads((outdir / MANIFEST_FILE).read_text())
+    assert set(tables) == set(manifest["tables"])
+
+    conn = sqlite3.connect(outdir / "snailz.db")
+    for table, columns in tables.items():
+        names = list(columns)
+        rows = conn.execute(f"select {', '.join(names)} from {table}").fetchall()
+        for i, row in enumerate(rows):
+            for name, expected in zip(names, row):
+                actual = columns[name][i]
+                if actual is np.ma.masked:
+                    actual = None
+                elif isinstance(actual, np.generic):
+                    actual = actual.item()
+                if isinstance(actual, date):
+                    actual = actual.isoformat()
+                assert actual == expected, (table, name, i)
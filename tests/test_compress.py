@@ -0,0 +1,110 @@
+"""Test compressed CSV output."""
+
+import gzip
+
+import pytest
+
+from snailz import Parameters
+from snailz._compress import SUFFIXES, Compression, _BlockWriter, open_csv
+from snailz.cache import fingerprint
+from snailz.main import _save_all
+
+TEXT = "".join(f"row{i},{i * i}\n" for i in range(5000))
+
+
+@pytest.mark.parametrize("method", sorted(SUFFIXES))
+def test_open_csv_round_trip(tmp_path, method):
+    compression = Compression(method, level=1)
+    with open_csv(tmp_path, "table", "w", compression) as writer:
+        writer.write(TEXT)
+    assert not (tmp_path / "table.csv").exists()
+    assert (tmp_path / f"table.csv{SUFFIXES[method]}").stat().st_size < len(TEXT)
+    with open_csv(tmp_path, "table") as reader:
+        assert reader.read() == TEXT
+
+
+@pytest.mark.parametrize("method", sorted(SUFFIXES))
+def test_parallel_compression_round_trip(tmp_path, method):
+    compression = Compression(method, threads=3)
+    with (
+        open(tmp_path / f"x.csv{compression.suffix}", "wb") as raw,
+        _BlockWriter(raw, compression.compress, 3, block_size=1000) as writer,
+    ):
+        writer.write(TEXT.encode("utf-8"))
+    with open_csv(tmp_path, "x") as reader:
+        assert reader.read() == TEXT
+
+
+def test_open_csv_appends_in_existing_format(tmp_path):
+    with open_csv(tmp_path, "t", "w", Compression("bz2")) as writer:
+        writer.write("a\n")
+    with open_csv(tmp_path, "t", "a") as writer:
+        writer.write("b\n")
+    with open_csv(tmp_path, "t") as reader:
+        assert reader.read() == "a\nb\n"
+
+
+def test_open_csv_replaces_other_formats(tmp_path):
+    with open_csv(tmp_path, "t", "w", Compression("gzip", threads=2)) as writer:
+        writer.write("a\n")
+    with open_csv(tmp_path, "t", "w") as writer:
+        writer.write("b\n")
+    assert [p.name for p in tmp_path.iterdir()] == ["t.csv"]
+
+
+def test_open_csv_writes_empty_file(tmp_path):
+    with open_csv(tmp_path, "t", "w", Compression("gzip", threads=2)):
+        pass
+    assert gzip.decompress((tmp_path / "t.csv.gz").read_bytes()) == b""
+
+
+def test_block_writer_close_reports_failed_block(tmp_path):
+    def fail(data):
+        raise ValueError("cannot compress")
+
+    with open(tmp_path / "x.gz", "wb") as raw:
+        writer = _BlockWriter(raw, fail, 2, block_size=10)
+        writer.write(b"x" * 35)
+        with pytest.raises(ValueError):
+            writer.close()
+        assert writer.closed and raw.closed
+
+
+def test_open_closes_file_if_writer_cannot_start(tmp_path, monkeypatch):
+    files = []
+
+    def fail(raw, *args):
+        files.append(raw)
+        raise RuntimeError("no threads")
+
+    monkeypatch.setattr("snailz._compress._BlockWriter", fail)
+    with pytest.raises(RuntimeError):
+        open_csv(tmp_path, "t", "w", Compression(threads=2))
+    assert len(files) == 1 and files[0].closed
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [{"method": "zip"}, {"method": "bz2", "level": 0}, {"level": 10}, {"threads": 0}],
+)
+def test_compression_validates(kwargs):
+    with pytest.raises(ValueError):
+        Compression(**kwargs)
+
+
+def test_save_all_compresses_csv(tmp_path):
+    params = Parameters(num_assays=5, num_specimens=5)
+    _save_all(tmp_path / "plain", params)
+    _save_all(tmp_path / "packed", params, compression=Compression(threads=2))
+    plain = sorted(p.name for p in (tmp_path / "plain").glob("*.csv"))
+    packed = sorted(p.name for p in (tmp_path / "packed").glob("*.csv.gz"))
+    assert packed == [f"{name}.gz" for name in plain]
+    for name in plain:
+        with open_csv(tmp_path / "packed", name.removesuffix(".csv")) as reader:
+            assert reader.read() == (tmp_path / "plain" / name).read_text()
+
+
+def test_fingerprint_includes_compression():
+    assert fingerprint(Parameters(), compression=Compression()) != fingerprint(
+        Parameters(), compression=Compression("lzma")
+    )
@@ -1,12 +1,17 @@
 """Test grid generation."""
 
 import csv
+import random
 from dataclasses import fields
 from pathlib import Path
-from PIL import Image
+
+import numpy as np
 import pytest
+from PIL import Image
 from sqlite_utils import Database
+
 from snailz import Grid, Parameters
+from snailz._utils import IDS
 
 
 @pytest.fixture
@@ -117,3 +122,114 @@ def test_grid_to_str(small_grid):
     rows = text.split("\n")
     assert len(rows) == small_grid.size
     assert all(len(r.split(",")) == small_grid.size for r in rows)
+
+
+def test_grid_persist_to_compact_db():
+    db = Database(memory=True)
+    grids = Grid.make(
+        Parameters(num_grids=2, grid_size=3, grid_spacing=1.0, lat0=0.0, lon0=0.0)
+    )
+    Grid.save_db(db, grids, compact=True)
+
+    rows = list(db[Grid.table_name()].rows)
+    assert {(r["id"], r["ident"]) for r in rows} == {
+        (int(g.ident[1:]), g.ident) for g in grids
+    }
+    cells = list(db["grid_cells"].rows)
+    assert len(cells) == 2 * 3 * 3
+    assert all(isinstance(c["grid_id"], int) for c in cells)
+    sql = db["grid_cells"].schema
+    assert "WITHOUT ROWID" in sql
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_grid_load_db_round_trip(compact):
+    db = Database(memory=True)
+    grids = Grid.make(
+        Parameters(num_grids=2, grid_size=3, grid_spacing=1.0, lat0=0.0, lon0=0.0)
+    )
+    Grid.save_db(db, grids, compact=compact)
+    assert Grid.load_db(db, compact=compact) == grids
+
+
+def test_grid_npy_round_trip(tmp_path):
+    grids = Grid.make(
+        Parameters(num_grids=2, grid_size=3, grid_spacing=1.0, lat0=0.0, lon0=0.0)
+    )
+    Grid.save_csv(tmp_path, grids)
+    Grid.save_npy(tmp_path, grids)
+
+    loaded = Grid.load_npy(tmp_path)
+    assert [g.ident for g in loaded] == [g.ident for g in grids]
+    for original, mapped in zip(grids, loaded):
+        assert isinstance(mapped.cells, np.memmap)
+        assert list(mapped.cells) == original.cells
+        assert mapped[1, 2] == original[1, 2]
+        assert mapped.lat_lon(2, 1) == original.lat_lon(2, 1)
+        assert mapped.min_max() == original.min_max()
+
+
+def test_grid_npy_rejects_wrong_shape(tmp_path):
+    grids = Grid.make(Parameters(num_grids=1, grid_size=3))
+    Grid.save_csv(tmp_path, grids)
+    np.save(tmp_path / f"{grids[0].ident}.npy", np.zeros((2, 2)))
+    with pytest.raises(ValueError):
+        Grid.load_npy(tmp_path)
+
+
+def test_grid_npy_rejects_sparse_grids(tmp_path):
+    grids = Grid.make(Parameters(num_grids=1, grid_size=3, grid_sparse=True))
+    with pytest.raises(ValueError):
+        Grid.save_npy(tmp_path, grids)
+    assert not list(tmp_path.glob("*.npy"))
+
+
+def test_grid_lat_lon_axes_match_cells(small_grid):
+    lats, lons = small_grid.lat_lon_axes()
+    for x in range(small_grid.size):
+        for y in range(small_grid.size):
+            assert small_grid.lat_lon(x, y) == (lats[y], lons[x])
+
+
+def test_grid_sparse_matches_dense():
+    random.seed(12345)
+    dense = Grid.make(Parameters(num_grids=2, grid_size=9))
+    IDS.reset()
+    random.seed(12345)
+    sparse = Grid.make(Parameters(num_grids=2, grid_size=9, grid_sparse=True))
+    for d, s in zip(dense, sparse):
+        assert isinstance(s.cells, dict)
+        assert all(value > 0.0 for value in s.cells.values())
+        assert (s.as_array() == d.as_array()).all()
+        assert s.min_max() == d.min_max()
+        assert str(s) == str(d)
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_grid_sparse_exports_nonzero_cells_and_round_trips(compact):
+    grids = Grid.make(Parameters(num_grids=2, grid_size=9, grid_sparse=True))
+    rows = list(Grid._grid_cells(grids, compact))
+    assert len(rows) == sum(len(g.cells) for g in grids)
+    assert all(r["value"] > 0.0 for r in rows)
+
+    db = Database(memory=True)
+    Grid.save_db(db, grids, compact=compact)
+    assert Grid.load_db(db, compact=compact) == grids
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_grid_cells_same_for_dense_and_sparse(compact):
+    IDS.reset()
+    random.seed(12345)
+    dense = Grid.make(Parameters(num_grids=2, grid_size=9))
+    IDS.reset()
+    random.seed(12345)
+    sparse = Grid.make(Parameters(num_grids=2, grid_size=9, grid_sparse=True))
+    dense_rows = list(Grid._grid_cells(dense, compact))
+    assert len(dense_rows) == 2 * 9 * 9
+    keys = ["grid_id", "x", "y", "lat", "lon", "value"]
+    if not compact:
+        keys = [k for k in keys if k not in ("x", "y")]
+    assert all(list(r) == keys for r in dense_rows)
+    nonzero = [r for r in dense_rows if r["value"] > 0.0]
+    assert list(Grid._grid_cells(sparse, compact)) == nonzero
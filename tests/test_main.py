@@ -0,0 +1,243 @@
+"""Test top-level data synthesis."""
+
+import json
+import shutil
+import sqlite3
+
+import pytest
+
+from snailz import Parameters, in_memory
+from snailz._metrics import METRICS_FILE, Metrics
+from snailz.cache import CACHE_DIR_VAR, DiskCache
+from snailz.main import (
+    Previous,
+    _append,
+    _save_all,
+    _schema,
+    _stage_fingerprints,
+    _synthesize,
+    _trace_memory,
+    main,
+)
+
+
+def _index_columns(conn, table):
+    names = [r[1] for r in conn.execute(f"pragma index_list({table})")]
+    return {
+        tuple(r[2] for r in conn.execute(f"pragma index_info({name})"))
+        for name in names
+    }
+
+
+def test_in_memory_indexes_foreign_keys():
+    conn = in_memory(Parameters())
+    assert {("person_id",), ("machine_id",), ("lat", "lon")} <= _index_columns(
+        conn, "assay"
+    )
+    assert ("lat", "lon", "value") in _index_columns(conn, "grid_cells")
+    assert conn.execute("select count(*) from sqlite_stat1").fetchone()[0] > 0
+
+
+def test_in_memory_indexes_can_be_disabled():
+    conn = in_memory(Parameters(), indexes={})
+    assert _index_columns(conn, "assay") == {("ident",)}
+
+
+def test_in_memory_custom_indexes():
+    conn = in_memory(Parameters(), indexes={"specimen": [("genome",)]})
+    assert _index_columns(conn, "specimen") == {("genome",)}
+
+
+def test_in_memory_compact_skips_primary_key_prefix():
+    conn = in_memory(Parameters(), compact=True)
+    assert ("person_id",) not in _index_columns(conn, "rating")
+    assert ("machine_id",) in _index_columns(conn, "rating")
+
+
+def test_stage_fingerprints_only_change_for_dependent_tables():
+    before = _stage_fingerprints(Parameters())
+    after = _stage_fingerprints(Parameters(num_machines=2))
+    changed = {name for name in before if before[name] != after[name]}
+    assert changed == {"machine", "rating", "assay"}
+
+
+def test_synthesize_is_repeatable():
+    first = _synthesize(Parameters(num_persons=3))
+    second = _synthesize(Parameters(num_persons=3))
+    assert first == second
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_reuse_matches_full_regeneration(tmp_path, compact):
+    params = Parameters(num_grids=2, grid_size=3, num_assays=5, num_specimens=8)
+    _save_all(tmp_path / "first", params, compact=compact)
+
+    changed = Parameters(num_grids=2, grid_size=3, num_assays=5, num_specimens=12)
+    previous = Previous.load(tmp_path / "first")
+    reused = _synthesize(changed, previous)
+    assert reused == _synthesize(changed)
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_append_extends_existing_output(tmp_path, compact):
+    params = Parameters(num_grids=2, grid_size=3, num_assays=5, num_specimens=8)
+    _save_all(tmp_path, params, compact=compact, summaries=True)
+    conn = sqlite3.connect(tmp_path / "snailz.db")
+    before = conn.execute("select * from assay order by rowid").fetchall()
+    conn.close()
+
+    _append(tmp_path, params, {"assay": 3, "specimen": 4})
+
+    conn = sqlite3.connect(tmp_path / "snailz.db")
+    after = conn.execute("select * from assay order by rowid").fetchall()
+    assert after[: len(before)] == before
+    assert len(after) == 8
+    idents = [r[0] for r in conn.execute("select ident from assay order by rowid")]
+    assert idents[-3:] == ["A0006", "A0007", "A0008"]
+    assert conn.execute("select count(*) from specimen").fetchone()[0] == 12
+    assert conn.execute("select count(*) from assay_readings").fetchone()[0] == (
+        8 * params.assay_size
+    )
+    counts = dict(conn.execute("select name, records from summary_table_counts"))
+    assert counts["assay"] == 8
+
+    lines = (tmp_path / "assay.csv").read_text().splitlines()
+    assert len(lines) == 9 and lines[-1].startswith("A0008,")
+    stages = json.loads((tmp_path / "stages.json").read_text())["stages"]
+    assert "assay" not in stages and "grid" in stages
+
+
+def test_append_is_repeatable(tmp_path):
+    params = Parameters(num_grids=2, grid_size=3, num_assays=5, num_specimens=8)
+    for name in ("first", "second"):
+        _save_all(tmp_path / name, params)
+        _append(tmp_path / name, params, {"specimen": 4})
+    assert (tmp_path / "first" / "specimen.csv").read_text() == (
+        tmp_path / "second" / "specimen.csv"
+    ).read_text()
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_chunked_output_matches_in_memory_output(tmp_path, compact):
+    params = Parameters(num_grids=2, grid_size=3, num_assays=300, num_specimens=400)
+    _save_all(tmp_path / "whole", params, compact=compact)
+    _save_all(tmp_path / "chunked", params, compact=compact, budget=64 * 1024)
+
+    for name in ("assay.csv", "assay_readings.csv", "specimen.csv"):
+        assert (tmp_path / "whole" / name).read_text() == (
+            tmp_path / "chunked" / name
+        ).read_text()
+    query = "select * from specimen order by ident"
+    whole = sqlite3.connect(tmp_path / "whole" / "snailz.db").execute(query).fetchall()
+    chunked = (
+        sqlite3.connect(tmp_path / "chunked" / "snailz.db").execute(query).fetchall()
+    )
+    assert whole == chunked
+
+
+@pytest.mark.parametrize("compact", [False, True])
+@pytest.mark.parametrize("summaries", [False, True])
+def test_schema_matches_full_database(compact, summaries):
+    params = Parameters(num_grids=3, grid_size=5, num_assays=20, num_specimens=30)
+    conn = in_memory(
+        params, compact=compact, summaries=summaries, cache=None, disk_cache=False
+    )
+    expected = [
+        row[0]
+        for row in conn.execute(
+            "select sql from sqlite_master "
+            "where type='table' and name not like 'sqlite_%'"
+        )
+    ]
+    assert _schema(compact, summaries) == expected
+    assert any(stmt.startswith("CREATE TABLE summary_") for stmt in expected) == (
+        summaries
+    )
+
+
+def test_save_all_records_stage_metrics(tmp_path):
+    metrics = Metrics()
+    params = Parameters(num_grids=2, grid_size=3, num_assays=5, num_specimens=8)
+    _save_all(tmp_path, params, metrics=metrics)
+    stages = {s["stage"]: s for s in metrics.stages}
+    assert list(stages) == [
+        "grid",
+        "person",
+        "machine",
+        "rating",
+        "assay",
+        "species",
+        "specimen",
+        "csv",
+        "db",
+        "index",
+        "images",
+    ]
+    assert not list(tmp_path.glob("*.npy"))
+    assert stages["specimen"]["rows"] == 8
+    written = stages["db"]["bytes"] + stages["index"]["bytes"]
+    assert written == (tmp_path / "snailz.db").stat().st_size
+
+
+@pytest.mark.parametrize("evicted", [False, True])
+def test_cached_run_fills_outdir_if_entry_is_lost(tmp_path, monkeypatch, evicted):
+    def publish(self, key, staging):
+        # Lose the race to publish, or publish and have the entry evicted.
+        if evicted:
+            shutil.rmtree(staging)
+
+    monkeypatch.setattr(DiskCache, "publish", publish)
+    outdir = tmp_path / "out"
+    argv = ["snailz", "--outdir", str(outdir), "--cache-dir", str(tmp_path / "cache")]
+    monkeypatch.setattr("sys.argv", argv)
+    assert main() == 0
+    _save_all(tmp_path / "expected", Parameters())
+    expected = sorted(p.name for p in (tmp_path / "expected").iterdir())
+    assert sorted(p.name for p in outdir.iterdir()) == expected
+
+
+def test_metrics_report_rows_of_chunked_tables(tmp_path, monkeypatch):
+    monkeypatch.delenv(CACHE_DIR_VAR, raising=False)
+    argv = ["snailz", "--outdir", str(tmp_path), "--metrics", "--chunk-budget", "1"]
+    argv += ["--override", "num_assays=40", "num_specimens=30"]
+    monkeypatch.setattr("sys.argv", argv)
+    assert main() == 0
+    stages = json.loads((tmp_path / METRICS_FILE).read_text())["stages"]
+    stages = {s["stage"]: s for s in stages}
+    assert stages["assay"]["rows"] == 40
+    assert stages["specimen"]["rows"] == 30
+    assert stages["specimen"]["wall"] > 0
+    assert stages["chunks"]["rows"] == 70
+    assert stages["db"]["rows"] == sum(
+        stages[name]["rows"]
+        for name in ("grid", "person", "machine", "rating", "species")
+    )
+
+
+def test_chunked_tables_record_sizes(tmp_path):
+    metrics = Metrics(memory=True)
+    params = Parameters(num_grids=2, grid_size=3, num_assays=5, num_specimens=300)
+    with _trace_memory(True):
+        _save_all(tmp_path, params, budget=1, metrics=metrics)
+    specimen = next(s for s in metrics.stages if s["stage"] == "specimen")
+    assert specimen["rows"] == 300
+    assert specimen["bytes_per_field"]["genome"] >= params.genome_length
+
+
+def test_save_all_writes_npy_only_on_request(tmp_path):
+    params = Parameters(num_grids=2, grid_size=3, num_assays=5, num_specimens=8)
+    _save_all(tmp_path, params, npy=True)
+    assert len(list(tmp_path.glob("*.npy"))) == 2
+
+
+def test_synthesize_profiles_memory_per_table():
+    metrics = Metrics(memory=True)
+    params = Parameters(num_grids=2, grid_size=3, num_assays=5, num_specimens=8)
+    with _trace_memory(True):
+        _synthesize(params, metrics=metrics)
+    stages = {s["stage"]: s for s in metrics.stages}
+    specimen = stages["specimen"]
+    assert specimen["retained"] > 0
+    assert specimen["bytes_per_field"]["genome"] >= params.genome_length
+    assert specimen["bytes_per_object"] > sum(specimen["bytes_per_field"].values())
+    assert all("retained" in s for s in stages.values())
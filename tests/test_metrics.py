@@ -0,0 +1,105 @@
+"""Test per-stage metrics."""
+
+import io
+import json
+import tracemalloc
+
+from snailz._metrics import METRICS_FILE, Metrics
+
+
+def test_metrics_record_stage(tmp_path):
+    metrics = Metrics()
+    with metrics.stage("write", tmp_path) as record:
+        (tmp_path / "out.txt").write_text("x" * 100)
+        record["rows"] = 10
+    with metrics.stage("think"):
+        pass
+
+    first, second = metrics.stages
+    assert first["stage"] == "write"
+    assert first["rows"] == 10
+    assert first["bytes"] == 100
+    assert first["wall"] >= 0.0 and first["cpu"] >= 0.0
+    assert first["rows_per_sec"] > 0
+    assert second["rows"] is None and second["bytes"] is None
+
+
+def test_metrics_ignore_unmodified_files(tmp_path):
+    (tmp_path / "old.txt").write_text("old")
+    metrics = Metrics()
+    with metrics.stage("nothing", tmp_path):
+        pass
+    assert metrics.stages[0]["bytes"] == 0
+
+
+def test_metrics_count_rewritten_and_extended_files(tmp_path):
+    (tmp_path / "old.txt").write_text("x" * 50)
+    metrics = Metrics()
+    with metrics.stage("create", tmp_path):
+        (tmp_path / "old.txt").write_text("y" * 20)
+        (tmp_path / "log.txt").write_text("z" * 10)
+    with (
+        metrics.stage("extend", tmp_path),
+        open(tmp_path / "log.txt", "a") as writer,
+    ):
+        writer.write("z" * 5)
+    assert [s["bytes"] for s in metrics.stages] == [30, 5]
+
+
+def test_metrics_measure_peak_rss_per_stage():
+    metrics = Metrics()
+    with metrics.stage("big"):
+        block = bytearray(64 * 1024 * 1024)
+        block[::4096] = b"x" * len(block[::4096])
+        del block
+    with metrics.stage("small"):
+        pass
+    big, small = metrics.stages
+    assert big["process_peak_rss"] > 0
+    if big["peak_rss"] is not None:
+        assert small["peak_rss"] < big["peak_rss"] <= big["process_peak_rss"]
+
+
+def test_metrics_save_and_report(tmp_path):
+    metrics = Metrics()
+    with metrics.stage("grid") as record:
+        record["rows"] = 3
+    metrics.save(tmp_path)
+    saved = json.loads((tmp_path / METRICS_FILE).read_text())
+    assert [s["stage"] for s in saved["stages"]] == ["grid"]
+
+    stream = io.StringIO()
+    metrics.report(stream)
+    lines = stream.getvalue().splitlines()
+    assert lines[0].startswith("stage")
+    assert lines[1].startswith("grid") and "-" in lines[1]
+
+
+def test_metrics_profile_memory():
+    metrics = Metrics(memory=True, top=3)
+    tracemalloc.start()
+    try:
+        with metrics.stage("allocate") as record:
+            kept = [str(i) * 100 for i in range(1000)]
+            metrics.sizes(record, [])
+    finally:
+        tracemalloc.stop()
+
+    record = metrics.stages[0]
+    assert record["retained"] >= 100 * len(kept)
+    assert record["traced_peak"] >= record["retained"]
+    assert 0 < len(record["top"]) <= 3
+    assert record["top"][0]["site"].startswith(f"{__file__}:")
+    assert record["top"][0]["size"] >= 100 * len(kept)
+    assert "bytes_per_object" not in record
+
+    stream = io.StringIO()
+    metrics.report(stream)
+    assert "allocate: retained" in stream.getvalue()
+
+
+def test_metrics_memory_ignored_without_tracing():
+    metrics = Metrics(memory=True)
+    with metrics.stage("untraced"):
+        pass
+    assert "retained" not in metrics.stages[0]
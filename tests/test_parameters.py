@@ -1,6 +1,9 @@
 """Test parameter object."""
 
 import json
+
+import pytest
+
 from snailz import Parameters
 
 
@@ -8,3 +11,8 @@ def test_parameters_as_json():
     parameters = Parameters()
     d = json.loads(parameters.as_json())
     assert set(parameters.__dict__.keys()) == set(d.keys())
+
+
+def test_parameters_require_positive_id_width():
+    with pytest.raises(ValueError):
+        Parameters(id_width=0)
@@ -3,8 +3,10 @@
 import csv
 from dataclasses import fields
 from pathlib import Path
+
 import pytest
 from sqlite_utils import Database
+
 from snailz import Parameters, Person
 
 
@@ -61,3 +63,19 @@ def test_person_persist_to_db(fake):
     field_names = {f.name for f in fields(persons[0])}
     assert all(len(r) == len(field_names) for r in rows)
     assert set(rows[0].keys()) == field_names
+
+
+def test_person_has_no_instance_dict():
+    p = Person(family="A", personal="B")
+    assert not hasattr(p, "__dict__")
+    assert p.persistable() == {
+        "ident": p.ident,
+        "family": "A",
+        "personal": "B",
+        "supervisor_id": None,
+    }
+
+
+def test_person_field_metadata_is_cached():
+    assert Person.persistable_keys() is Person.persistable_keys()
+    assert Person.not_null_keys() == {"ident", "family", "personal"}
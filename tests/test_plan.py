@@ -0,0 +1,106 @@
+"""Test resource estimates."""
+
+from dataclasses import replace
+
+from snailz import Assay, Parameters, Specimen
+from snailz._plan import CLASSES, MB, exceeded, load_calibration, plan
+from snailz.main import BATCHED, _synthesize
+
+PARAMS = Parameters(
+    num_grids=3,
+    grid_size=5,
+    num_persons=6,
+    num_machines=4,
+    num_assays=7,
+    assay_size=3,
+    genome_length=9,
+    num_loci=3,
+    num_specimens=11,
+)
+
+
+def test_num_rows_match_generated_data():
+    data = _synthesize(PARAMS)
+    for cls in CLASSES:
+        counts = cls.num_rows(PARAMS)
+        assert counts[cls.table_name()] == len(data[cls])
+    assert Assay.num_rows(PARAMS)["assay_readings"] == sum(
+        len(a.readings) for a in data[Assay]
+    )
+    assert sum(len(g.cells) for g in data[CLASSES[0]]) == 3 * 5 * 5
+
+
+def test_plan_rows_and_exact_sizes():
+    estimate = plan(PARAMS, npy=True)
+    assert estimate["rows"]["grid_cells"] == 75
+    assert estimate["rows"]["assay_readings"] == 21
+    assert estimate["rows"]["rating"] == int(PARAMS.ratings_frac * 6 * 4)
+    assert estimate["bytes"]["npy"] == 3 * (128 + 8 * 25)
+    assert plan(PARAMS)["bytes"]["npy"] == 0
+    assert estimate["total_bytes"] == sum(estimate["bytes"].values())
+    assert estimate["memory"] > 0 and estimate["seconds"] > 0
+
+
+def test_plan_scales_with_parameters():
+    small = plan(PARAMS)
+    large = plan(replace(PARAMS, num_specimens=1100))
+    assert large["bytes"]["csv"] > small["bytes"]["csv"]
+    assert large["memory"] > small["memory"]
+
+    longer = plan(replace(PARAMS, genome_length=109))
+    assert longer["bytes"]["csv"] - small["bytes"]["csv"] == (11 + 1) * 100
+
+
+def test_plan_with_budget_excludes_batched_tables():
+    params = replace(PARAMS, num_specimens=1_000_000)
+    unbatched = plan(params)
+    batched = plan(params, budget=MB, batched=BATCHED)
+    assert batched["memory"] < unbatched["memory"]
+    assert batched["rows"] == unbatched["rows"]
+
+
+def test_plan_uses_given_calibration():
+    tables = load_calibration()["tables"]
+    calibration = {
+        "params": {"genome_length": PARAMS.genome_length},
+        "tables": {
+            table: {"csv": 1, "db": 2, "db_compact": 1, "memory": 10, "seconds": 0.5}
+            for table in tables
+        },
+        "png_per_cell": 2,
+        "base_memory": 100,
+        "peak_ratio": 2,
+    }
+    estimate = plan(PARAMS, compact=True, calibration=calibration)
+    total = sum(estimate["rows"].values())
+    assert estimate["bytes"]["csv"] == total
+    assert estimate["bytes"]["db"] == total
+    assert estimate["bytes"]["png"] == 2 * 75
+    assert estimate["memory"] == 100 + 2 * 10 * total
+    assert estimate["seconds"] == 0.5 * total
+
+
+def test_exceeded_reports_limits():
+    estimate = {"memory": 3 * MB, "total_bytes": 5 * MB}
+    assert exceeded(estimate) == []
+    assert exceeded(estimate, memory_limit=4 * MB, disk_limit=5 * MB) == []
+    problems = exceeded(estimate, memory_limit=2 * MB, disk_limit=1 * MB)
+    assert len(problems) == 2
+    assert "memory 3 MB" in problems[0] and "output 5 MB" in problems[1]
+
+
+def test_specimen_rows_only_depend_on_count():
+    assert Specimen.num_rows(replace(PARAMS, genome_length=50)) == {"specimen": 11}
+
+
+def test_sparse_grid_cells_are_estimated_not_dense():
+    params = replace(PARAMS, num_grids=20, grid_size=41, grid_sparse=True)
+    data = _synthesize(params)
+    actual = sum(len(g.cells) for g in data[CLASSES[0]])
+    estimate = plan(params)
+    assert abs(estimate["rows"]["grid_cells"] - actual) < actual / 2
+    assert estimate["rows"]["grid_cells"] < 20 * 41 * 41 / 2
+    assert (
+        estimate["bytes"]["png"]
+        == plan(replace(params, grid_sparse=False))["bytes"]["png"]
+    )
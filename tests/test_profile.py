@@ -0,0 +1,73 @@
+"""Test CPU profiling output."""
+
+import io
+import pstats
+
+from snailz._metrics import Metrics
+from snailz._profile import collapsed_stacks, profile_context
+
+
+def _leaf():
+    return sum(i * i for i in range(20_000))
+
+
+def _branch():
+    return _leaf() + _leaf()
+
+
+def test_profile_context_disabled_yields_none():
+    stream = io.StringIO()
+    with profile_context(False, stream=stream) as profiler:
+        _branch()
+    assert profiler is None
+    assert stream.getvalue() == ""
+
+
+def test_profile_context_writes_stats_and_collapsed_stacks(tmp_path):
+    stream = io.StringIO()
+    output, collapsed = tmp_path / "run.prof", tmp_path / "run.txt"
+    with profile_context(
+        True,
+        num_stats=3,
+        sort="tottime",
+        output=output,
+        collapsed=collapsed,
+        stream=stream,
+    ):
+        _branch()
+
+    assert "Ordered by: internal time" in stream.getvalue()
+    names = set(pstats.Stats(str(output)).get_stats_profile().func_profiles)
+    assert {"_branch", "_leaf"} <= names
+
+    lines = collapsed.read_text().splitlines()
+    assert lines
+    for line in lines:
+        _, micros = line.rsplit(" ", 1)
+        assert int(micros) > 0
+    assert any("(_branch);" in line and "(_leaf)" in line for line in lines)
+
+
+def test_collapsed_stacks_conserve_time():
+    with profile_context(True, num_stats=0, stream=io.StringIO()) as profiler:
+        _branch()
+    stacks = collapsed_stacks(profiler)
+    total = sum(entry.inlinetime for entry in profiler.getstats())
+    assert abs(sum(stacks.values()) / 1_000_000 - total) <= 0.05 * total
+    assert all(
+        stack.count(";") < 2 for stack in collapsed_stacks(profiler, max_depth=2)
+    )
+
+
+def test_metrics_profile_one_stage():
+    stream = io.StringIO()
+    metrics = Metrics(
+        profile_stage="second",
+        profiler=lambda: profile_context(True, num_stats=5, stream=stream),
+    )
+    with metrics.stage("first"):
+        _leaf()
+    assert stream.getvalue() == ""
+    with metrics.stage("second"):
+        _branch()
+    assert "_branch" in stream.getvalue()
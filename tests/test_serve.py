@@ -0,0 +1,149 @@
+"""Test dataset server."""
+
+import http.client
+import json
+import socket
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from snailz import DiskCache, Parameters
+from snailz._serve import DB_CONTENT_TYPE, Datasets, serve
+
+PARAMS = {"num_grids": 1, "grid_size": 3, "num_assays": 4, "num_specimens": 5}
+
+
+class _UnixConnection(http.client.HTTPConnection):
+    def __init__(self, path):
+        super().__init__("localhost")
+        self.socket_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.socket_path)
+
+
+def _request(connect, method, path, body=None):
+    conn = connect()
+    try:
+        data = None if body is None else json.dumps(body).encode("utf-8")
+        conn.request(method, path, body=data)
+        response = conn.getresponse()
+        return response.status, dict(response.getheaders()), response.read()
+    finally:
+        conn.close()
+
+
+@pytest.fixture
+def datasets(tmp_path):
+    return Datasets(DiskCache(tmp_path / "cache"))
+
+
+@pytest.fixture
+def server(datasets):
+    server = serve(datasets, port=0)
+    thread = threading.Thread(target=server.serve_forever, args=(0.01,), daemon=True)
+    thread.start()
+    host, port = server.server_address[:2]
+    yield lambda: http.client.HTTPConnection(host, port)
+    server.shutdown()
+    server.server_close()
+
+
+def test_serve_path_then_cached(server):
+    status, _, body = _request(server, "POST", "/db", {"params": PARAMS})
+    assert status == 200
+    first = json.loads(body)
+    conn = sqlite3.connect(first["path"])
+    assert conn.execute("select count(*) from specimen").fetchone()[0] == 5
+    conn.close()
+
+    _, _, body = _request(server, "POST", "/db?format=path", {"params": PARAMS})
+    assert json.loads(body) == first
+
+    _, _, body = _request(server, "GET", "/health")
+    assert json.loads(body) == {"status": "ok", "generated": 1, "requests": 2}
+
+
+def test_serve_bytes_match_path(server, tmp_path):
+    _, _, body = _request(server, "POST", "/db", {"params": PARAMS, "compact": True})
+    path = json.loads(body)["path"]
+    status, headers, data = _request(
+        server, "POST", "/db?format=bytes", {"params": PARAMS, "compact": True}
+    )
+    assert status == 200
+    assert headers["Content-Type"] == DB_CONTENT_TYPE
+    assert headers["X-Snailz-Key"] == json.loads(body)["key"]
+    with open(path, "rb") as reader:
+        assert data == reader.read()
+
+
+def test_serve_concurrent_clients_share_generation(server):
+    def fetch(seed):
+        body = {"params": {**PARAMS, "seed": seed}}
+        return json.loads(_request(server, "POST", "/db", body)[2])["key"]
+
+    with ThreadPoolExecutor(8) as pool:
+        keys = list(pool.map(fetch, [1, 2] * 8))
+    assert len(set(keys)) == 2
+    _, _, body = _request(server, "GET", "/health")
+    assert json.loads(body) == {"status": "ok", "generated": 2, "requests": 16}
+
+
+def test_open_db_pins_file_against_eviction(datasets):
+    params = Parameters(**PARAMS)
+    _, path, reader = datasets.open_db(params)
+    with reader:
+        datasets.cache.max_bytes = 0
+        datasets.cache.evict()
+        assert not path.exists()
+        assert reader.read(16) == b"SQLite format 3\0"
+
+
+def test_serve_reports_unkept_database(server, datasets, monkeypatch):
+    monkeypatch.setattr(datasets.cache, "db_path", lambda key: None)
+    status, _, body = _request(server, "POST", "/db", {"params": PARAMS})
+    assert status == 503
+    assert "evicted" in json.loads(body)["error"]
+
+
+def test_serve_reports_generation_failure(server, monkeypatch):
+    def fail(*args, **kwargs):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr("snailz._serve.in_memory", fail)
+    status, _, body = _request(server, "POST", "/db", {"params": PARAMS})
+    assert status == 500
+    assert "boom" in json.loads(body)["error"]
+
+
+@pytest.mark.parametrize(
+    "path, body, status",
+    [
+        ("/db", {"params": {"num_specimens": -1}}, 400),
+        ("/db", {"params": {"nonexistent": 1}}, 400),
+        ("/db", {"params": []}, 400),
+        ("/db?format=csv", {"params": PARAMS}, 400),
+        ("/other", {}, 404),
+    ],
+)
+def test_serve_rejects_bad_requests(server, path, body, status):
+    assert _request(server, "POST", path, body)[0] == status
+
+
+def test_serve_unix_socket(tmp_path):
+    socket_path = str(tmp_path / "snailz.sock")
+    server = serve(Datasets(DiskCache(tmp_path / "cache")), socket_path=socket_path)
+    thread = threading.Thread(target=server.serve_forever, args=(0.01,), daemon=True)
+    thread.start()
+    try:
+        status, _, body = _request(
+            lambda: _UnixConnection(socket_path), "POST", "/db", {"params": PARAMS}
+        )
+        assert status == 200
+        assert json.loads(body)["path"].endswith(".db")
+    finally:
+        server.shutdown()
+        server.server_close()
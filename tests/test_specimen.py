@@ -1,6 +1,7 @@
 """Test specimen construction."""
 
 from datetime import date
+
 import pytest
 from sqlite_utils import Database
 
@@ -125,3 +126,17 @@ def test_specimen_variety_persists_to_db(a_grid):
     Specimen.save_db(db, specimens)
     rows = list(db[Specimen.table_name()].rows)
     assert all(row["variety"] in VARIETIES for row in rows)
+
+
+def test_specimen_make_validates_batch_lat_lon(seeded_rng):
+    grid = Grid(size=5, spacing=1000.0, lat0=89.99, lon0=0.0, params=Parameters())
+    species = DummySpecies(genome="ACGT")
+    with pytest.raises(ValueError):
+        Specimen.make(Parameters(num_specimens=50), [grid], species)
+
+
+def test_specimen_make_rounds_trusted_values(a_grid):
+    species = DummySpecies(genome="ACGT")
+    specimens = Specimen.make(Parameters(num_specimens=10), [a_grid], species)
+    assert all(s.mass == round(s.mass, 1) for s in specimens)
+    assert all(s.diameter == round(s.diameter, 1) for s in specimens)
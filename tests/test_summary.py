@@ -0,0 +1,67 @@
+"""Test summary tables."""
+
+import pytest
+
+from snailz import Parameters, in_memory
+
+
+@pytest.fixture
+def params():
+    return Parameters(
+        num_grids=2, grid_size=4, num_assays=10, num_machines=2, num_specimens=30
+    )
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_summary_grid_matches_raw_cells(params, compact):
+    conn = in_memory(params, compact=compact, summaries=True)
+    summary = conn.execute("select sum(num_cells) from summary_grid").fetchone()[0]
+    assert summary == params.num_grids * params.grid_size**2
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_summary_assay_counts_readings(params, compact):
+    conn = in_memory(params, compact=compact, summaries=True)
+    for name in ("machine", "person"):
+        total = conn.execute(
+            f"select sum(num_readings) from summary_assay_by_{name}"
+        ).fetchone()[0]
+        assert total == params.num_assays * params.assay_size
+
+
+def test_summary_histogram_covers_every_specimen(params):
+    conn = in_memory(params, summaries=True)
+    rows = conn.execute(
+        "select measure, sum(num_specimens), max(bin) "
+        "from summary_specimen_histogram group by measure"
+    ).fetchall()
+    assert {r[0] for r in rows} == {"mass", "diameter"}
+    assert all(r[1] == params.num_specimens for r in rows)
+    assert all(r[2] < 10 for r in rows)
+
+
+def test_summary_table_counts(params):
+    conn = in_memory(params, summaries=True)
+    counts = dict(conn.execute("select name, records from summary_table_counts"))
+    assert counts["specimen"] == params.num_specimens
+    assert not any(name.startswith("summary_") for name in counts)
+
+
+def test_summary_tables_are_optional(params):
+    conn = in_memory(params)
+    names = {r[0] for r in conn.execute("select name from sqlite_master")}
+    assert not any(name.startswith("summary_") for name in names)
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_summary_sparse_grids_match_dense(params, compact):
+    dense = in_memory(params, compact=compact, summaries=True)
+    params.grid_sparse = True
+    sparse = in_memory(params, compact=compact, summaries=True)
+    for table in ("summary_grid", "summary_specimen_histogram"):
+        query = f"select * from {table} order by 1, 2, 3, 4"
+        assert sparse.execute(query).fetchall() == dense.execute(query).fetchall()
+    assert (
+        sparse.execute("select count(*) from grid_cells").fetchone()[0]
+        < (dense.execute("select count(*) from grid_cells").fetchone()[0])
+    )
@@ -0,0 +1,57 @@
+"""Test parameter sweeps."""
+
+import json
+
+import pytest
+
+from snailz import Parameters
+from snailz._sweep import MANIFEST_FILE, _parse_grid, _variants, sweep
+from snailz.main import _save_all
+
+BASE = Parameters(num_grids=1, grid_size=3, num_assays=4, num_specimens=5)
+
+
+def test_parse_grid_converts_types():
+    grid = _parse_grid(BASE, ["seed=1,2", "p_mutation=0.1", "grid_sparse=true,false"])
+    assert grid == {
+        "seed": [1, 2],
+        "p_mutation": [0.1],
+        "grid_sparse": [True, False],
+    }
+
+
+@pytest.mark.parametrize("spec", ["seed", "nonexistent=1", "grid_sparse=maybe"])
+def test_parse_grid_rejects_bad_specs(spec):
+    with pytest.raises(AssertionError):
+        _parse_grid(BASE, [spec])
+
+
+def test_variants_are_cross_product():
+    variants = _variants(BASE, {"seed": [1, 2], "num_specimens": [3, 4, 5]})
+    assert len(variants) == 6
+    assert variants[1][0] == {"seed": 1, "num_specimens": 4}
+    assert variants[1][1].seed == 1 and variants[1][1].num_specimens == 4
+    assert variants[1][1].num_assays == BASE.num_assays
+
+
+def test_variants_validate_parameters():
+    with pytest.raises(ValueError):
+        _variants(BASE, {"num_specimens": [-1]})
+
+
+def test_sweep_matches_single_runs(tmp_path):
+    manifest = sweep(
+        tmp_path / "sweep", BASE, {"seed": [1, 2], "num_specimens": [3, 6]}, workers=2
+    )
+    saved = json.loads((tmp_path / "sweep" / MANIFEST_FILE).read_text())
+    assert saved == manifest
+    assert [v["dir"] for v in manifest["variants"]] == ["0", "1", "2", "3"]
+    assert manifest["variants"][3]["overrides"] == {"seed": 2, "num_specimens": 6}
+
+    single = tmp_path / "single"
+    single.mkdir()
+    params = Parameters(**{**manifest["base"], "seed": 2, "num_specimens": 6})
+    _save_all(single, params)
+    variant = tmp_path / "sweep" / "3"
+    for name in ("params.json", "specimen.csv", "assay.csv", "grid_cells.csv"):
+        assert (variant / name).read_text() == (single / name).read_text()
@@ -0,0 +1,57 @@
+"""Test utilities."""
+
+import numpy as np
+import pytest
+
+from snailz._utils import IdAllocator, lat_lon
+
+
+def test_id_allocator_ranges_are_contiguous():
+    ids = IdAllocator()
+    assert ids.allocate("X", 3) == range(1, 4)
+    assert ids.allocate("X", 2) == range(4, 6)
+    assert ids.allocate("Y", 1) == range(1, 2)
+
+
+def test_id_allocator_shards_split_one_block():
+    ids = IdAllocator()
+    first, second = ids.shards("X", [2, 3])
+    assert first == range(1, 3)
+    assert second == range(3, 6)
+    assert ids.next("X") == "X0006"
+
+
+def test_id_allocator_reset_restarts_numbering():
+    ids = IdAllocator()
+    ids.allocate("X", 10)
+    ids.reset(width=6)
+    assert ids.next("X") == "X000001"
+
+
+def test_id_allocator_resumes_after_existing_key():
+    ids = IdAllocator()
+    ids.resume("X", 41)
+    assert ids.next("X") == "X0042"
+    with pytest.raises(ValueError):
+        ids.resume("X", -1)
+
+
+def test_id_allocator_widens_past_width():
+    ids = IdAllocator(width=2)
+    idents = ids.idents("X", 100)
+    assert idents[0] == "X01"
+    assert idents[-1] == "X100"
+    assert len(set(idents)) == 100
+
+
+def test_id_allocator_recovers_key():
+    assert IdAllocator.key("X0042") == 42
+    with pytest.raises(ValueError):
+        IdAllocator.key("0042")
+
+
+def test_lat_lon_arrays_match_scalars():
+    offsets = np.arange(7) * 12.5
+    lats, lons = lat_lon(48.8, -123.5, offsets, offsets)
+    for i, offset in enumerate(offsets.tolist()):
+        assert lat_lon(48.8, -123.5, offset, offset) == (lats[i], lons[i])